@@ -31,11 +31,41 @@ SOFTWARE.
 """
 
 import re
+import os
+import sys
+import json
 from soco import SoCo
+from soco.data_structures import DidlResource, DidlObject, to_didl_string
+from soco.data_structures_entry import from_didl_string
 import threading
 from pprint import pprint
 import datetime
+import time
+import array
+import sqlite3
+import queue
+import hashlib
+import mmap
+import struct
+import random
+import heapq
+import math
+import gzip
+import collections
+import collections.abc
+import weakref
+import socket
+import socketserver
+import tempfile
+import argparse
+import xml.etree.ElementTree as ET
+import concurrent.futures
+import io
+import cProfile
+import pstats
+import tracemalloc
 import requests
+import requests.adapters
 
 __title__ = 'CoSoCoW'
 __version__ = '1.1.1'
@@ -45,10 +75,43 @@ __license__ = 'MIT'
 
 
 class CoSoCoW(object):
-    def __init__(self, a_zone_ip=None):
+    # zone event services: number, soco service, name, handler (in order of polling)
+    A_ZONE_EV = ((1, 'renderingControl', 'Sound', 'get_sound_event'),
+                 (3, 'contentDirectory', 'Queue', 'get_queue_event'),
+                 (2, 'avTransport', 'Track', 'get_track_event'),
+                 (4, 'zoneGroupTopology', 'Zone', 'get_topology_event'),
+                 (5, 'deviceProperties', 'Prop', 'get_prop_event'))
+    D_ZONE_EV_IDX = dict((a_ev[0], idx) for idx, a_ev in enumerate(A_ZONE_EV))
+    # LastChange fields read by the event handlers, snapshot and event replay (see set_ev_fast)
+    A_EV_FIELD = ('transport_state', 'transport_status', 'current_play_mode', 'current_track',
+                  'current_track_meta_data', 'enqueued_transport_uri', 'enqueued_transport_uri_meta_data',
+                  'av_transport_uri', 'av_transport_uri_meta_data',
+                  'sleep_timer_generation', 'volume', 'update_id')
+
+    # per zone state arrays: attribute, initial value (callable: called with object and zone index)
+    A_ZONE_ARRAY = (('a_zone_name', ''), ('a_zone_avail', False),
+                    ('a_volume', -1), ('a_balance', 0), ('a_group_volume', -1),  # -1: not known yet
+                    ('a_radio_is_adv', 0),
+                    ('a_queue_play_list', 0), ('a_queue_play_mode', 0),
+                    ('a_queue_win', lambda mc, idx: QueueWin(mc.get_queue_page_fn(idx), mc.pool_queue_win,
+                                                             mc.num_queue_page, mc.num_queue_pages_max)),
+                    ('a_queue_win_op', None),
+                    ('a_queue_upd_idold', 0), ('a_queue_upd_idnew', 0),
+                    ('a_queue_upd_actv', False), ('a_queue_rem_actv', False),
+                    ('a_radio_fav_upd_idold', 0), ('a_radio_fav_upd_idnew', 0),
+                    ('a_mudb_upd_idold', 0), ('a_mudb_upd_idnew', 0),
+                    ('a_grp_play', lambda mc, idx: GrpPlayState()),
+                    ('a_play_queue_size', 0), ('a_queue_art_uri', lambda mc, idx: []),
+                    ('a_event2_last', None),
+                    ('a_zone_ev_sub1', None), ('a_zone_ev_sub2', None), ('a_zone_ev_sub3', None),
+                    ('a_zone_ev_sub4', None), ('a_zone_ev_sub5', None),
+                    ('a_sleep_time_val', None))
+
+    def __init__(self, a_zone_ip=None, str_reg_file=''):
         """
 
         :param a_zone_ip:
+        :param str_reg_file: file of device registry, '': not persistent, None: default file in home directory
         """
         print('--- CoSoCoW Init ---')
 
@@ -58,6 +121,9 @@ class CoSoCoW(object):
             # setup zone topology (stereo pair combined as sub list)
             self.a_zone_ip = [['192.168.178.24', '192.168.178.23'], '192.168.178.25']
 
+        # trace log (deferred formatting, levels per subsystem, ring buffer of recent records, see add_trace)
+        self.trace_log = TraceLog(fn_print=lambda str_print, idx_lvl: self.set_cmd_print(str_print))
+
         # control settings
         self.idx_verbosity_lvl = 3
         self.b_zone_ev_sub1_prnt = False
@@ -82,25 +148,28 @@ class CoSoCoW(object):
         self.a_radio_fav_name = ''
         self.a_radio_fav_upd_idnew = []
         self.a_radio_fav_upd_idold = []
-        self.a_radio_is_adv = [0, 0]
+        self.a_radio_is_adv = []
         self.a_mudb_upd_idnew = []
         self.a_mudb_upd_idold = []
         self.a_mudb_items = []
         self.a_mudb_items_name = []
         self.a_mudb_tracks = []
         self.a_mudb_tracks_name = []
-        self.a_play_state = []
-        self.a_play_track = []
-        self.a_play_track_sub = []
-        self.a_play_track_meta = []
-        self.a_play_is_radio = []
-        self.a_play_is_auxin = []
-        self.a_play_is_mudb = []
-        self.a_play_track_idx = []
-        self.a_play_mode = []
-        self.a_play_trans_state = []
-        self.a_play_trans_status = []
-        self.a_play_is_valid = []
+        # play state is kept once per group at the coordinator, a_play_* are per zone views of it
+        self.a_grp_play = []
+        self.a_play_state = GrpPlayView(self, 'play_state')
+        self.a_play_track = GrpPlayView(self, 'play_track')
+        self.a_play_track_sub = GrpPlayView(self, 'play_track_sub')
+        self.a_play_track_meta = GrpPlayView(self, 'play_track_meta')
+        self.a_play_is_radio = GrpPlayView(self, 'play_is_radio')
+        self.a_play_is_auxin = GrpPlayView(self, 'play_is_auxin')
+        self.a_play_is_mudb = GrpPlayView(self, 'play_is_mudb')
+        self.a_play_track_idx = GrpPlayView(self, 'play_track_idx')
+        self.a_play_mode = GrpPlayView(self, 'play_mode')
+        self.a_play_trans_state = GrpPlayView(self, 'play_trans_state')
+        self.a_play_trans_status = GrpPlayView(self, 'play_trans_status')
+        self.a_play_is_valid = GrpPlayView(self, 'play_is_valid')
+        self.a_play_art_uri = GrpPlayView(self, 'play_art_uri')
         self.a_play_queue_size = []
         self.a_queue_rem_actv = []
         self.a_queue_upd_actv = []
@@ -122,38 +191,268 @@ class CoSoCoW(object):
         self.ca0_b_init = True
         self.ca0_ct_init = 5
 
+        # device registry (speaker capabilities, persistent)
+        if str_reg_file is None:
+            str_reg_file = os.path.join(os.path.expanduser('~'), '.cosocow_registry.json')
+        self.dev_reg = DevRegistry(str_reg_file)
+        self.th_dev_reval = None
+
+        # state history recorder (optional, see set_hist_rec)
+        self.hist_rec = None
+
+        # state push stream for remote clients (optional, see set_state_stream)
+        self.state_stream = None
+
+        # state export to shared memory for other processes (optional, see set_state_shm)
+        self.state_shm = None
+
+        # event recorder (optional, see set_ev_rec)
+        self.ev_rec = None
+
+        # lean event decoder (optional, see set_ev_fast)
+        self.ev_decoder = None
+
+        # profiling window (optional, see set_prof)
+        self.prof = None
+
+        # action scheduler (optional, see set_sched)
+        self.sched = None
+
+        # listening log (optional, see set_listen_log)
+        self.listen_log = None
+
+        # album art cache (optional, see set_art_cache)
+        self.art_cache = None
+        self.num_art_prefetch = 5
+        self.a_queue_art_uri = []
+
+        # windowed queue access (see get_queue_window)
+        self.b_queue_full = True
+        self.num_queue_page = 100
+        self.num_queue_pages_max = 20
+        self.a_queue_win = []
+        self.a_queue_win_op = []
+        self.pool_queue_win = concurrent.futures.ThreadPoolExecutor(2)
+
+        # request scheduler (priority lanes per speaker)
+        self.req_sched = ReqSched()
+        self.num_bulk_page = 250
+
+        # call policy (timeouts, retries and error counters of speaker calls, see get_call)
+        self.call_policy = CallPolicy(fn_log=lambda str_msg: self.add_trace('call', 2, '%s', str_msg))
+        self.d_deadline_queue = 60.0  # whole queue read [sec]
+        self.d_deadline_mudb = 300.0  # whole music db read [sec]
+
+        # volume control (coalesced, cached volume level)
+        self.vol_ctrl = VolCtrl(self)
+        self.vol_fade = VolFadeEng(self)
+        self.a_group_volume = []
+
         # init event caller
-        self.ev_groups = EventCall()
+        self.ev_groups = EventCall(None)
         self.ev_volume = EventCall()
+        self.ev_group_volume = EventCall()
         self.ev_balance = EventCall()
         self.ev_radio_fav = EventCall()
         self.ev_play_state = EventCall()
         self.ev_play_track = EventCall()
         self.ev_play_track_sub = EventCall()
         self.ev_play_track_idx = EventCall()
+        self.ev_play_art = EventCall()
         self.ev_play_mode = EventCall()
+        self.ev_grp_play = EventCall(1, 2)  # zone: group members, kind: changed fields
+        self.b_play_ev_zone = True  # per zone play events (ev_play_*) in addition to ev_grp_play, False: opt out
         self.ev_queue_upd = EventCall()
+        self.ev_queue_win_upd = EventCall()
         self.ev_sleep_time_val = EventCall()
 
-        # initial method calls
+        # life cycle (see start, close)
+        self.lock_life = threading.Lock()
+        self.lock_zones = threading.RLock()  # zone set changes (see add_zone, remove_zone)
+        self.lock_topology = threading.Lock()  # one apply_topology at a time (b_group_cng_actv)
+        self.th_discover = None
+        self.b_discover = False
+        self.d_ready = None
+        self.d_timer = {}
+        self.b_closed = False
+
+        # initial method calls (no network access, see start)
         self.init_ctrl()
         self.init_arrays()
-        self.get_zone_avail()
-        self.get_groups()
+
+        print('--- CoSoCoW Init Finished ---')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """
+        start controller in background: zone probing, groups, cyclic threads (events, volumes, library)
+        :return: dict of readiness futures: 'zones' (list of futures per zone, result: zone available),
+                 'topology', 'volumes', 'favorites', 'library'
+        """
+        with self.lock_life:
+            if self.b_closed:
+                raise RuntimeError('CoSoCoW is closed')
+            if self.d_ready is None:
+                num_zones = len(self.a_zone_soco)
+                self.d_ready = {'zones': [concurrent.futures.Future() for _ in range(num_zones)]}
+                for str_key in ('topology', 'volumes', 'favorites', 'library'):
+                    self.d_ready[str_key] = concurrent.futures.Future()
+                th_start = threading.Thread(target=self.set_start, name='CoSoCoW-Start')
+                th_start.daemon = True
+                th_start.start()
+        return self.d_ready
+
+    def set_start(self):
+        """
+        start procedure (background thread of start)
+        """
+        num_zones = len(self.a_zone_soco)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max(1, min(8, num_zones))) as pool:
+                a_fut = [pool.submit(self.get_zone_avail_one, idx) for idx in range(num_zones)]
+                for idx_zone, fut in enumerate(a_fut):
+                    fut_ready = self.d_ready['zones'][idx_zone]
+                    try:
+                        result = fut.result()
+                    except Exception as err:
+                        result = err
+                    with self.lock_life:
+                        if fut_ready.done():
+                            continue  # cancelled by close
+                        if isinstance(result, Exception):
+                            fut_ready.set_exception(result)
+                        else:
+                            fut_ready.set_result(result)
+            if self.b_closed:
+                return
+            self.dev_reg.save()
+            self.set_dev_reval()
+
+            self.get_groups()
+            self.set_ready('topology', self.get_topology())
+        except Exception as err:
+            self.add_trace('main', 1, ' :x start failed: %s', err)
+            self.set_ready('topology', err)
+            return
 
         # initial call of cyclic threads
         self.cyclic_thread_0()
         self.cyclic_thread_1()
         self.cyclic_thread_2()
 
-        print('--- CoSoCoW Init Finished ---')
+    def set_ready(self, str_key, result=None):
+        """
+        set readiness future of subsystem
+        :param str_key:
+        :param result: result or exception
+        """
+        if self.d_ready is None:
+            return
+        fut = self.d_ready.get(str_key)
+        with self.lock_life:
+            if fut is None or fut.done():
+                return  # already set or cancelled by close
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    def chk_ready(self, str_key):
+        """
+        check if readiness future of subsystem is done (True if not started)
+        :param str_key:
+        :return:
+        """
+        if self.d_ready is None:
+            return True
+        fut = self.d_ready.get(str_key)
+        return fut is None or fut.done()
 
-    def __del__(self):
+    def set_cyclic(self, d_time, fn_cyclic):
         """
+        schedule next call of cyclic thread
+        :param d_time: cycle time [sec]
+        :param fn_cyclic:
+        """
+        with self.lock_life:
+            if self.b_closed:
+                return
+            timer = threading.Timer(d_time, fn_cyclic)
+            timer.name = 'CoSoCoW-' + fn_cyclic.__name__  # grouped in profile samples
+            self.d_timer[fn_cyclic.__name__] = timer
+            timer.start()
 
+    def close(self):
         """
+        stop cyclic threads, unsubscribe all events and release connections and workers
+        """
+        with self.lock_life:
+            if self.b_closed:
+                return
+            self.b_closed = True
+            a_timer = list(self.d_timer.values())
+            self.d_timer = {}
+        for timer in a_timer:
+            timer.cancel()
+            if timer is not threading.current_thread():
+                timer.join(5)
+        if self.sched is not None:
+            self.sched.close()
+
+        for num_srv, str_srv, str_name, str_fn in self.A_ZONE_EV:
+            a_zone_ev_sub = getattr(self, 'a_zone_ev_sub' + str(num_srv))
+            for idx, ev_sub in enumerate(a_zone_ev_sub):
+                if ev_sub is not None:
+                    try:
+                        ev_sub.unsubscribe()
+                    except:
+                        pass
+                    a_zone_ev_sub[idx] = None
+
+        self.vol_ctrl.close()
+        self.vol_fade.close()
+        self.pool_queue_win.shutdown(wait=False)
+        self.call_policy.close()
+        if self.art_cache is not None:
+            self.art_cache.close()
+        if self.listen_log is not None:
+            self.listen_log.close()
+        if self.ev_rec is not None:
+            self.ev_rec.close()
+        if self.ev_decoder is not None:
+            EvDecoder.set_hook(None)
+        if self.prof is not None:
+            self.prof.stop()
+        if self.state_stream is not None:
+            self.state_stream.close()
+        if self.state_shm is not None:
+            self.state_shm.close()
+        self.dev_reg.save()
+
+        if self.d_ready is not None:
+            with self.lock_life:
+                for fut in self.d_ready['zones'] + [fut for key, fut in self.d_ready.items() if key != 'zones']:
+                    if not fut.cancel() and not fut.done():
+                        fut.set_exception(RuntimeError('CoSoCoW is closed'))
         print('close connection')
 
+    @property
+    def idx_verbosity_lvl(self):
+        """
+        console level of all subsystems (see set_trace_lvl)
+        """
+        return self.trace_log.idx_lvl_def
+
+    @idx_verbosity_lvl.setter
+    def idx_verbosity_lvl(self, idx_lvl):
+        self.trace_log.set_lvl(idx_lvl)
+
     def get_cmd_info(self, str_print, idx_verb_info):
         """
         create message in console
@@ -161,8 +460,130 @@ class CoSoCoW(object):
         :param idx_verb_info:
         """
         if self.idx_verbosity_lvl >= idx_verb_info:
-            str_cur_time = str(datetime.datetime.time(datetime.datetime.now()))
-            print(str_cur_time + ' ' + str_print)
+            self.set_cmd_print(str_print)
+
+    def set_cmd_print(self, str_print):
+        """
+        print message with time in console (console output of get_cmd_info and of all trace records, see add_trace)
+        :param str_print:
+        """
+        str_cur_time = str(datetime.datetime.time(datetime.datetime.now()))
+        print(str_cur_time + ' ' + str_print)
+
+    def add_trace(self, str_sub, idx_lvl, str_fmt, *args):
+        """
+        add trace record, the message is formatted only if printed or read from ring buffer
+        :param str_sub: subsystem (TraceLog.A_SUB)
+        :param idx_lvl: level (0: error, 1: info, 2: detail, 3: debug, 4: trace)
+        :param str_fmt: message format ('%' operator)
+        :param args: arguments of format (not changed afterwards)
+        """
+        self.trace_log.add(str_sub, idx_lvl, str_fmt, *args)
+
+    def chk_trace(self, str_sub, idx_lvl):
+        """
+        check if trace records of subsystem and level are taken (to skip expensive arguments)
+        :param str_sub:
+        :param idx_lvl:
+        :return:
+        """
+        return self.trace_log.chk(str_sub, idx_lvl)
+
+    def set_trace_lvl(self, idx_lvl=None, str_sub=None, idx_lvl_ring=None):
+        """
+        set trace level at runtime
+        :param idx_lvl: console level, None: unchanged
+        :param str_sub: subsystem, None: all subsystems
+        :param idx_lvl_ring: ring buffer level, None: unchanged
+        :return: [console level, ring level]
+        """
+        self.trace_log.set_lvl(idx_lvl, str_sub, idx_lvl_ring)
+        return self.trace_log.get_lvl(str_sub)
+
+    def get_trace(self, num_max=None, str_sub=None, idx_lvl=None):
+        """
+        get recent trace records of ring buffer
+        :param num_max: max. number of records (newest), None: all
+        :param str_sub: subsystem, None: all
+        :param idx_lvl: max. level, None: all
+        :return: list of lines (oldest first)
+        """
+        return self.trace_log.get_records(num_max, str_sub, idx_lvl)
+
+    def set_trace_dump(self, str_file=None, b_err=None):
+        """
+        dump trace ring buffer now or set dump on error records
+        :param str_file: file (appended), None: stderr
+        :param b_err: None: dump now, True/False: dump automatically on error records (level 0)
+        :return: number of dumped records
+        """
+        if b_err is None:
+            return self.trace_log.set_dump(str_file)
+        self.trace_log.str_dump_file = str_file
+        self.trace_log.b_dump_err = b_err
+        return 0
+
+    def get_req_slot(self, z_req, idx_prio=None):
+        """
+        get request slot of speaker for required priority class
+        :param z_req: speaker object
+        :param idx_prio: priority class (ReqSched.PRIO_...), default is interactive
+        :return: context manager holding the slot
+        """
+        if idx_prio is None:
+            idx_prio = ReqSched.PRIO_INTERACTIVE
+        return self.req_sched.slot(z_req.ip_address, idx_prio)
+
+    def get_call(self, z_req, str_cls, str_op, fn, idx_prio=None):
+        """
+        call speaker holding a request slot, with timeout, retries and error counters of the call policy
+        :param z_req: speaker object
+        :param str_cls: operation class of call policy ('read', 'bulk', 'probe', 'write')
+        :param str_op: operation name
+        :param fn: method without arguments doing the call
+        :param idx_prio: priority class (ReqSched.PRIO_...), default is interactive
+        :return: result of fn
+        """
+        if self.b_closed:
+            raise CallRejected('CoSoCoW is closed')  # no network access after close
+        return self.call_policy.call(str_cls, str_op, fn, z_req.ip_address,
+                                     lambda: self.get_req_slot(z_req, idx_prio))
+
+    def get_call_stat(self):
+        """
+        get error counters of speaker calls
+        :return: see CallPolicy.get_stat
+        """
+        return self.call_policy.get_stat()
+
+    def get_bulk_pages(self, z_req, fn_page, num_max_items, fn_add=None):
+        """
+        get items page by page in the bulk lane, yield to interactive work between the pages
+        :param z_req: speaker object
+        :param fn_page: method to get one page, called with (idx_start, num_items)
+        :param num_max_items: max. number of items
+        :param fn_add: method called with each page (pages are not collected then)
+        :return: list of items
+        """
+        a_items = []
+        str_op = getattr(fn_page, '__name__', 'page')
+        with self.get_req_slot(z_req, ReqSched.PRIO_BULK):
+            idx_start = 0
+            while idx_start < num_max_items:
+                num_items = min(self.num_bulk_page, num_max_items - idx_start)
+                if self.b_closed:
+                    raise CallRejected('CoSoCoW is closed')
+                a_page = self.call_policy.call('bulk', str_op, lambda: fn_page(idx_start, num_items), z_req.ip_address)
+                if fn_add is None:
+                    a_items.extend(a_page)
+                else:
+                    fn_add(a_page)
+                if len(a_page) < num_items:
+                    break
+                idx_start = idx_start + num_items
+                if self.req_sched.set_yield(z_req.ip_address):
+                    self.add_trace('queue', 4, ' :3 bulk transfer preempted: %s', z_req.ip_address)
+        return a_items
 
     def chk_str(self, var_in, b_adapt=False):
         """
@@ -213,89 +634,35 @@ class CoSoCoW(object):
 
     def init_arrays(self):
         """
-
+        size per zone state arrays to the number of zones (new zones get initial values)
         """
         num_zones = len(self.a_zone_soco)
-
-        if len(self.a_zone_name) != num_zones:
-            self.a_zone_name = [''] * num_zones
-
-        if len(self.a_volume) != num_zones:
-            self.a_volume = [0] * num_zones
-        if len(self.a_balance) != num_zones:
-            self.a_balance = [0] * num_zones
-
-        if len(self.a_queue_play_list) != num_zones:
-            self.a_queue_play_list = [0] * num_zones
-        if len(self.a_queue_play_mode) != num_zones:
-            self.a_queue_play_mode = [0] * num_zones
-
-        if len(self.a_queue_upd_idold) != num_zones:
-            self.a_queue_upd_idold = [0] * num_zones
-        if len(self.a_queue_upd_idnew) != num_zones:
-            self.a_queue_upd_idnew = [0] * num_zones
-        if len(self.a_queue_upd_actv) != num_zones:
-            self.a_queue_upd_actv = [False] * num_zones
-        if len(self.a_queue_rem_actv) != num_zones:
-            self.a_queue_rem_actv = [False] * num_zones
-
-        if len(self.a_radio_fav_upd_idold) != num_zones:
-            self.a_radio_fav_upd_idold = [0] * num_zones
-        if len(self.a_radio_fav_upd_idnew) != num_zones:
-            self.a_radio_fav_upd_idnew = [0] * num_zones
-
-        if len(self.a_mudb_upd_idold) != num_zones:
-            self.a_mudb_upd_idold = [0] * num_zones
-        if len(self.a_mudb_upd_idnew) != num_zones:
-            self.a_mudb_upd_idnew = [0] * num_zones
-
-        if len(self.a_play_track) != num_zones:
-            self.a_play_track = [0] * num_zones
-        if len(self.a_play_track_meta) != num_zones:
-            self.a_play_track_meta = [0] * num_zones
-        if len(self.a_play_is_radio) != num_zones:
-            self.a_play_is_radio = [0] * num_zones
-        if len(self.a_play_is_auxin) != num_zones:
-            self.a_play_is_auxin = [0] * num_zones
-        if len(self.a_play_is_mudb) != num_zones:
-            self.a_play_is_mudb = [0] * num_zones
-        if len(self.a_play_track_idx) != num_zones:
-            self.a_play_track_idx = [0] * num_zones
-        if len(self.a_play_mode) != num_zones:
-            self.a_play_mode = [0] * num_zones
-        if len(self.a_play_trans_state) != num_zones:
-            self.a_play_trans_state = [0] * num_zones
-        if len(self.a_play_trans_status) != num_zones:
-            self.a_play_trans_status = ['N/A'] * num_zones
-        if len(self.a_play_is_valid) != num_zones:
-            self.a_play_is_valid = [0] * num_zones
-        if len(self.a_play_queue_size) != num_zones:
-            self.a_play_queue_size = [0] * num_zones
-        if len(self.a_play_track_sub) != num_zones:
-            self.a_play_track_sub = [0] * num_zones
-        if len(self.a_play_state) != num_zones:
-            self.a_play_state = [0] * num_zones
-
-        if len(self.a_event2_last) != num_zones:
-            self.a_event2_last = [None] * num_zones
-        if len(self.a_zone_ev_sub1) != num_zones:
-            self.a_zone_ev_sub1 = [None] * num_zones
-        if len(self.a_zone_ev_sub2) != num_zones:
-            self.a_zone_ev_sub2 = [None] * num_zones
-        if len(self.a_zone_ev_sub3) != num_zones:
-            self.a_zone_ev_sub3 = [None] * num_zones
-        if len(self.a_zone_ev_sub4) != num_zones:
-            self.a_zone_ev_sub4 = [None] * num_zones
-        if len(self.a_zone_ev_sub5) != num_zones:
-            self.a_zone_ev_sub5 = [None] * num_zones
-
-        if len(self.a_sleep_time_val) != num_zones:
-            self.a_sleep_time_val = [None] * num_zones
+        for str_attr, init in self.A_ZONE_ARRAY:
+            a_val = getattr(self, str_attr)
+            if len(a_val) > num_zones:
+                del a_val[num_zones:]
+            for idx in range(len(a_val), num_zones):
+                a_val.append(init(self, idx) if callable(init) else init)
 
     def cyclic_thread_0(self):
         """
         cyclic thread 0 for main tasks (ts = 100 ms)
         """
+        if self.b_closed:
+            return
+        try:
+            with self.lock_zones:
+                self.cyclic_task_0()
+        except Exception as err:
+            self.add_trace('main', 0, ' :x cyclic task 0 failed: %s', err)
+        finally:
+            # cycle timer
+            self.set_cyclic(0.1, self.cyclic_thread_0)
+
+    def cyclic_task_0(self):
+        """
+        tasks of cyclic thread 0
+        """
         if self.ca0_b_init:
             # init procedure
             self.ca0_b_init = False
@@ -310,6 +677,7 @@ class CoSoCoW(object):
                 self.get_sleep_timer(-2)
                 self.get_volume(-1, True)
                 self.get_balance(-1, True)
+                self.set_ready('volumes', list(self.a_volume))
                 self.ca0_cnt1 = self.ca0_cnt1 + 1
             else:
                 pass
@@ -318,40 +686,394 @@ class CoSoCoW(object):
             self.get_zone_events()
             self.get_groups()
 
-        # cycle timer
-        threading.Timer(0.1, self.cyclic_thread_0).start()
-
     def cyclic_thread_1(self):
         """
         cyclic thread 1: for updating queue, music db and favorites (ts = 100 ms)
         """
+        if self.b_closed:
+            return
+        try:
+            with self.lock_zones:
+                self.cyclic_task_1()
+        except Exception as err:
+            self.add_trace('main', 0, ' :x cyclic task 1 failed: %s', err)
+        finally:
+            self.set_cyclic(0.1, self.cyclic_thread_1)
+
+    def cyclic_task_1(self):
+        """
+        tasks of cyclic thread 1
+        """
+        # first read of favorites and library, also if no update id changes (quiet household)
+        try:
+            if not self.chk_ready('favorites') and self.get_zone(0) is not None:
+                self.get_radio_fav()
+                self.set_ready('favorites', list(self.a_radio_fav_name))
+            if not self.chk_ready('library') and self.get_zone(0) is not None:
+                self.get_mudb_list(0)
+                self.set_ready('library')
+        except Exception as err:
+            # read is repeated in next cycle
+            self.add_trace('queue', 0, ' :3 first read of favorites / library failed: %s', err)
+
         num_zones = len(self.a_zone_soco)
         for idx in range(num_zones):
+            try:
+                self.cyclic_task_1_zone(idx)
+            except Exception as err:
+                # update is repeated in next cycle, other zones are updated
+                self.add_trace('queue', 0, ' :3 update of Z%s failed: %s', idx, err)
 
-            # Update Queue
-            if self.a_queue_upd_idnew[idx] != self.a_queue_upd_idold[idx]:
+    def cyclic_task_1_zone(self, idx):
+        """
+        tasks of cyclic thread 1 for one zone
+        :param idx: index of zone
+        """
+        # Update Queue
+        if self.a_queue_upd_idnew[idx] != self.a_queue_upd_idold[idx]:
+            if self.b_queue_full:
                 self.get_play_queue(idx)
-                self.a_queue_upd_idold[idx] = self.a_queue_upd_idnew[idx]
-                self.a_queue_upd_actv[idx] = False
+            else:
+                self.get_queue_upd(idx)
+            self.a_queue_upd_idold[idx] = self.a_queue_upd_idnew[idx]
+            self.a_queue_upd_actv[idx] = False
+
+        # Update favorite radios
+        if self.a_radio_fav_upd_idnew[idx] != self.a_radio_fav_upd_idold[idx]:
+            self.get_radio_fav()
+            self.a_radio_fav_upd_idold[idx] = self.a_radio_fav_upd_idnew[idx]
+            self.set_ready('favorites', list(self.a_radio_fav_name))
+
+        # Update music db
+        if self.a_mudb_upd_idold[idx] != self.a_mudb_upd_idnew[idx]:
+            self.get_mudb_list(0)
+            self.a_mudb_upd_idold[idx] = self.a_mudb_upd_idnew[idx]
+            self.set_ready('library')
 
-            # Update favorite radios
-            if self.a_radio_fav_upd_idnew[idx] != self.a_radio_fav_upd_idold[idx]:
-                self.get_radio_fav()
-                self.a_radio_fav_upd_idold[idx] = self.a_radio_fav_upd_idnew[idx]
+    def cyclic_thread_2(self):
+        """
+        cyclic thread 2: for sleep timer count (ts = 1 sec)
+        """
+        if self.b_closed:
+            return
+        try:
+            with self.lock_zones:
+                self.get_sleep_timer()
+        except Exception as err:
+            self.add_trace('main', 0, ' :x cyclic task 2 failed: %s', err)
+        finally:
+            self.set_cyclic(1, self.cyclic_thread_2)
+
+    def set_hist_rec(self, b_actv=True, num_size=4096):
+        """
+        switch state history recorder on or off
+        :param b_actv:
+        :param num_size: number of records per zone and state field
+        :return: HistRecorder object (query API) or None
+        """
+        if b_actv:
+            if self.hist_rec is None or self.hist_rec.num_size != num_size:
+                self.hist_rec = HistRecorder(num_size)
+        else:
+            self.hist_rec = None
+        return self.hist_rec
 
-            # Update music db
-            if self.a_mudb_upd_idold[idx] != self.a_mudb_upd_idnew[idx]:
-                self.get_mudb_list(0)
-                self.a_mudb_upd_idold[idx] = self.a_mudb_upd_idnew[idx]
+    def set_ev_rec(self, str_file=None):
+        """
+        switch event recorder on or off, all received zone events are appended to the log file
+        :param str_file: log file (json lines, gzip if ending with .gz), None: recorder off
+        :return: EvRecorder object or None
+        """
+        if self.ev_rec is not None:
+            self.ev_rec.close()
+            self.ev_rec = None
+        if str_file is not None:
+            d_dev = {}
+            for z_req in self.a_zone_soco:
+                for z_req_sub in (z_req if isinstance(z_req, list) else [z_req]):
+                    d_dev[z_req_sub.ip_address] = self.dev_reg.get_dev(z_req_sub.ip_address) or {}
+            self.ev_rec = EvRecorder(str_file, {'version': 1, 'zones': self.a_zone_ip, 'dev': d_dev})
+        return self.ev_rec
+
+    def set_ev_fast(self, b_actv=True, b_all=False):
+        """
+        switch lean event decoder on or off (replaces the soco event parser for all subscriptions of the process)
+        :param b_actv:
+        :param b_all: decode all LastChange fields (e.g. for event recording of other fields), otherwise A_EV_FIELD
+        :return: EvDecoder object or None (also if soco has no event parser to replace)
+        """
+        self.ev_decoder = EvDecoder(None if b_all else self.A_EV_FIELD) if b_actv else None
+        if not EvDecoder.set_hook(self.ev_decoder):
+            self.ev_decoder = None
+        return self.ev_decoder
 
-        threading.Timer(0.1, self.cyclic_thread_1).start()
+    def set_prof(self, str_mode='sample', d_duration=30.0, str_file=None, b_mem=False, d_interval=0.005):
+        """
+        open profiling window on the running instance, the report is written to file at the end of the window
+        :param str_mode: 'time': timing of handlers per zone and event type, 'sample': + stack sampling,
+                         'det': + cProfile of outermost handler calls, None: close window now
+        :param d_duration: length of window [sec], None: until set_prof(None)
+        :param str_file: report file, None: file in temp. directory
+        :param b_mem: track allocations (tracemalloc)
+        :param d_interval: sampling interval [sec]
+        :return: report file
+        """
+        str_file_old = None
+        if self.prof is not None:
+            str_file_old = self.prof.stop()
+        if str_mode is None:
+            return str_file_old
+        self.prof = RunProfiler(self, str_mode, str_file, b_mem, d_interval)
+        self.prof.start(d_duration)
+        return self.prof.str_file
+
+    def get_prof_report(self):
+        """
+        get report of current or last profiling window
+        :return: text, None: no profiling window
+        """
+        if self.prof is None:
+            return None
+        return self.prof.get_report()
 
-    def cyclic_thread_2(self):
+    def set_sched(self, b_actv=True, str_file=None):
         """
-        cyclic thread 2: for sleep timer count (ts = 1 sec)
+        switch action scheduler on or off
+        :param b_actv:
+        :param str_file: rule file, None: default file in home directory, '': not persistent
+        :return: ActionSched object or None
+        """
+        if self.sched is not None:
+            self.sched.close()
+            self.sched = None
+        if b_actv:
+            if str_file is None:
+                str_file = os.path.join(os.path.expanduser('~'), '.cosocow_sched.json')
+            self.sched = ActionSched(self, str_file)
+        return self.sched
+
+    def add_sched(self, a_act, d_at=None, d_every=None, str_cron=None, str_id=None, str_misfire='skip',
+                  d_grace=300.0):
+        """
+        add scheduled actions (scheduler is switched on with default file if off), see ActionSched.add
+        e.g. radio in zone 1 at 6:30 with volume 15 on work days:
+        add_sched([['set_volume', [1, 'value', 15]], ['set_radio_play', [1, 'Radio X']]], str_cron='30 6 * * 1-5')
+        :param a_act: actions, list of [command, args] or [command, args, kwargs]
+        :param d_at: one-shot time (epoch or local time 'YYYY-MM-DD HH:MM' / 'HH:MM'), with d_every: first run
+        :param d_every: interval [sec]
+        :param str_cron: cron expression 'minute hour day_of_month month day_of_week'
+        :param str_id: id of rule (replaces rule), None: new id
+        :param str_misfire: 'skip': drop runs later than d_grace (e.g. after suspend), 'run': run once
+        :param d_grace: [sec]
+        :return: id of rule
+        """
+        if self.sched is None:
+            self.set_sched()
+        return self.sched.add(a_act, d_at, d_every, str_cron, str_id, str_misfire, d_grace)
+
+    def rem_sched(self, str_id):
         """
-        self.get_sleep_timer()
-        threading.Timer(1, self.cyclic_thread_2).start()
+        remove scheduled actions
+        :param str_id: id of rule
+        :return: True if found
+        """
+        return self.sched is not None and self.sched.remove(str_id)
+
+    def get_sched(self):
+        """
+        get scheduled actions
+        :return: list of rules, next run first
+        """
+        return [] if self.sched is None else self.sched.get_rules()
+
+    def subscribe(self, fn, a_ev, a_zone=None, a_kind=None, b_weak=None):
+        """
+        subscribe to events of zones and kinds only, e.g. bedroom panel (zone 2):
+        sub = mc.subscribe(panel.set_volume, ['volume', 'balance'], a_zone=2)
+        kinds: ev_grp_play: changed fields (play_track, play_state, ...), ev_state (see set_state_stream): state field
+        :param fn: callback, called with the arguments of the event
+        :param a_ev: event names (or one name), e.g. 'volume' or 'ev_volume'
+        :param a_zone: zone indices (or one index), None: all zones (ev_grp_play: any member of the group)
+        :param a_kind: event kinds (or one kind), None: all kinds
+        :param b_weak: hold callback by weak reference, None: bound methods only (ends with their object)
+        :return: EventSub object (cancel() ends the subscription of all events)
+        """
+        return EventCall.subscribe_obj(self, fn, a_ev, a_zone, a_kind, b_weak)
+
+    def set_state_stream(self, b_actv=True, num_port=None, str_host='127.0.0.1', num_hist=4096):
+        """
+        switch state push stream on or off
+        :param b_actv:
+        :param num_port: tcp port to serve stream clients, None: no server (see get_state_since)
+        :param str_host: address to listen on, '': all interfaces (no authentication)
+        :param num_hist: number of deltas kept to resume clients
+        :return: StateStream object or None
+        """
+        if self.state_stream is not None:
+            self.state_stream.close()
+            self.state_stream = None
+        if b_actv:
+            self.state_stream = StateStream(self, num_hist)
+            if num_port is not None:
+                self.state_stream.serve(str_host, num_port)
+        return self.state_stream
+
+    def set_state_shm(self, b_actv=True, str_file=None, num_zones_max=64, num_str_size=256 * 1024, num_mode=0o600):
+        """
+        switch state export to shared memory on or off (readers: StateShmReader)
+        :param b_actv:
+        :param str_file: file of shared memory, None: cosocow_state-<uid> in /dev/shm
+        :param num_zones_max: number of zone records
+        :param num_str_size: size of string table (track titles, names) [bytes]
+        :param num_mode: file permissions (0o600: readers of same user only, 0o644: all users)
+        :return: StateShm object or None
+        """
+        if self.state_shm is not None:
+            self.state_shm.close()
+            self.state_shm = None
+        if b_actv:
+            self.state_shm = StateShm(self, str_file, num_zones_max, num_str_size, num_mode)
+            self.add_trace('main', 1, ' :s state shm: %s', self.state_shm.str_file)
+        return self.state_shm
+
+    def get_state_since(self, num_seq=None):
+        """
+        get state changes since sequence number (pull mode of state stream)
+        :param num_seq: last received sequence number, None: full snapshot
+        :return: message dict: snapshot or deltas
+        """
+        if self.state_stream is None:
+            self.set_state_stream()
+        return self.state_stream.get_since_msg(num_seq)
+
+    def set_art_cache(self, b_actv=True, str_dir=None, num_mem_max=16 * 1024 * 1024,
+                      num_disk_max=256 * 1024 * 1024):
+        """
+        switch album art cache on or off
+        :param b_actv:
+        :param str_dir: directory of disk cache, None: default directory in home directory, '': no disk cache
+        :param num_mem_max: max. size of memory cache [byte]
+        :param num_disk_max: max. size of disk cache [byte]
+        :return: ArtCache object or None
+        """
+        if self.art_cache is not None:
+            self.art_cache.close()
+            self.art_cache = None
+        if b_actv:
+            if str_dir is None:
+                str_dir = os.path.join(os.path.expanduser('~'), '.cosocow_art')
+            self.art_cache = ArtCache(str_dir, num_mem_max, num_disk_max, self.req_sched)
+            for idx_zone in range(len(self.a_play_art_uri)):
+                self.set_art_prefetch(idx_zone)
+        return self.art_cache
+
+    def get_art_uri(self, z_req, obj_didl):
+        """
+        get absolute album art uri of DIDL object
+        :param z_req: speaker object (base address of relative uri)
+        :param obj_didl:
+        :return: uri or ''
+        """
+        str_uri = getattr(obj_didl, 'album_art_uri', '')
+        if not str_uri:
+            return ''
+        if not re.match(r'^https?://', str_uri):
+            str_uri = 'http://{}:1400'.format(z_req.ip_address) + ('' if str_uri.startswith('/') else '/') + str_uri
+        return str_uri
+
+    def get_play_art(self, idx_zone=0, b_wait=True):
+        """
+        get album art of current track
+        :param idx_zone:
+        :param b_wait: download if not in cache
+        :return: image data (bytes) or None
+        """
+        str_uri = self.a_play_art_uri[idx_zone]
+        if not str_uri or self.art_cache is None:
+            return None
+        return self.art_cache.get_art(str_uri, b_wait)
+
+    def get_queue_art(self, idx_zone=0, idx_row=0, b_wait=True):
+        """
+        get album art of queue entry
+        :param idx_zone:
+        :param idx_row: index of queue entry (0: first entry)
+        :param b_wait: download if not in cache
+        :return: image data (bytes) or None
+        """
+        a_uri = self.a_queue_art_uri[idx_zone]
+        if self.art_cache is None or idx_row < 0 or idx_row >= len(a_uri) or not a_uri[idx_row]:
+            return None
+        return self.art_cache.get_art(a_uri[idx_row], b_wait)
+
+    def set_art_prefetch(self, idx_zone):
+        """
+        prefetch album art of current track and next queue entries of zone
+        :param idx_zone:
+        """
+        if self.art_cache is None:
+            return
+        a_uri = [self.a_play_art_uri[idx_zone]]
+        if not self.a_play_is_radio[idx_zone] and not self.a_play_is_auxin[idx_zone]:
+            idx_row = max(0, int(self.a_play_track_idx[idx_zone]))  # current track index starts with 1
+            if self.b_queue_full:
+                a_uri.extend(self.a_queue_art_uri[idx_zone][idx_row:idx_row + self.num_art_prefetch])
+            else:
+                a_uri.extend(self.a_queue_win[idx_zone].get_window(idx_row, self.num_art_prefetch, False)[1])
+        self.art_cache.set_prefetch([str_uri for str_uri in a_uri if str_uri])
+
+    def set_listen_log(self, str_db_file=None):
+        """
+        switch listening log on (sqlite data base file) or off (None)
+        :param str_db_file:
+        :return: ListenLog object (query API) or None
+        """
+        if self.listen_log is not None:
+            if str_db_file == self.listen_log.str_db_file:
+                return self.listen_log
+            self.listen_log.close()
+            self.listen_log = None
+        if str_db_file is not None:
+            self.listen_log = ListenLog(str_db_file)
+        return self.listen_log
+
+    def set_listen_upd(self, idx_zone):
+        """
+        pass current play state of zone to listening log
+        :param idx_zone:
+        """
+        if self.a_play_is_radio[idx_zone]:
+            str_src_type = 'radio'
+        elif self.a_play_is_auxin[idx_zone]:
+            str_src_type = 'aux'
+        elif self.a_play_is_mudb[idx_zone]:
+            str_src_type = 'mudb'
+        else:
+            str_src_type = ''
+
+        idx_coo = self.get_zone_co_idx(idx_zone)
+        if idx_coo is not None:
+            str_group = ','.join(self.a_zone_name[idx] for idx in self.a_groups[idx_coo])
+        else:
+            str_group = ''
+
+        self.listen_log.set_zone_state(idx_zone, self.a_zone_name[idx_zone], str_group, str_src_type,
+                                       self.a_play_track[idx_zone], self.a_play_track_sub[idx_zone],
+                                       self.a_play_trans_state[idx_zone] == 'PLAYING')
+
+    def set_state_upd(self, idx_zone, str_field, value):
+        """
+        notify state change of zone
+        :param idx_zone:
+        :param str_field: name of state field (e.g. 'volume', 'trans_state')
+        :param value: new value
+        """
+        if self.hist_rec is not None:
+            self.hist_rec.add(idx_zone, str_field, value)
+        if self.state_stream is not None:
+            self.state_stream.set_upd(idx_zone, str_field, value)
+        if self.state_shm is not None:
+            self.state_shm.set_upd(idx_zone, str_field, value)
 
     def get_zone(self, idx_zone=-1):
         """
@@ -397,39 +1119,387 @@ class CoSoCoW(object):
         return z_out
 
     def get_zone_avail(self):
-        self.a_zone_name = []
-        self.a_zone_avail = []
-        for z_req in self.a_zone_soco:
+        """
+        get available zones, known speakers are taken from the device registry
+        and revalidated in background
+        :return:
+        """
+        b_reval = False
+        for idx_zone in range(len(self.a_zone_soco)):
+            b_reval = self.get_zone_avail_one(idx_zone) == 'registry' or b_reval
+
+        self.dev_reg.save()
+
+        if b_reval:
+            self.set_dev_reval()
+        return self.a_zone_avail
+
+    def get_zone_avail_one(self, idx_zone):
+        """
+        get availability of one zone
+        :param idx_zone:
+        :return: 'registry' (known zone, to be revalidated), True: available, False: not available
+        """
+        z_req = self.a_zone_soco[idx_zone]
+        if isinstance(z_req, list):
+            a_z_req_sub = z_req
+        else:
+            a_z_req_sub = [z_req]
+
+        a_dev = [self.dev_reg.get_dev(z_req_sub.ip_address) for z_req_sub in a_z_req_sub]
+        if None not in a_dev:
+            # known zone
+            self.a_zone_name[idx_zone] = a_dev[-1]['zone_name']
+            self.a_zone_avail[idx_zone] = True
+            self.add_trace('zone', 2, '%s : %s (registry)', z_req, a_dev[-1]['zone_name'])
+            return 'registry'
+
+        try:
+            for z_req_sub in a_z_req_sub:
+                str_zone_name = self.get_dev_info(z_req_sub, a_z_req_sub)
+            self.a_zone_name[idx_zone] = str_zone_name
+            self.a_zone_avail[idx_zone] = True
+            return True
+        except:
+            self.a_zone_name[idx_zone] = ''
+            self.a_zone_avail[idx_zone] = False
+            print('Zone not Avail: ' + str(z_req))
+            return False
+
+    def get_dev_info(self, z_req, a_z_req_pair=None):
+        """
+        get speaker info and store it in the device registry
+        :param z_req: speaker object
+        :param a_z_req_pair: speaker objects of the zone (stereo pair)
+        :return: zone name
+        """
+        s_sp_info = self.get_call(z_req, 'probe', 'get_speaker_info', lambda: z_req.get_speaker_info(
+            timeout=self.call_policy.get_timeout('probe')), ReqSched.PRIO_STATE_SYNC)
+        str_zone_name = s_sp_info.get('zone_name')
+        str_player = s_sp_info.get('model_name')
+        self.add_trace('zone', 2, '%s : %s', z_req, str_zone_name)
+        self.add_trace('zone', 2, '%s : %s', z_req, str_player)
+
+        if a_z_req_pair is not None and len(a_z_req_pair) > 1:
+            a_ip_pair = [z_req_sub.ip_address for z_req_sub in a_z_req_pair]
+        else:
+            a_ip_pair = None
+        self.dev_reg.set_dev(z_req.ip_address, s_sp_info.get('uid'), zone_name=str_zone_name,
+                             model_name=str_player, pair=a_ip_pair)
+        return str_zone_name
+
+    def set_dev_reval(self, b_wait=False):
+        """
+        revalidate the device registry in background (zone names, availability, aux sources)
+        :param b_wait: wait until revalidation is finished
+        """
+        if self.th_dev_reval is None or not self.th_dev_reval.is_alive():
+            self.th_dev_reval = threading.Thread(target=self.get_dev_reval, name='CoSoCoW-DevReval')
+            self.th_dev_reval.daemon = True
+            self.th_dev_reval.start()
+        if b_wait:
+            self.th_dev_reval.join()
+
+    def get_dev_reval(self):
+        """
+        revalidate the device registry (background thread)
+        """
+        with self.lock_zones:
+            a_zone_soco = list(self.a_zone_soco)
+        for idx_zone, z_req in enumerate(a_zone_soco):
             if isinstance(z_req, list):
+                a_z_req_sub = z_req
+            else:
+                a_z_req_sub = [z_req]
+
+            try:
+                for z_req_sub in a_z_req_sub:
+                    str_zone_name = self.get_dev_info(z_req_sub, a_z_req_sub)
+                b_avail = True
+            except:
+                str_zone_name = None
+                b_avail = False
+
+            with self.lock_zones:
+                if idx_zone >= len(self.a_zone_soco) or self.a_zone_soco[idx_zone] is not z_req:
+                    continue  # zone set changed during request
+                if str_zone_name is None:
+                    str_zone_name = self.a_zone_name[idx_zone]
+                if b_avail != self.a_zone_avail[idx_zone]:
+                    self.a_zone_avail[idx_zone] = b_avail
+                    self.set_state_upd(idx_zone, 'zone_avail', b_avail)
+                    if not b_avail:
+                        print('Zone not Avail: ' + str(z_req))
+                if str_zone_name != self.a_zone_name[idx_zone]:
+                    self.add_trace('zone', 2, ' :x zone name: Z%s: %s', idx_zone, str_zone_name)
+                    self.a_zone_name[idx_zone] = str_zone_name
+                    self.set_state_upd(idx_zone, 'zone_name', str_zone_name)
+
+        self.get_aux_avail_all(True)
+        self.dev_reg.save()
+
+    def add_zone(self, z_ip_address):
+        """
+        add zone at runtime
+        :param z_ip_address: ip address or list of ip addresses (stereo pair)
+        :return: index of zone
+        """
+        a_ip = [z_ip_address] if isinstance(z_ip_address, str) else list(z_ip_address)
+        with self.lock_zones:
+            for idx_zone, z_ip_cur in enumerate(self.a_zone_ip):
+                if set(a_ip) & set([z_ip_cur] if isinstance(z_ip_cur, str) else z_ip_cur):
+                    return idx_zone
+
+            if isinstance(z_ip_address, str):
+                self.a_zone_soco.append(SoCo(z_ip_address))
+            else:
+                self.a_zone_soco.append([SoCo(str_ip) for str_ip in a_ip])
+            self.a_zone_ip.append(z_ip_address)
+            self.init_arrays()
+            idx_zone = len(self.a_zone_soco) - 1
+            self.add_trace('zone', 1, ' :z add zone: Z%s: %s', idx_zone, z_ip_address)
+
+            b_avail = self.get_zone_avail_one(idx_zone)
+            self.dev_reg.save()
+            if self.d_ready is not None:
+                fut = concurrent.futures.Future()
+                fut.set_result(b_avail)
+                self.d_ready['zones'].append(fut)
+            self.set_zone_cng()
+        return idx_zone
+
+    def remove_zone(self, idx_zone):
+        """
+        remove zone at runtime, zones behind get index - 1
+        :param idx_zone:
+        """
+        with self.lock_zones:
+            if not 0 <= idx_zone < len(self.a_zone_soco):
+                raise IndexError('zone index out of range')
+            self.add_trace('zone', 1, ' :z remove zone: Z%s: %s', idx_zone, self.a_zone_ip[idx_zone])
+            self.set_zone_unsubscribe(idx_zone)
+
+            # stop volume changes and fades of zone, zones behind get index - 1
+            self.vol_fade.set_zone_remove(idx_zone)
+            self.vol_ctrl.set_zone_remove(idx_zone)
+            if self.listen_log is not None:
+                self.listen_log.set_zone_remove(idx_zone)
+            if self.hist_rec is not None:
+                self.hist_rec.set_zone_remove(idx_zone)
+
+            del self.a_zone_soco[idx_zone]
+            del self.a_zone_ip[idx_zone]
+            for str_attr, init in self.A_ZONE_ARRAY:
+                del getattr(self, str_attr)[idx_zone]
+            for grp in self.a_grp_play:
+                grp.a_member = [idx - (idx > idx_zone) for idx in grp.a_member if idx != idx_zone]
+            if self.d_ready is not None:
+                del self.d_ready['zones'][idx_zone]
+            self.set_zone_cng()
+
+    def set_zone_ip(self, idx_zone, z_ip_address):
+        """
+        change ip address of zone (e.g. new DHCP address, zone becomes stereo pair)
+        :param idx_zone:
+        :param z_ip_address: ip address or list of ip addresses (stereo pair)
+        """
+        with self.lock_zones:
+            self.add_trace('zone', 1, ' :z zone ip: Z%s: %s -> %s', idx_zone, self.a_zone_ip[idx_zone], z_ip_address)
+            self.set_zone_unsubscribe(idx_zone)
+            if isinstance(z_ip_address, str):
+                z_entry = SoCo(z_ip_address)
+            else:
+                z_entry = [SoCo(str_ip) for str_ip in z_ip_address]
+            self.a_zone_soco[idx_zone] = z_entry
+            self.a_zone_ip[idx_zone] = z_ip_address
+            self.a_queue_win[idx_zone].fn_fetch = self.get_queue_page_fn(idx_zone)
+            self.a_queue_win[idx_zone].set_inval(0, self.a_play_queue_size[idx_zone])
+            self.get_zone_avail_one(idx_zone)
+            self.dev_reg.save()
+            self.set_zone_cng()
+
+    def set_zone_unsubscribe(self, idx_zone):
+        """
+        unsubscribe events of zone
+        :param idx_zone:
+        """
+        for num_srv, str_srv, str_name, str_fn in self.A_ZONE_EV:
+            a_zone_ev_sub = getattr(self, 'a_zone_ev_sub' + str(num_srv))
+            if a_zone_ev_sub[idx_zone] is not None:
                 try:
-                    for z_req_sub in z_req:
-                        s_sp_info = z_req_sub.get_speaker_info(timeout=3)
-                        str_zone_name = s_sp_info.get('zone_name')
-                        str_player = s_sp_info.get('model_name')
-                        self.get_cmd_info(str(z_req_sub) + ' : ' + str_zone_name,2)
-                        self.get_cmd_info(str(z_req_sub) + ' : ' + str_player, 2)
-                        #model_name
-                    self.a_zone_name.append(str_zone_name)
-                    self.a_zone_avail.append(True)
+                    a_zone_ev_sub[idx_zone].unsubscribe()
                 except:
-                    self.a_zone_name.append('')
-                    self.a_zone_avail.append(False)
-                    print('Zone not Avail: ' + str(z_req))
+                    pass
+                a_zone_ev_sub[idx_zone] = None
 
-            else:
+    def set_zone_cng(self):
+        """
+        update after change of zone set
+        """
+        self.a_groups_chk = []
+        self.get_groups()
+        self.b_evsub4_addturn = True
+        if self.state_stream is not None:
+            self.state_stream.set_reset()
+        if self.state_shm is not None:
+            self.state_shm.set_reset()
+
+    def get_discover(self, str_addr='239.255.255.250', num_port=1900, d_timeout=2.0):
+        """
+        search speakers by SSDP
+        :param str_addr: address of search request (multicast address or address of a local responder)
+        :param num_port:
+        :param d_timeout: time to collect responses [sec]
+        :return: list of ip addresses
+        """
+        str_msg = '\r\n'.join(['M-SEARCH * HTTP/1.1', 'HOST: ' + str_addr + ':' + str(num_port),
+                                'MAN: "ssdp:discover"', 'MX: 1', 'ST: urn:schemas-upnp-org:device:ZonePlayer:1',
+                                '', ''])
+        a_ip = set()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+            sock.sendto(str_msg.encode('ascii'), (str_addr, num_port))
+            d_time_end = time.time() + d_timeout
+            while True:
+                d_wait = d_time_end - time.time()
+                if d_wait <= 0:
+                    break
+                sock.settimeout(d_wait)
                 try:
-                    s_sp_info = z_req.get_speaker_info(timeout=3)
-                    str_zone_name = s_sp_info.get('zone_name')
-                    str_player = s_sp_info.get('model_name')
-                    self.get_cmd_info(str(z_req) + ' : ' + str_zone_name, 2)
-                    self.get_cmd_info(str(z_req) + ' : ' + str_player, 2)
-                    self.a_zone_name.append(str_zone_name)
-                    self.a_zone_avail.append(True)
+                    data, addr = sock.recvfrom(4096)
+                except socket.timeout:
+                    break
+                d_head = {}
+                for str_line in data.decode('utf-8', 'replace').split('\r\n')[1:]:
+                    if ':' in str_line:
+                        str_key, str_val = str_line.split(':', 1)
+                        d_head[str_key.strip().upper()] = str_val.strip()
+                if 'ZonePlayer' not in d_head.get('ST', '') and 'Sonos' not in d_head.get('SERVER', ''):
+                    continue
+                str_host = requests.compat.urlparse(d_head['LOCATION']).hostname if 'LOCATION' in d_head else None
+                a_ip.add(str_host or addr[0])
+        finally:
+            sock.close()
+        return sorted(a_ip)
+
+    def set_discover(self, b_actv=True, d_period=60.0, str_addr='239.255.255.250', num_port=1900,
+                     num_miss_max=3):
+        """
+        switch automatic zone discovery by SSDP on or off
+        :param b_actv:
+        :param d_period: time between searches [sec]
+        :param str_addr: address of search request
+        :param num_port:
+        :param num_miss_max: number of searches without answer until a zone is marked as not available
+        """
+        self.b_discover = b_actv
+        if b_actv and (self.th_discover is None or not self.th_discover.is_alive()):
+            def run():
+                d_miss = {}
+                while self.b_discover and not self.b_closed:
+                    try:
+                        self.get_discover_upd(self.get_discover(str_addr, num_port), d_miss, num_miss_max)
+                    except Exception as err:
+                        self.add_trace('zone', 1, ' :z discovery failed: %s', err)
+                    d_time_end = time.time() + d_period
+                    while self.b_discover and not self.b_closed and time.time() < d_time_end:
+                        time.sleep(min(0.5, d_period))
+
+            self.th_discover = threading.Thread(target=run, name='CoSoCoW-Discover')
+            self.th_discover.daemon = True
+            self.th_discover.start()
+
+    def get_discover_upd(self, a_ip, d_miss=None, num_miss_max=3):
+        """
+        apply search result to zone set: new speakers and stereo pairs are added, changed ip addresses are
+        updated, zones without answer are marked as not available after num_miss_max searches (zone indices
+        stay valid) and as available again with the next answer
+        :param a_ip: found ip addresses
+        :param d_miss: number of searches without answer per zone (kept by caller)
+        :param num_miss_max:
+        :return: dict of changes: 'add', 'ip', 'unavail', 'avail'
+        """
+        d_cng = {'add': [], 'ip': [], 'unavail': [], 'avail': []}
+        d_miss = {} if d_miss is None else d_miss
+
+        # speaker info of unknown speakers (without lock, network access)
+        with self.lock_zones:
+            s_ip_known = set()
+            for z_ip_cur in self.a_zone_ip:
+                s_ip_known.update([z_ip_cur] if isinstance(z_ip_cur, str) else z_ip_cur)
+            d_uid_ip = {}
+            for str_ip in s_ip_known:
+                dev = self.dev_reg.get_dev(str_ip)
+                if dev is not None and dev.get('uid') != str_ip:
+                    d_uid_ip[dev['uid']] = str_ip
+        for str_ip in a_ip:
+            dev = self.dev_reg.get_dev(str_ip)
+            if str_ip not in s_ip_known and (dev is None or 'zone_name' not in dev):
+                try:
+                    self.get_dev_info(SoCo(str_ip))
                 except:
-                    self.a_zone_name.append('')
-                    self.a_zone_avail.append(False)
-                    print('Zone not Avail: ' + str(z_req))
-        return self.a_zone_avail
+                    pass
+
+        with self.lock_zones:
+            d_ip_idx = {}
+            for idx_zone, z_ip_cur in enumerate(self.a_zone_ip):
+                for str_ip in ([z_ip_cur] if isinstance(z_ip_cur, str) else z_ip_cur):
+                    d_ip_idx[str_ip] = idx_zone
+
+            # new speakers: by registry pair or zone name
+            d_new = collections.OrderedDict()
+            for str_ip in a_ip:
+                if str_ip in d_ip_idx:
+                    continue
+                dev = self.dev_reg.get_dev(str_ip)
+                if dev is None or 'zone_name' not in dev:
+                    continue  # no speaker info
+                # speaker with new ip address
+                str_ip_old = d_uid_ip.get(dev.get('uid'))
+                if str_ip_old in d_ip_idx and str_ip_old not in a_ip:
+                    idx_zone = d_ip_idx.pop(str_ip_old)
+                    z_ip_cur = self.a_zone_ip[idx_zone]
+                    z_ip_new = str_ip if isinstance(z_ip_cur, str) else \
+                        [str_ip if x == str_ip_old else x for x in z_ip_cur]
+                    self.set_zone_ip(idx_zone, z_ip_new)
+                    d_ip_idx[str_ip] = idx_zone
+                    d_cng['ip'].append((idx_zone, z_ip_new))
+                    continue
+                key = tuple(sorted(dev['pair'])) if dev.get('pair') else dev.get('zone_name', str_ip)
+                d_new.setdefault(key, []).append(str_ip)
+
+            for key, a_ip_new in d_new.items():
+                # partner of existing single zone becomes stereo pair
+                idx_pair = None
+                for idx_zone, str_name in enumerate(self.a_zone_name):
+                    if str_name == key and isinstance(self.a_zone_ip[idx_zone], str):
+                        idx_pair = idx_zone
+                if idx_pair is not None:
+                    z_ip_new = [self.a_zone_ip[idx_pair]] + a_ip_new
+                    self.set_zone_ip(idx_pair, z_ip_new)
+                    d_cng['ip'].append((idx_pair, z_ip_new))
+                else:
+                    z_ip_new = a_ip_new[0] if len(a_ip_new) == 1 else sorted(a_ip_new)
+                    d_cng['add'].append((self.add_zone(z_ip_new), z_ip_new))
+
+            # zones without answer
+            for idx_zone, z_ip_cur in enumerate(self.a_zone_ip):
+                key = str(z_ip_cur)
+                if set([z_ip_cur] if isinstance(z_ip_cur, str) else z_ip_cur) & set(a_ip):
+                    if d_miss.pop(key, 0) >= num_miss_max and not self.a_zone_avail[idx_zone]:
+                        self.add_trace('zone', 1, ' :z zone answers again: Z%s: %s', idx_zone, z_ip_cur)
+                        self.a_zone_avail[idx_zone] = True
+                        self.set_state_upd(idx_zone, 'zone_avail', True)
+                        d_cng['avail'].append((idx_zone, z_ip_cur))
+                    continue
+                d_miss[key] = d_miss.get(key, 0) + 1
+                if d_miss[key] == num_miss_max and self.a_zone_avail[idx_zone]:
+                    self.add_trace('zone', 1, ' :z zone without answer: Z%s: %s', idx_zone, z_ip_cur)
+                    self.a_zone_avail[idx_zone] = False
+                    self.set_state_upd(idx_zone, 'zone_avail', False)
+                    d_cng['unavail'].append((idx_zone, z_ip_cur))
+        return d_cng
 
     def get_groups(self):
         """
@@ -437,6 +1507,27 @@ class CoSoCoW(object):
         :return:
         """
         num_zones = len(self.a_zone_soco)
+
+        # read group of each zone once
+        a_zone_grp = [None] * num_zones
+        for idx_zone in range(num_zones):
+            z_req = self.get_zone(idx_zone)
+            if z_req is not None:
+                try:
+                    z_grp = self.get_call(z_req, 'read', 'group', lambda: z_req.group, ReqSched.PRIO_STATE_SYNC)
+                except Exception:
+                    continue  # other zones are read
+                a_zone_grp[idx_zone] = [z_grp.members, z_grp.coordinator]
+
+        # zone without answer: group reported by another member, otherwise standalone
+        for idx_zone in range(num_zones):
+            z_req = self.get_zone(idx_zone)
+            if z_req is not None and a_zone_grp[idx_zone] is None:
+                a_zone_grp[idx_zone] = next((a_grp for a_grp in a_zone_grp if a_grp is not None and z_req in a_grp[0]),
+                                            [[z_req], z_req])
+
+        a_group_co_old = self.a_group_co
+        a_groups_old = self.a_groups
         self.a_groups = []
         self.a_group_co = [None] * num_zones
 
@@ -450,11 +1541,11 @@ class CoSoCoW(object):
 
                     z_req2 = self.get_zone(idx_zone2)
                     if z_req2 is not None:
-                        if z_req1 in z_req2.group.members:
+                        if z_req1 in a_zone_grp[idx_zone2][0]:
                             # is grouped
                             a_grp_cur.append(idx_zone2)
 
-                        if z_req1.group.coordinator == z_req2:
+                        if a_zone_grp[idx_zone1][1] == z_req2:
                             # get coordinator
                             self.a_group_co[idx_zone1] = idx_zone2
 
@@ -465,6 +1556,16 @@ class CoSoCoW(object):
 
             self.a_groups.append(a_grp_cur)
 
+        for idx_zone in range(num_zones):
+            if idx_zone >= len(a_group_co_old) or a_group_co_old[idx_zone] != self.a_group_co[idx_zone]:
+                self.set_state_upd(idx_zone, 'group_co', self.a_group_co[idx_zone])
+                # group volume is not sent by events: cached level of changed group is not known anymore
+                idx_coo = self.a_group_co[idx_zone]
+                if idx_coo is not None and idx_coo < len(self.a_group_volume):
+                    self.set_volume_cache(idx_coo, -1, True)
+            if idx_zone >= len(a_groups_old) or a_groups_old[idx_zone] != self.a_groups[idx_zone]:
+                self.set_state_upd(idx_zone, 'group_members', list(self.a_groups[idx_zone]))
+
         self.ev_groups(self.a_groups, self.a_group_co)
         return [self.a_groups, self.a_group_co]
 
@@ -484,35 +1585,173 @@ class CoSoCoW(object):
 
         if str_action == 'Join':
             # z_req_join joins z_req_main
-            self.get_cmd_info(' # Join Grp: ' + str(idx_join_zone) + ' -> ' + str(idx_main_zone), 2)
-            z_req_join.join(z_req_main)
-            self.get_cmd_info(' # Join Grp: done', 2)
+            self.add_trace('group', 2, ' # Join Grp: %s -> %s', idx_join_zone, idx_main_zone)
+            self.get_call(z_req_join, 'write', 'join', lambda: z_req_join.join(z_req_main))
+            self.add_trace('group', 2, ' # Join Grp: done')
         elif str_action == 'UnJoin':
             # z_req_main unjoin from its group
-            self.get_cmd_info(' # UnJoin Grp: ' + str(idx_main_zone), 2)
-            z_req_main.unjoin()
-            self.get_cmd_info(' # UnJoin Grp: done', 2)
+            self.add_trace('group', 2, ' # UnJoin Grp: %s', idx_main_zone)
+            self.get_call(z_req_main, 'write', 'unjoin', z_req_main.unjoin)
+            self.add_trace('group', 2, ' # UnJoin Grp: done')
         elif str_action == 'CngCo':
-            # z_req_main unjoin from its group
+            # coordinator of group of z_req_main is handed over to z_req_join
             if self.a_groups[idx_main_zone].count(idx_join_zone) > 0:
                 if self.a_group_co[idx_main_zone] != idx_join_zone:
-                    self.get_cmd_info(' # Change Grp Co: ' + str(idx_main_zone) + ' -> ' + str(idx_join_zone), 2)
-                    self.b_group_cng_actv = True
-                    z_req_coo = self.get_zone(self.a_group_co[idx_main_zone])
-                    z_req_coo.unjoin()
-                    z_req_coo.join(z_req_join)
-                    self.b_group_cng_actv = False
-                    self.get_cmd_info(' # Change Grp Co: done', 2)
+                    self.add_trace('group', 2, ' # Change Grp Co: %s -> %s', idx_main_zone, idx_join_zone)
+                    a_target = self.get_topology()
+                    for a_grp in a_target:
+                        if idx_join_zone in a_grp:
+                            a_grp.remove(idx_join_zone)
+                            a_grp.insert(0, idx_join_zone)
+                    self.apply_topology(a_target)
+                    self.add_trace('group', 2, ' # Change Grp Co: done')
+
+    def get_topology(self):
+        """
+        get current group topology
+        :return: list of groups, each a list of zone indices with the coordinator first
+        """
+        a_topo = []
+        for idx_coo in sorted(set(idx for idx in self.a_group_co if idx is not None)):
+            a_topo.append([idx_coo] + [idx for idx in self.a_groups[idx_coo] if idx != idx_coo])
+        return a_topo
 
-    def get_radio_fav(self, idx_zone=0):
+    def get_topology_target(self, a_target):
         """
-        get favorite radio stations
-        :param idx_zone:
-        :return:
+        get target coordinator per zone
+        :param a_target: list of groups (coordinator first), 'party': all zones in one group, 'split': no groups
+        :return: list of coordinator index per zone, None: zone not available
         """
-        z_req = self.get_zone(idx_zone)
-        if z_req is not None:
-            a_radio_fav = z_req.music_library.get_favorite_radio_stations()
+        num_zones = len(self.a_zone_soco)
+        a_idx_avail = [idx for idx in range(num_zones) if self.a_zone_avail[idx]]
+        if a_target == 'party':
+            idx_coo = self.a_group_co[a_idx_avail[0]] if len(a_idx_avail) > 0 else None
+            a_target = [[idx_coo] + [idx for idx in a_idx_avail if idx != idx_coo]] if idx_coo is not None else []
+        elif a_target == 'split':
+            a_target = [[idx] for idx in a_idx_avail]
+
+        a_target_co = [idx if self.a_zone_avail[idx] else None for idx in range(num_zones)]
+        for a_grp in a_target:
+            a_grp = [idx for idx in a_grp if self.a_zone_avail[idx]]
+            for idx in a_grp:
+                a_target_co[idx] = a_grp[0]
+        return a_target_co
+
+    def get_topology_plan(self, a_target):
+        """
+        get minimal operations to reach target topology from current topology
+        :param a_target: see get_topology_target
+        :return: list of stages, operations of a stage are independent, handoffs in an own first stage:
+                 ('handoff', idx_coo, idx_coo_new),
+                 ('unjoin', idx_zone), ('join', idx_zone, idx_coo)
+        """
+        a_target_co = self.get_topology_target(a_target)
+        a_co = list(self.a_group_co)
+        num_zones = len(a_target_co)
+        a_stage_handoff = []
+        a_stage_leave = []
+        a_stage_join = []
+        a_stage_orphan = []
+
+        # new coordinator inside of current group of old coordinator: hand over, the group stays playing
+        for idx_coo in range(num_zones):
+            idx_coo_old = a_co[idx_coo]
+            if a_target_co[idx_coo] == idx_coo and idx_coo_old is not None and idx_coo_old != idx_coo \
+                    and a_target_co[idx_coo_old] == idx_coo:
+                a_stage_handoff.append(('handoff', idx_coo_old, idx_coo))
+                a_co = [idx_coo if idx == idx_coo_old else idx for idx in a_co]
+
+        for idx in range(num_zones):
+            idx_target_co = a_target_co[idx]
+            if idx_target_co is None or a_co[idx] == idx_target_co:
+                continue
+            if idx_target_co == idx:
+                # standalone or new coordinator
+                a_stage_leave.append(('unjoin', idx))
+                a_co[idx] = idx
+            else:
+                if a_co[idx] == idx:
+                    # remaining members get a coordinator chosen by the speakers
+                    a_co = [None if idx_m != idx and idx_co == idx else idx_co for idx_m, idx_co in enumerate(a_co)]
+                a_stage_join.append(('join', idx, idx_target_co))
+                a_co[idx] = idx_target_co
+
+        for idx in range(num_zones):
+            if a_co[idx] is None and a_target_co[idx] == idx:
+                a_stage_orphan.append(('unjoin', idx))
+
+        # hand over before unjoin / join of members of the same group (a stage runs concurrently)
+        return [a_stage for a_stage in (a_stage_handoff, a_stage_leave, a_stage_join, a_stage_orphan)
+                if len(a_stage) > 0]
+
+    def set_topology_op(self, op):
+        """
+        run one operation of topology plan
+        :param op:
+        """
+        z_req = self.get_zone(op[1])
+        if z_req is None:
+            return
+        self.add_trace('group', 2, ' # Topology: %s', op)
+        if op[0] == 'handoff':
+            z_req_coo = self.get_zone(op[2])
+            self.get_call(z_req, 'write', 'DelegateGroupCoordinationTo', lambda: z_req.avTransport.
+                          DelegateGroupCoordinationTo([('InstanceID', 0), ('NewCoordinator', z_req_coo.uid),
+                                                       ('RejoinGroup', 1)]))
+        elif op[0] == 'unjoin':
+            self.get_call(z_req, 'write', 'unjoin', z_req.unjoin)
+        elif op[0] == 'join':
+            z_req_main = self.get_zone(op[2])
+            self.get_call(z_req, 'write', 'join', lambda: z_req.join(z_req_main))
+
+    def apply_topology(self, a_target, num_try=3):
+        """
+        set group topology with minimal operations, independent operations run concurrently,
+        group events are suppressed while active and groups are read once at the end
+        :param a_target: list of groups, each a list of zone indices with the coordinator first
+                         (e.g. [[0, 1, 2], [3]]), 'party': all zones in one group, 'split': no groups
+        :param num_try: max. number of plan rounds (speakers may pick coordinators of remaining members)
+        :return: True if target topology is reached
+        """
+        with self.lock_topology:
+            return self.set_topology(a_target, num_try)
+
+    def set_topology(self, a_target, num_try):
+        """
+        run topology plan rounds (see apply_topology, lock_topology held)
+        :param a_target:
+        :param num_try:
+        :return:
+        """
+        self.b_group_cng_actv = True
+        try:
+            for idx_try in range(num_try):
+                a_plan = self.get_topology_plan(a_target)
+                if len(a_plan) == 0:
+                    return True
+                for a_stage in a_plan:
+                    with concurrent.futures.ThreadPoolExecutor(min(8, len(a_stage))) as pool:
+                        for fut in [pool.submit(self.set_topology_op, op) for op in a_stage]:
+                            try:
+                                fut.result()
+                            except Exception as err:
+                                self.add_trace('group', 1, ' # Topology: failed: %s', err)
+                self.get_groups()
+            return len(self.get_topology_plan(a_target)) == 0
+        finally:
+            self.b_group_cng_actv = False
+            self.set_groups_sync()
+
+    def get_radio_fav(self, idx_zone=0):
+        """
+        get favorite radio stations
+        :param idx_zone:
+        :return:
+        """
+        z_req = self.get_zone(idx_zone)
+        if z_req is not None:
+            a_radio_fav = self.get_call(z_req, 'bulk', 'get_favorite_radio_stations',
+                                        z_req.music_library.get_favorite_radio_stations, ReqSched.PRIO_BULK)
             # get names of radios
             a_radio_fav_name = []
             for itRadio in a_radio_fav:
@@ -520,59 +1759,84 @@ class CoSoCoW(object):
                 a_radio_fav_name.append(strTitle)
             # if favorite list has changed
             if self.a_radio_fav != a_radio_fav:
-                self.get_cmd_info(' :3 get_radio_fav: new radios', 2)
+                self.add_trace('queue', 2, ' :3 get_radio_fav: new radios')
                 self.a_radio_fav = a_radio_fav
                 self.a_radio_fav_name = a_radio_fav_name
                 self.ev_radio_fav(idx_zone, a_radio_fav_name)
             else:
-                self.get_cmd_info(' :3 get_radio_fav: NO new radios', 2)
+                self.add_trace('queue', 2, ' :3 get_radio_fav: NO new radios')
 
     def get_mudb_tracks(self, idx_zone, idx_db_type, idx_item):
         """
-        get tracks from selected music db source type item
+        get tracks from selected music db source type item (replaces a_mudb_tracks and a_mudb_tracks_name)
         :param idx_zone:
         :param idx_db_type:
         :param idx_item:
         """
         z_req = self.get_zone(idx_zone)
         if z_req is not None:
-            self.a_mudb_tracks = z_req.music_library.get_tracks(self.a_mudb_items[idx_db_type][idx_item], 1000)
-            self.a_mudb_tracks_name = []
-            for mudb_track in self.a_mudb_tracks:
-                self.a_mudb_tracks_name.append(mudb_track.title)
+            item = self.a_mudb_items[idx_db_type][idx_item]
+            a_tracks = self.get_call(z_req, 'bulk', 'get_tracks', lambda: z_req.music_library.get_tracks(item, 1000),
+                                     ReqSched.PRIO_BULK)
+            mudb_tracks = MudbStore('tracks')
+            mudb_tracks.add_items(a_tracks)
+            mudb_tracks.set_compact()
+            self.a_mudb_tracks = mudb_tracks
+            self.a_mudb_tracks_name = mudb_tracks.get_names()
 
     def get_mudb_list(self, idx_zone):
         """
-        get music db source type items
+        get music db source type items (replaces a_mudb_items and a_mudb_items_name)
         :param idx_zone:
         """
         z_req = self.get_zone(idx_zone)
-        if z_req is not None:
+        if z_req is None:
+            return
 
-            self.a_mudb_items = []
-            self.a_mudb_items_name = []
+        with self.call_policy.deadline(self.d_deadline_mudb):
+            a_mudb_items = []
+            a_mudb_items_name = []
 
             for idx_db_type in range(3):
-                art1 = None
                 if idx_db_type == 0:
-                    self.get_cmd_info(' :3 get Music DB Artists', 2)
-                    art1a = z_req.music_library.get_artists(0, 1000)
-                    art1b = z_req.music_library.get_artists(1000, 1000)
-                    art1 = art1a + art1b
+                    self.add_trace('queue', 2, ' :3 get Music DB Artists')
+                    mudb_store = MudbStore('artists')
+                    self.get_bulk_pages(z_req, z_req.music_library.get_artists, 2000, mudb_store.add_items)
 
                 if idx_db_type == 1:
-                    self.get_cmd_info(' :3 get Music DB Album', 2)
-                    art1 = z_req.music_library.get_albums(0, 1000)
+                    self.add_trace('queue', 2, ' :3 get Music DB Album')
+                    mudb_store = MudbStore('albums')
+                    self.get_bulk_pages(z_req, z_req.music_library.get_albums, 1000, mudb_store.add_items)
 
                 if idx_db_type == 2:
-                    self.get_cmd_info(' :3 get Music DB Genre', 2)
-                    art1 = z_req.music_library.get_genres(0, 1000)
+                    self.add_trace('queue', 2, ' :3 get Music DB Genre')
+                    mudb_store = MudbStore('genres')
+                    self.get_bulk_pages(z_req, z_req.music_library.get_genres, 1000, mudb_store.add_items)
+
+                mudb_store.set_compact()
+                a_mudb_items.append(mudb_store)
+                a_mudb_items_name.append(mudb_store.get_names())
+
+            self.a_mudb_items = a_mudb_items
+            self.a_mudb_items_name = a_mudb_items_name
 
-                self.a_mudb_items.append(art1)
-                art_list = list()
-                for idx1 in range(0, len(art1)):
-                    art_list.append(art1[idx1].title)
-                self.a_mudb_items_name.append(art_list)
+    def get_mem_report(self):
+        """
+        get memory use of the data stores
+        :return: dict store name -> size [byte]
+        """
+        d_mem = {}
+        for mudb_store in list(self.a_mudb_items) + [self.a_mudb_tracks]:
+            if isinstance(mudb_store, MudbStore):
+                d_mem['mudb_' + mudb_store.str_name] = mudb_store.get_mem_size()
+        d_mem['queue_list'] = sum(sys.getsizeof(a_list) + sum(sys.getsizeof(str_title) for str_title in a_list)
+                                  for a_list in self.a_queue_play_list if isinstance(a_list, list))
+        d_mem['queue_win_rows'] = sum(queue_win.get_mem_num() for queue_win in self.a_queue_win)
+        if self.hist_rec is not None:
+            d_mem['hist_rec'] = self.hist_rec.get_mem_size()
+        if self.art_cache is not None:
+            d_mem['art_mem'] = self.art_cache.get_stat()['mem_size']
+        return d_mem
 
     def add_mudb_queue_item(self, idx_zone=0, idx_type=0, idx_item=0):
         """
@@ -583,7 +1847,10 @@ class CoSoCoW(object):
         """
         z_req = self.get_zone(idx_zone)
         if z_req is not None:
-            z_req.add_to_queue(self.a_mudb_items[idx_type][idx_item])
+            # items are added at the end of the queue
+            self.a_queue_win_op[idx_zone] = [max(0, self.a_play_queue_size[idx_zone] - 1), None]
+            item = self.a_mudb_items[idx_type][idx_item]
+            self.get_call(z_req, 'write', 'add_to_queue', lambda: z_req.add_to_queue(item))
 
     def rem_mudb_queue_item(self, idx_zone=0, idx_type=0, idx_row=0):
         """
@@ -593,50 +1860,68 @@ class CoSoCoW(object):
         :param idx_row:
         """
         z_req = self.get_zone(idx_zone)
-        if z_req is not None:
+        if z_req is None:
+            return
+
+        with self.get_req_slot(z_req):
             if idx_type < 0:
-                z_req.clear_queue()
+                self.a_queue_win_op[idx_zone] = [0, -self.a_play_queue_size[idx_zone]]
+                self.get_call(z_req, 'write', 'clear_queue', z_req.clear_queue)
             else:
                 self.a_queue_rem_actv[idx_zone] = True
                 if isinstance(idx_row, list):
-                    for idx in idx_row:
-                        z_req.remove_from_queue(int(idx))
-                        self.get_cmd_info(' Remove Item from Queue: ' + str(idx), 2)
+                    a_idx_rem = [int(idx) for idx in idx_row]
+                    self.a_queue_win_op[idx_zone] = [min(a_idx_rem) if a_idx_rem else 0, -len(a_idx_rem)]
+                    for idx in a_idx_rem:
+                        self.get_call(z_req, 'write', 'remove_from_queue', lambda: z_req.remove_from_queue(idx))
+                        self.add_trace('queue', 2, ' Remove Item from Queue: %s', idx)
                 else:
                     if idx_row < 0:
                         idx_row = 0
-                    z_req.remove_from_queue(int(idx_row))
-                    self.get_cmd_info(' Remove Item from Queue: ' + str(idx_row), 2)
+                    self.a_queue_win_op[idx_zone] = [int(idx_row), -1]
+                    self.get_call(z_req, 'write', 'remove_from_queue', lambda: z_req.remove_from_queue(int(idx_row)))
+                    self.add_trace('queue', 2, ' Remove Item from Queue: %s', idx_row)
                 self.a_queue_rem_actv[idx_zone] = False
 
-    def get_aux_avail_all(self):
+    def get_aux_avail_all(self, b_probe=False):
         """
         get all available aux sources
+        :param b_probe: probe all speakers, otherwise line in of known speakers is taken from device registry
         """
         num_zones = len(self.a_zone_soco)
-        self.a_aux_avail_name = []
-        self.a_aux_avail_src = []
+        a_aux_avail_name = []
+        a_aux_avail_src = []
 
         for idxZ in range(num_zones):
 
             z_req = self.get_zone(idxZ)
             if z_req is not None:
                 z_req_all = self.a_zone_soco[idxZ]
-                if isinstance(z_req_all, list):
-                    for z_req_sub in z_req_all:
-                        str_name, str_type = self.get_aux_avail(z_req_sub)
-                        if str_type == 'AudioComponent':
-                            aux_tmp = [str_name, z_req_sub]
-                            self.a_aux_avail_name.append(str_name)
-                            self.a_aux_avail_src.append(z_req_sub)
-                            self.get_cmd_info(' :x Aux: ' + str(aux_tmp), 2)
-                else:
-                    str_type, str_name = self.get_aux_avail(z_req_all)
+                if not isinstance(z_req_all, list):
+                    z_req_all = [z_req_all]
+
+                for z_req_sub in z_req_all:
+                    dev = self.dev_reg.get_dev(z_req_sub.ip_address)
+                    if b_probe or dev is None or dev.get('line_in_type') is None:
+                        try:
+                            str_name, str_type = self.get_aux_avail(z_req_sub)
+                        except:
+                            self.add_trace('zone', 2, ' :x Aux: can not probe %s', z_req_sub)
+                            continue
+                        self.dev_reg.set_dev(z_req_sub.ip_address, line_in_name=str_name, line_in_type=str_type)
+                    else:
+                        str_name = dev.get('line_in_name')
+                        str_type = dev.get('line_in_type')
+
                     if str_type == 'AudioComponent':
-                        aux_tmp = [str_name, z_req_all]
-                        self.a_aux_avail_name.append(str_name)
-                        self.a_aux_avail_src.append(z_req_all)
-                        self.get_cmd_info(' :x Aux: ' + str(aux_tmp), 2)
+                        aux_tmp = [str_name, z_req_sub]
+                        a_aux_avail_name.append(str_name)
+                        a_aux_avail_src.append(z_req_sub)
+                        self.add_trace('zone', 2, ' :x Aux: %s', aux_tmp)
+
+        self.a_aux_avail_name = a_aux_avail_name
+        self.a_aux_avail_src = a_aux_avail_src
+        self.dev_reg.save()
 
     def get_aux_avail(self, z_req):
         """
@@ -650,7 +1935,9 @@ class CoSoCoW(object):
             h1, b1 = z_req.deviceProperties.build_command('GetAudioInputAttributes')
             h1['SOAPACTION'] = h1.get('SOAPACTION').replace('DeviceProperties', 'AudioIn')
             b1 = b1.replace('DeviceProperties', 'AudioIn')
-            response = requests.post(base_url + control_url, headers=h1, data=b1.encode('utf-8'))
+            response = self.get_call(z_req, 'probe', 'GetAudioInputAttributes', lambda: requests.post(
+                base_url + control_url, headers=h1, data=b1.encode('utf-8'),
+                timeout=self.call_policy.get_timeout('probe')), ReqSched.PRIO_BULK)
             str_aux_name = self.str_split(response.text, '<CurrentName>', '</CurrentName>')
             str_aux_type = self.str_split(response.text, '<CurrentIcon>', '</CurrentIcon>')
             return str_aux_name, str_aux_type
@@ -665,8 +1952,9 @@ class CoSoCoW(object):
         if z_req is not None:
             z_aux = self.a_aux_avail_src[idx_aux]
 
-            z_req.switch_to_line_in(z_aux)
-            z_req.play()
+            with self.get_req_slot(z_req):
+                self.get_call(z_req, 'write', 'switch_to_line_in', lambda: z_req.switch_to_line_in(z_aux))
+                self.get_call(z_req, 'write', 'play', z_req.play)
 
     def set_radio_play(self, idx_zone=0, str_radio=None, idx_radio=None):
         """
@@ -687,15 +1975,15 @@ class CoSoCoW(object):
                 if str_radio in self.a_radio_fav_name:
                     idx_radio = self.a_radio_fav_name.index(str_radio)
                 else:
-                    self.get_cmd_info(' :x Can not find radio: ' + str_radio, 2)
+                    self.add_trace('play', 2, ' :x Can not find radio: %s', str_radio)
                     return
 
             str_uri_play = self.a_radio_fav[idx_radio].get_uri()
             try:
-                z_req.play_uri(str_uri_play, "", str_radio)
-                self.get_cmd_info(' :x set_radio: ' + str_radio, 2)
+                self.get_call(z_req, 'write', 'play_uri', lambda: z_req.play_uri(str_uri_play, "", str_radio))
+                self.add_trace('play', 2, ' :x set_radio: %s', str_radio)
             except:
-                self.get_cmd_info(' :x Can not play radio: ' + str_radio, 2)
+                self.add_trace('play', 2, ' :x Can not play radio: %s', str_radio)
 
     def set_queue_track_play(self, idx_zone=0, idx_row=1):
         """
@@ -703,18 +1991,20 @@ class CoSoCoW(object):
         :param idx_zone:
         :param idx_row:
         """
-        self.get_cmd_info('PlayQueue:' + str(idx_zone) + ' T:' + str(idx_row), 2)
+        self.add_trace('play', 2, 'PlayQueue:%s T:%s', idx_zone, idx_row)
         z_req = self.get_zone(idx_zone)
         if z_req is not None:
-            trans_info = z_req.get_current_transport_info()
-            str_trans_state = trans_info['current_transport_state']
-            if str_trans_state != 'TRANSITIONING':
-                try:
-                    z_req.play_from_queue(idx_row)
-                except:
-                    self.get_cmd_info('set_queue_track_play: Can not play!', 2)
-            else:
-                self.get_cmd_info('set_queue_track_play: Just in TRANSITIONING', 2)
+            with self.get_req_slot(z_req):
+                trans_info = self.get_call(z_req, 'read', 'get_current_transport_info',
+                                           z_req.get_current_transport_info)
+                str_trans_state = trans_info['current_transport_state']
+                if str_trans_state != 'TRANSITIONING':
+                    try:
+                        self.get_call(z_req, 'write', 'play_from_queue', lambda: z_req.play_from_queue(idx_row))
+                    except:
+                        self.add_trace('play', 2, 'set_queue_track_play: Can not play!')
+                else:
+                    self.add_trace('play', 2, 'set_queue_track_play: Just in TRANSITIONING')
 
     def set_play_start_stop(self, idx_zone=0, idx_play=-1):
         """
@@ -725,28 +2015,32 @@ class CoSoCoW(object):
         """
         idx_co = self.get_zone_co_idx(idx_zone)
         z_req = self.get_zone(idx_co)
-        if z_req is not None:
+        if z_req is None:
+            return
+
+        with self.get_req_slot(z_req):
             if idx_play == -1:
-                trans_info = z_req.get_current_transport_info()
+                trans_info = self.get_call(z_req, 'read', 'get_current_transport_info',
+                                           z_req.get_current_transport_info)
                 str_trans_state = trans_info['current_transport_state']
                 if str_trans_state != 'TRANSITIONING':
                     if str_trans_state == 'PLAYING':
-                        z_req.pause()
+                        self.get_call(z_req, 'write', 'pause', z_req.pause)
                     else:
                         try:
-                            z_req.play()
+                            self.get_call(z_req, 'write', 'play', z_req.play)
                         except:
-                            self.get_cmd_info('set_play_start_stop: Can not play!', 2)
+                            self.add_trace('play', 2, 'set_play_start_stop: Can not play!')
                 else:
-                    self.get_cmd_info('set_play_start_stop: Just in TRANSITIONING', 2)
+                    self.add_trace('play', 2, 'set_play_start_stop: Just in TRANSITIONING')
 
             elif idx_play == 0:
-                z_req.pause()
+                self.get_call(z_req, 'write', 'pause', z_req.pause)
             elif idx_play == 1:
                 try:
-                    z_req.play()
+                    self.get_call(z_req, 'write', 'play', z_req.play)
                 except:
-                    self.get_cmd_info('set_play_start_stop: Can not play!', 2)
+                    self.add_trace('play', 2, 'set_play_start_stop: Can not play!')
 
     def set_play_track_next(self, idx_zone=0, str_dir='Next'):
         """
@@ -756,7 +2050,7 @@ class CoSoCoW(object):
         """
         if self.a_play_is_mudb[idx_zone]:
             # mudb is playing
-            self.get_cmd_info(' : Change track to: ' + str(idx_zone) + ': ' + str(str_dir), 2)
+            self.add_trace('play', 2, ' : Change track to: %s: %s', idx_zone, str_dir)
 
             z_req = self.get_zone(idx_zone)
             if str_dir == 'Next':
@@ -764,14 +2058,14 @@ class CoSoCoW(object):
                         or (self.a_play_mode[idx_zone].find('NOREPEAT') == -1
                             and self.a_play_mode[idx_zone] != 'NORMAL'):
 
-                    z_req.next()
+                    self.get_call(z_req, 'write', 'next', z_req.next)
 
             elif str_dir == 'Prev':
                 if int(self.a_play_track_idx[idx_zone]) > 1 \
                         or (self.a_play_mode[idx_zone].find('NOREPEAT') == -1
                             and self.a_play_mode[idx_zone] != 'NORMAL'):
 
-                    z_req.previous()
+                    self.get_call(z_req, 'write', 'previous', z_req.previous)
 
     def get_volume(self, idx_zone=-1, b_init=False):
         """
@@ -789,15 +2083,17 @@ class CoSoCoW(object):
                 if z_req is None:
                     d_vol_cur = -1  # zone not available
                 else:
-                    if isinstance(z_req, list):
-                        d_vol_cur = z_req[0].volume
-                    else:
-                        d_vol_cur = z_req.volume
+                    try:
+                        d_vol_cur = self.get_call(z_req, 'read', 'volume', lambda: z_req.volume,
+                                                  ReqSched.PRIO_STATE_SYNC)
+                    except Exception:
+                        continue  # keep last value, other zones are updated
 
                 if d_vol_cur != self.a_volume[idx_z_cur] or b_init:
                     self.a_volume[idx_z_cur] = d_vol_cur
+                    self.set_state_upd(idx_z_cur, 'volume', d_vol_cur)
                     self.ev_volume(idx_z_cur, d_vol_cur)  # call external method
-                    self.get_cmd_info(' :1 get_volume: Z' + str(idx_z_cur) + ': ' + str(d_vol_cur), 2)
+                    self.add_trace('sound', 2, ' :1 get_volume: Z%s: %s', idx_z_cur, d_vol_cur)
 
             return self.a_volume
 
@@ -807,51 +2103,132 @@ class CoSoCoW(object):
             if z_req is None:
                 return -1  # zone not available
 
-            if isinstance(z_req, list):
-                d_vol_cur = z_req[0].volume
-            else:
-                d_vol_cur = z_req.volume
+            d_vol_cur = self.get_call(z_req, 'read', 'volume', lambda: z_req.volume, ReqSched.PRIO_STATE_SYNC)
 
             if d_vol_cur != self.a_volume[idx_zone]:
                 self.a_volume[idx_zone] = d_vol_cur
-                self.get_cmd_info(' :1 get_volume: Z' + str(idx_zone) + ': ' + str(d_vol_cur), 2)
+                self.set_state_upd(idx_zone, 'volume', d_vol_cur)
+                self.add_trace('sound', 2, ' :1 get_volume: Z%s: %s', idx_zone, d_vol_cur)
 
             return self.a_volume[idx_zone]
 
     """ set volume of zone """
 
-    def set_volume(self, idx_zone, str_action, value):
+    def set_volume(self, idx_zone, str_action, value, b_group=False):
         """
-        set volume to speaker
+        set volume to speaker (coalesced, see VolCtrl)
         :param idx_zone:
-        :param str_action:
+        :param str_action: 'up', 'dn', 'value' or 'equal' (all zones)
         :param value:
+        :param b_group: change volume of the whole group of the zone by the group rendering service
         :return:
         """
         # chanage volume
         if str_action == 'equal':
             # print('# Volume Equal')
-            z_req_all = self.get_zone(-1)
-            for z_req in z_req_all:
-                if z_req is not None:
-                    z_req.volume = value
+            num_zones = len(self.a_zone_soco)
+            for idx_z_cur in range(num_zones):
+                if self.get_zone(idx_z_cur) is not None:
+                    self.vol_fade.set_cancel_zone(idx_z_cur)
+                    self.vol_ctrl.set_vol(idx_z_cur, value)
         else:
-            z_req = self.get_zone(idx_zone)
-            if z_req is None:
+            if self.get_zone(idx_zone) is None:
                 return  # zone not available
 
+            if b_group:
+                idx_zone = self.get_zone_co_idx(idx_zone)
+            else:
+                self.vol_fade.set_cancel_zone(idx_zone)  # manual change stops running fade
+
             if str_action == 'up':
                 # print('# Volume Up')
-                z_req.volume = z_req.volume + value
+                self.vol_ctrl.set_vol_rel(idx_zone, value, b_group)
 
             elif str_action == 'dn':
                 # print('# Volume Down')
-                value = -1 * value
-                z_req.volume = z_req.volume + value
+                self.vol_ctrl.set_vol_rel(idx_zone, -1 * value, b_group)
 
             elif str_action == 'value':
                 # print('# Volume Down')
-                z_req.volume = value
+                self.vol_ctrl.set_vol(idx_zone, value, b_group)
+
+    def get_group_volume(self, idx_zone):
+        """
+        read group volume from coordinator of the group of the zone
+        :param idx_zone:
+        :return: group volume level, -1: zone not available
+        """
+        return self.vol_ctrl.get_vol_group(self.get_zone_co_idx(idx_zone))
+
+    def set_volume_fade(self, a_idx_zone, d_vol_target, d_duration, str_curve='linear', d_vol_start=None,
+                        d_rate=4.0):
+        """
+        fade volume of zones from start to target level
+        :param a_idx_zone: index of zone or list of zone indices
+        :param d_vol_target: target volume level (or list with one level per zone)
+        :param d_duration: fade duration [sec]
+        :param str_curve: 'linear', 'ease', 'exp' (slow start) or 'log' (fast start)
+        :param d_vol_start: start volume level (or list), None: current volume level
+        :param d_rate: max. volume updates per sec and speaker
+        :return: VolFade object (cancel(), wait())
+        """
+        if not isinstance(a_idx_zone, list):
+            a_idx_zone = [a_idx_zone]
+        a_idx_zone = [idx for idx in a_idx_zone if self.get_zone(idx) is not None]
+
+        if not isinstance(d_vol_target, list):
+            d_vol_target = [d_vol_target] * len(a_idx_zone)
+        if d_vol_start is None:
+            d_vol_start = [self.a_volume[idx] if self.a_volume[idx] >= 0 else self.get_volume(idx)
+                           for idx in a_idx_zone]
+        elif not isinstance(d_vol_start, list):
+            d_vol_start = [d_vol_start] * len(a_idx_zone)
+
+        self.add_trace('sound', 2, ' :1 set_volume_fade: Z%s: %s -> %s in %s s',
+                       a_idx_zone, d_vol_start, d_vol_target, d_duration)
+        return self.vol_fade.set_fade(a_idx_zone, d_vol_start, d_vol_target, d_duration, str_curve, d_rate)
+
+    def set_volume_cache(self, idx_zone, d_vol_cur, b_group=False):
+        """
+        set cached volume level of zone (or group) and call external method on change
+        :param idx_zone: index of zone (group: index of coordinator)
+        :param d_vol_cur:
+        :param b_group:
+        """
+        if b_group:
+            if d_vol_cur != self.a_group_volume[idx_zone]:
+                self.a_group_volume[idx_zone] = d_vol_cur
+                self.set_state_upd(idx_zone, 'group_volume', d_vol_cur)
+                self.ev_group_volume(idx_zone, d_vol_cur)  # call external method
+                self.add_trace('sound', 2, ' :1 get_group_volume: Z%s: %s', idx_zone, d_vol_cur)
+        else:
+            if d_vol_cur != self.a_volume[idx_zone]:
+                self.a_volume[idx_zone] = d_vol_cur
+                self.set_state_upd(idx_zone, 'volume', d_vol_cur)
+                self.ev_volume(idx_zone, d_vol_cur)  # call external method
+                self.add_trace('sound', 2, ' :1 get_volume: Z%s: %s', idx_zone, d_vol_cur)
+
+    def get_volume_event(self, idx_zone, event_var):
+        """
+        get volume and balance of zone from renderingControl event
+        :param idx_zone:
+        :param event_var: event variables
+        :return: True if event holds volume values
+        """
+        d_vol_chn = event_var.get('volume')
+        if not isinstance(d_vol_chn, dict) or 'Master' not in d_vol_chn:
+            return False
+
+        self.set_volume_cache(idx_zone, int(d_vol_chn['Master']))
+
+        if 'LF' in d_vol_chn and 'RF' in d_vol_chn:
+            d_cur_bal_val = int(d_vol_chn['RF']) - int(d_vol_chn['LF'])
+            if d_cur_bal_val != self.a_balance[idx_zone]:
+                self.a_balance[idx_zone] = d_cur_bal_val
+                self.set_state_upd(idx_zone, 'balance', d_cur_bal_val)
+                self.ev_balance(idx_zone, d_cur_bal_val)  # call external method
+                self.add_trace('sound', 2, ' :1 get_balance: Z%s: %s', idx_zone, d_cur_bal_val)
+        return True
 
     def get_balance(self, idx_zone=-1, b_init=False):
         """
@@ -868,13 +2245,10 @@ class CoSoCoW(object):
                 if z_req is None:
                     d_cur_bal_val = -111  # zone not available
                 else:
-
-                    if isinstance(z_req, list):
-                        d_cur_vol_left = z_req[0].renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'LF')])
-                        d_cur_vol_right = z_req[0].renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'RF')])
-                    else:
-                        d_cur_vol_left = z_req.renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'LF')])
-                        d_cur_vol_right = z_req.renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'RF')])
+                    try:
+                        d_cur_vol_left, d_cur_vol_right = self.get_balance_raw(z_req, ReqSched.PRIO_STATE_SYNC)
+                    except Exception:
+                        continue  # keep last value, other zones are updated
 
                     d_cur_vol_left_val = int(d_cur_vol_left['CurrentVolume'])
                     d_cur_vol_right_val = int(d_cur_vol_right['CurrentVolume'])
@@ -882,19 +2256,34 @@ class CoSoCoW(object):
 
                 if d_cur_bal_val != self.a_balance[idx_z_cur] or b_init:
                     self.a_balance[idx_z_cur] = d_cur_bal_val
+                    self.set_state_upd(idx_z_cur, 'balance', d_cur_bal_val)
                     self.ev_balance(idx_z_cur, d_cur_bal_val)  # call external method
-                    self.get_cmd_info(' :1 get_balance: Z' + str(idx_z_cur) + ': ' + str(d_cur_bal_val), 2)
+                    self.add_trace('sound', 2, ' :1 get_balance: Z%s: %s', idx_z_cur, d_cur_bal_val)
 
             return self.a_balance
 
+    def get_balance_raw(self, z_req, idx_prio=None):
+        """
+        read volume of left and right channel
+        :param z_req: speaker object
+        :param idx_prio: priority class (ReqSched.PRIO_...)
+        :return: responses of GetVolume (left, right)
+        """
+        with self.get_req_slot(z_req, idx_prio):
+            d_cur_vol_left = self.get_call(z_req, 'read', 'GetVolume', lambda: z_req.renderingControl.GetVolume(
+                [('InstanceID', 0), ('Channel', 'LF')]), idx_prio)
+            d_cur_vol_right = self.get_call(z_req, 'read', 'GetVolume', lambda: z_req.renderingControl.GetVolume(
+                [('InstanceID', 0), ('Channel', 'RF')]), idx_prio)
+        return d_cur_vol_left, d_cur_vol_right
+
     """ set balance of zone """
 
     def set_balance(self, idx_zone, str_action, value=5):
         """
         set balance to speaker
         :param idx_zone:
-        :param str_action:
-        :param value:
+        :param str_action: 'left', 'right', 'equal' or 'value'
+        :param value: step or balance value (right - left) for 'value'
         :return:
         """
         # chanage balance
@@ -902,8 +2291,7 @@ class CoSoCoW(object):
         if z_req is None:
             return  # zone not available
 
-        d_cur_vol_left = z_req.renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'LF')])
-        d_cur_vol_right = z_req.renderingControl.GetVolume([('InstanceID', 0), ('Channel', 'RF')])
+        d_cur_vol_left, d_cur_vol_right = self.get_balance_raw(z_req)
         d_cur_vol_left_val = int(d_cur_vol_left['CurrentVolume'])
         d_cur_vol_right_val = int(d_cur_vol_right['CurrentVolume'])
 
@@ -930,10 +2318,18 @@ class CoSoCoW(object):
             d_cur_vol_left_val = 100
             d_cur_vol_right_val = 100
 
+        elif str_action == 'value':
+            # balance value: right - left
+            d_cur_vol_left_val = 100 - max(0, value)
+            d_cur_vol_right_val = 100 + min(0, value)
+
         d_cur_vol_left_val = max(0, min(d_cur_vol_left_val, 100))
         d_cur_vol_right_val = max(0, min(d_cur_vol_right_val, 100))
-        z_req.renderingControl.SetVolume([('InstanceID', 0), ('Channel', 'LF'), ('DesiredVolume', int(d_cur_vol_left_val))])
-        z_req.renderingControl.SetVolume([('InstanceID', 0), ('Channel', 'RF'), ('DesiredVolume', int(d_cur_vol_right_val))])
+        with self.get_req_slot(z_req):
+            self.get_call(z_req, 'write', 'SetVolume', lambda: z_req.renderingControl.SetVolume(
+                [('InstanceID', 0), ('Channel', 'LF'), ('DesiredVolume', int(d_cur_vol_left_val))]))
+            self.get_call(z_req, 'write', 'SetVolume', lambda: z_req.renderingControl.SetVolume(
+                [('InstanceID', 0), ('Channel', 'RF'), ('DesiredVolume', int(d_cur_vol_right_val))]))
 
     def get_play_queue(self, idx_zone):
         """
@@ -942,30 +2338,33 @@ class CoSoCoW(object):
         """
         z_req = self.get_zone(idx_zone)
 
-        self.get_cmd_info(' :3 Read Queue' + str(idx_zone), 2)
+        self.add_trace('queue', 2, ' :3 Read Queue%s', idx_zone)
 
         if self.a_play_mode[idx_zone] != self.a_queue_play_mode[idx_zone]:
-            self.get_cmd_info(' :3 PlayMode change to: ' + self.a_play_mode[idx_zone], 2)
+            self.add_trace('queue', 2, ' :3 PlayMode change to: %s', self.a_play_mode[idx_zone])
             self.a_queue_play_mode[idx_zone] = self.a_play_mode[idx_zone]
 
-        idx_start = 0
-        idx_end = 1000
-        queue = list()
-        num_queue_size = int(z_req.queue_size)
-        idx1000 = int(num_queue_size / 1000)
-        for idx2 in range(idx1000 + 1):
-            queue.append(z_req.get_queue(idx_start + 1000 * idx2, idx_end + 1000 * idx2))
+        with self.call_policy.deadline(self.d_deadline_queue):
+            num_queue_size = int(self.get_call(z_req, 'read', 'queue_size', lambda: z_req.queue_size,
+                                               ReqSched.PRIO_BULK))
+            queue = self.get_bulk_pages(z_req, z_req.get_queue, num_queue_size)
 
         queuelist = list()
-        for idx1 in range(0, len(queue)):
-            for idx2 in range(0, len(queue[idx1])):
-                queuelist.append(queue[idx1][idx2].title)
+        a_art_uri = list()
+        for queue_item in queue:
+            queuelist.append(queue_item.title)
+            a_art_uri.append(self.get_art_uri(z_req, queue_item))
+        self.a_queue_art_uri[idx_zone] = a_art_uri
+        self.set_art_prefetch(idx_zone)
+        self.a_queue_win_op[idx_zone] = None
+        self.a_queue_win[idx_zone].set_inval(0, num_queue_size)
 
-        self.get_cmd_info(' :3 Read Queue' + str(idx_zone) + ' done', 2)
+        self.add_trace('queue', 2, ' :3 Read Queue%s done', idx_zone)
 
         if self.a_play_queue_size[idx_zone] != num_queue_size:
             self.a_play_queue_size[idx_zone] = num_queue_size
-            self.get_cmd_info(' :3 a_play_queue_size: ' + str(idx_zone) + ': ' + str(num_queue_size), 2)
+            self.set_state_upd(idx_zone, 'queue_size', num_queue_size)
+            self.add_trace('queue', 2, ' :3 a_play_queue_size: %s: %s', idx_zone, num_queue_size)
 
         if self.a_queue_play_list[idx_zone] != queuelist:
             self.a_queue_play_list[idx_zone] = queuelist
@@ -975,7 +2374,99 @@ class CoSoCoW(object):
             cur_track_idx = self.a_play_track_idx[idx_zone]
             self.ev_play_track_idx(idx_zone, int(cur_track_idx))  # call external method
         else:
-            self.get_cmd_info(' :3 No Queue change', 2)
+            self.add_trace('queue', 2, ' :3 No Queue change')
+
+    def get_queue_page_fn(self, idx_zone):
+        """
+        get method to read a page of the queue of zone
+        :param idx_zone:
+        :return:
+        """
+        z_entry = self.a_zone_soco[idx_zone]
+        return lambda idx_start, num_items, idx_prio: self.get_queue_page(self.get_zone_idx(z_entry), idx_start,
+                                                                           num_items, idx_prio)
+
+    def get_zone_idx(self, z_entry):
+        """
+        get current index of zone (indices change if zones are removed)
+        :param z_entry: speaker object or list of speaker objects (stereo pair) of a_zone_soco
+        :return: index or None
+        """
+        for idx_zone, z_cur in enumerate(self.a_zone_soco):
+            if z_cur is z_entry:
+                return idx_zone
+        return None
+
+    def get_queue_page(self, idx_zone, idx_start, num_items, idx_prio=None):
+        """
+        read a page of the queue
+        :param idx_zone:
+        :param idx_start: index of first queue entry (0: first entry)
+        :param num_items:
+        :param idx_prio: priority class of request scheduler
+        :return: ([title], [album art uri])
+        """
+        z_req = self.get_zone(idx_zone)
+        if z_req is None:
+            return [], []
+        a_item = self.get_call(z_req, 'bulk', 'get_queue', lambda: z_req.get_queue(idx_start, num_items),
+                               ReqSched.PRIO_STATE_SYNC if idx_prio is None else idx_prio)
+        return [queue_item.title for queue_item in a_item], [self.get_art_uri(z_req, queue_item)
+                                                             for queue_item in a_item]
+
+    def get_queue_window(self, idx_zone, idx_start=0, num_count=20):
+        """
+        get window of the queue, pages are loaded on demand and adjacent pages are prefetched
+        :param idx_zone:
+        :param idx_start: index of first queue entry (0: first entry)
+        :param num_count: number of queue entries
+        :return: list of titles
+        """
+        return self.a_queue_win[idx_zone].get_window(idx_start, num_count)[0]
+
+    def get_queue_window_art(self, idx_zone, idx_start=0, num_count=20):
+        """
+        get album art uris of window of the queue
+        :param idx_zone:
+        :param idx_start:
+        :param num_count:
+        :return: list of uri
+        """
+        return self.a_queue_win[idx_zone].get_window(idx_start, num_count)[1]
+
+    def get_queue_upd(self, idx_zone):
+        """
+        update queue without reading the whole list (windowed queue mode, b_queue_full = False):
+        only the affected pages of the window cache are invalidated
+        :param idx_zone:
+        """
+        z_req = self.get_zone(idx_zone)
+        if z_req is None:
+            return
+
+        num_queue_size = int(self.get_call(z_req, 'read', 'queue_size', lambda: z_req.queue_size,
+                                           ReqSched.PRIO_STATE_SYNC))
+        num_queue_size_old = self.a_play_queue_size[idx_zone]
+
+        # queue change by own command with known position: keep pages in front of it
+        a_op = self.a_queue_win_op[idx_zone]
+        self.a_queue_win_op[idx_zone] = None
+        idx_row_first = 0
+        if a_op is not None:
+            idx_row_op, num_delta = a_op
+            if (num_delta is None and num_queue_size > num_queue_size_old) \
+                    or (num_delta is not None and num_queue_size == num_queue_size_old + num_delta):
+                idx_row_first = idx_row_op
+        self.a_queue_win[idx_zone].set_inval(idx_row_first, num_queue_size)
+        self.add_trace('queue', 2, ' :3 Queue window update: Z%s from row %s', idx_zone, idx_row_first)
+
+        if num_queue_size_old != num_queue_size:
+            self.a_play_queue_size[idx_zone] = num_queue_size
+            self.set_state_upd(idx_zone, 'queue_size', num_queue_size)
+            self.add_trace('queue', 2, ' :3 a_play_queue_size: %s: %s', idx_zone, num_queue_size)
+
+        self.ev_queue_win_upd(idx_zone, num_queue_size)
+        self.ev_play_track_idx(idx_zone, int(self.a_play_track_idx[idx_zone]))  # call external method
 
     def get_play_status(self, idx_zone=0, event_var=None):
         """
@@ -989,7 +2480,7 @@ class CoSoCoW(object):
         idx_coo = self.get_zone_co_idx(idx_zone)
 
         if idx_coo != idx_zone:
-            self.get_cmd_info(' :2 get_play_status: Z' + str(idx_zone) + '  Not the Coord: C:' + str(idx_coo), 2)
+            self.add_trace('play', 2, ' :2 get_play_status: Z%s  Not the Coord: C:%s', idx_zone, idx_coo)
             return
 
         z_req = self.get_zone(idx_coo)
@@ -1011,13 +2502,16 @@ class CoSoCoW(object):
             str_trans_status = None
 
         b_is_mudb = False
-        b_is_aux_in = z_req.is_playing_line_in
+        b_is_aux_in = self.get_call(z_req, 'read', 'is_playing_line_in', lambda: z_req.is_playing_line_in,
+                                    ReqSched.PRIO_STATE_SYNC)
 
         obj_cur_track_meta = event_var['current_track_meta_data']
         if obj_cur_track_meta == '':
             str_cur_track_meta = ''
+            str_cur_art_uri = ''
         else:
             str_cur_track_meta = self.chk_str(obj_cur_track_meta.title, True)
+            str_cur_art_uri = self.get_art_uri(z_req, obj_cur_track_meta)
 
         # name of track source (e.g. radio name, playlist)
         obj_cur_play_src = event_var['enqueued_transport_uri_meta_data']
@@ -1046,7 +2540,8 @@ class CoSoCoW(object):
         b_is_radio = re.match(r'^x-sonosapi-stream:', obj_cur_play_uri) is not None
 
         # track display name (e.g artist + song title)
-        track_info = z_req.get_current_track_info()
+        track_info = self.get_call(z_req, 'read', 'get_current_track_info', z_req.get_current_track_info,
+                                   ReqSched.PRIO_STATE_SYNC)
         if b_is_aux_in:
             # aux in name
             str_track_disp_name = str_cur_track_meta
@@ -1078,144 +2573,267 @@ class CoSoCoW(object):
 
         str_cur_play_mode = self.chk_str(event_var['current_play_mode'])
 
-        # get groups
+        # group play state, kept once at the coordinator
         a_cur_group = self.a_groups[idx_coo]
-        for idx_z_grp in a_cur_group:
-
-            # current track sub
-            if str_track_disp_name != self.a_play_track_sub[idx_z_grp]:
-
+        grp = self.a_grp_play[idx_coo]
+        a_member_new = [idx for idx in a_cur_group if idx not in grp.a_member]
+        grp.a_member = list(a_cur_group)
+
+        d_cng = collections.OrderedDict()
+        for str_field, value in (('play_track_sub', str_track_disp_name), ('play_track', str_cur_play_src),
+                                 ('play_track_meta', str_cur_track_meta), ('play_is_radio', b_is_radio),
+                                 ('play_is_auxin', b_is_aux_in), ('play_is_mudb', b_is_mudb),
+                                 ('play_track_idx', int_cur_track_idx), ('play_mode', str_cur_play_mode),
+                                 ('play_trans_state', str_trans_state), ('play_trans_status', str_trans_status),
+                                 ('play_is_valid', b_track_is_valid)):
+            if value is not None and value != getattr(grp, str_field):
+                setattr(grp, str_field, value)
+                d_cng[str_field] = value
                 if self.b_print_str_type:
-                    str_print_disp = ' :2 a_play_track_sub: ' + str(a_cur_group) + ': ' \
-                                     + str_track_disp_name + ' : ' + str(str_track_disp_name.__class__)
+                    self.add_trace('play', 2, ' :2 a_%s: %s: %s : %s', str_field, a_cur_group, value, value.__class__)
                 else:
-                    str_print_disp = ' :2 a_play_track_sub: ' + str(a_cur_group) + ': ' + str_track_disp_name
+                    self.add_trace('play', 2, ' :2 a_%s: %s: %s', str_field, a_cur_group, value)
+
+        if grp.play_is_valid:
+            if grp.play_is_radio:
+                str_track_idx_disp = '\nRADIO'
+            elif grp.play_is_auxin:
+                # is radio or aux
+                str_track_idx_disp = '\nAUX'
+            else:
+                str_track_idx_disp = '\nPL' + str(grp.play_track_idx)
 
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(str_print_disp, 2)
-                else:
-                    if self.b_groups_diff:
-                        self.get_cmd_info(str_print_disp, 2)
+            if grp.play_trans_state == 'PLAYING':
+                cur_play_state = 'PLAY' + str_track_idx_disp
+            elif grp.play_trans_state == 'PAUSED_PLAYBACK':
+                cur_play_state = 'PAUSE' + str_track_idx_disp
+            else:
+                cur_play_state = 'STOP'
 
-                self.a_play_track_sub[idx_z_grp] = str_track_disp_name
-                self.ev_play_track_sub(idx_z_grp, str_track_disp_name)
+            if grp.play_state != cur_play_state:
+                grp.play_state = cur_play_state
+                d_cng['play_state'] = cur_play_state
 
-            # current track
-            if str_cur_play_src != self.a_play_track[idx_z_grp]:
+        # current album art
+        if str_cur_art_uri != grp.play_art_uri:
+            grp.play_art_uri = str_cur_art_uri
+            d_cng['play_art_uri'] = str_cur_art_uri
+            self.set_art_prefetch(idx_coo)
 
-                if self.b_print_str_type:
-                    str_print_src = ' :2 a_play_track: ' + str(a_cur_group) + ': ' \
-                                     + str_cur_play_src + ' : ' + str(str_cur_play_src.__class__)
-                else:
-                    str_print_src = ' :2 a_play_track: ' + str(a_cur_group) + ': ' + str_cur_play_src
+        # one event per group
+        if len(d_cng) > 0 or len(a_member_new) > 0:
+            self.ev_grp_play(idx_coo, list(a_cur_group), dict(d_cng))  # call external method
 
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(str_print_src, 2)
+        # per zone: state records, compatibility events (changed fields, full state for new members)
+        for idx_z_grp in a_cur_group:
+            if idx_z_grp in a_member_new:
+                a_field = grp.get_fields_set()
+            else:
+                a_field = d_cng
+            for str_field in a_field:
+                if str_field in GrpPlayState.D_STATE_FIELD:
+                    self.set_state_upd(idx_z_grp, GrpPlayState.D_STATE_FIELD[str_field], getattr(grp, str_field))
+            if self.b_play_ev_zone:
+                self.set_play_ev_zone(idx_z_grp, idx_coo, a_field)
+            if self.listen_log is not None:
+                self.set_listen_upd(idx_z_grp)
+
+    def set_play_ev_zone(self, idx_zone, idx_coo, a_field):
+        """
+        fire per zone play events (compatibility, see b_play_ev_zone)
+        :param idx_zone:
+        :param idx_coo: index of zone coordinator
+        :param a_field: changed fields of group play state
+        """
+        grp = self.a_grp_play[idx_coo]
+        if 'play_track_sub' in a_field:
+            self.ev_play_track_sub(idx_zone, grp.play_track_sub)
+        if 'play_track' in a_field:
+            self.ev_play_track(idx_zone, grp.play_track)
+        if 'play_track_idx' in a_field \
+                and not grp.play_is_radio \
+                and not grp.play_is_auxin \
+                and not self.a_queue_upd_actv[idx_zone]:
+            if self.b_group_cng_actv is False and (idx_coo == idx_zone or self.b_groups_diff):
+                # mark current track
+                self.add_trace('play', 2, ' :2 Select Track: %s: %s', idx_zone, grp.play_track_idx)
+                self.ev_play_track_idx(idx_zone, int(grp.play_track_idx))  # call external method
+        if 'play_mode' in a_field:
+            self.ev_play_mode(idx_zone, grp.play_mode)
+        if 'play_state' in a_field:
+            self.ev_play_state(idx_zone, grp.play_state)  # call external method
+        if 'play_art_uri' in a_field:
+            self.ev_play_art(idx_zone, grp.play_art_uri)  # call external method
+
+    def snapshot(self, b_pos=True):
+        """
+        get household state (groups, volumes, balances, sources, track, play mode) from cache
+        :param b_pos: read track position from the coordinator of each group (not sent by events): one network
+                      read per group, all in parallel, each within the read timeout of the call policy;
+                      False: no network reads, position ''
+        :return: snapshot dict (json serializable), see restore
+        """
+        d_snap = {'version': 1, 'time': time.time(), 'topology': self.get_topology(), 'zones': [], 'groups': []}
+        for idx_zone in range(len(self.a_zone_soco)):
+            d_snap['zones'].append({'name': self.a_zone_name[idx_zone], 'avail': bool(self.a_zone_avail[idx_zone]),
+                                    'volume': self.a_volume[idx_zone], 'balance': self.a_balance[idx_zone]})
+        for a_grp in d_snap['topology']:
+            event_var = self.a_event2_last[a_grp[0]]
+            if event_var is None:
+                continue
+            obj_meta = event_var.get('av_transport_uri_meta_data', '')
+            try:
+                if isinstance(obj_meta, EvDidl):
+                    str_meta = obj_meta.str_didl
                 else:
-                    if self.b_groups_diff:
-                        self.get_cmd_info(str_print_src, 2)
-
-                self.a_play_track[idx_z_grp] = str_cur_play_src
-                self.ev_play_track(idx_z_grp, str_cur_play_src)
+                    str_meta = to_didl_string(obj_meta) if obj_meta != '' else ''
+            except:
+                str_meta = ''
+            try:
+                int_track = int(event_var.get('current_track', 0))
+            except:
+                int_track = 0
+            d_snap['groups'].append({'co': a_grp[0],
+                                     'uri': self.chk_str(event_var.get('av_transport_uri', '')),
+                                     'meta': str_meta,
+                                     'track': int_track,
+                                     'position': '',
+                                     'play_mode': self.chk_str(event_var.get('current_play_mode', '')),
+                                     'trans_state': self.chk_str(event_var.get('transport_state', ''))})
+        if b_pos and len(d_snap['groups']) > 0:
+            with concurrent.futures.ThreadPoolExecutor(min(8, len(d_snap['groups']))) as pool:
+                for d_grp, str_pos in zip(d_snap['groups'],
+                                          pool.map(self.get_track_pos, [d_grp['co'] for d_grp in d_snap['groups']])):
+                    d_grp['position'] = str_pos
+        return d_snap
+
+    def get_track_pos(self, idx_coo):
+        """
+        get position in current track of group
+        :param idx_coo: index of group coordinator
+        :return: position 'h:mm:ss', '': not known
+        """
+        z_req = self.get_zone(idx_coo)
+        if z_req is None:
+            return ''
+        try:
+            return self.chk_str(self.get_call(z_req, 'read', 'get_current_track_info',
+                                              z_req.get_current_track_info).get('position', ''))
+        except Exception:
+            return ''
 
-            # current track meta
-            if str_cur_track_meta != self.a_play_track_meta[idx_z_grp]:
+    def restore(self, d_snap):
+        """
+        restore household state of snapshot, only changed parts are applied, zones and groups concurrently
+        :param d_snap: snapshot dict, see snapshot
+        :return: list of applied changes (changes which failed are not listed)
+        """
+        a_done = []
+        if len(self.get_topology_plan(d_snap['topology'])) > 0:
+            if self.apply_topology(d_snap['topology']):
+                a_done.append(('topology', d_snap['topology']))
+
+        a_task = []
+        for idx_zone, d_zone in enumerate(d_snap['zones'][:len(self.a_zone_soco)]):
+            if self.get_zone(idx_zone) is None:
+                continue
+            if d_zone['volume'] >= 0 and d_zone['volume'] != self.a_volume[idx_zone]:
+                a_task.append((self.set_restore_vol, (idx_zone, d_zone['volume'], a_done)))
+            if d_zone['balance'] != -111 and d_zone['balance'] != self.a_balance[idx_zone]:
+                a_task.append((self.set_restore_bal, (idx_zone, d_zone['balance'], a_done)))
+        for d_grp in d_snap['groups']:
+            if d_grp['co'] < len(self.a_zone_soco):
+                a_task.append((self.set_restore_grp, (d_grp, a_done)))
+
+        if len(a_task) > 0:
+            with concurrent.futures.ThreadPoolExecutor(min(8, len(a_task))) as pool:
+                for fut in [pool.submit(f, *args) for f, args in a_task]:
+                    try:
+                        fut.result()
+                    except Exception as err:
+                        self.add_trace('main', 1, ' :x restore: failed: %s', err)
+        return a_done
+
+    def set_restore_vol(self, idx_zone, d_vol, a_done):
+        """
+        restore volume of zone now (absolute level, not coalesced)
+        :param idx_zone:
+        :param d_vol:
+        :param a_done: list of applied changes (appended)
+        """
+        self.vol_fade.set_cancel_zone(idx_zone)
+        if self.vol_ctrl.set_vol_zone(idx_zone, d_vol_abs=d_vol) >= 0:
+            a_done.append(('volume', idx_zone, d_vol))
 
-                if self.b_print_str_type:
-                    str_print_meta = ' :2 a_play_track_meta: ' + str(a_cur_group) + ': ' \
-                                     + str_cur_track_meta + ' : ' + str(str_cur_track_meta.__class__)
-                else:
-                    str_print_meta = ' :2 a_play_track_meta: ' + str(a_cur_group) + ': ' + str_cur_track_meta
-
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(str_print_meta, 2)
-
-                self.a_play_track_meta[idx_z_grp] = str_cur_track_meta
-
-            # is radio
-            if b_is_radio != self.a_play_is_radio[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_is_radio: ' + str(a_cur_group) + ': ' + str(b_is_radio), 2)
-                self.a_play_is_radio[idx_z_grp] = b_is_radio
-
-            # is Aux in
-            if b_is_aux_in != self.a_play_is_auxin[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_is_auxin: ' + str(a_cur_group) + ': ' + str(b_is_aux_in), 2)
-                self.a_play_is_auxin[idx_z_grp] = b_is_aux_in
-
-            # is mudb
-            if b_is_mudb != self.a_play_is_mudb[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_is_mudb: ' + str(a_cur_group) + ': ' + str(b_is_mudb), 2)
-                self.a_play_is_mudb[idx_z_grp] = b_is_mudb
-
-            # current track index
-            if int_cur_track_idx != self.a_play_track_idx[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_track_idx: '
-                                      + str(a_cur_group) + ': ' + str(int_cur_track_idx), 2)
-                else:
-                    if self.b_groups_diff:
-                        self.get_cmd_info(' :2 a_play_track_idx NotCo: '
-                                          + str(idx_z_grp) + ': ' + str(int_cur_track_idx), 2)
-                self.a_play_track_idx[idx_z_grp] = int_cur_track_idx
-
-                if not self.a_play_is_radio[idx_z_grp] \
-                        and not self.a_play_is_auxin[idx_z_grp] \
-                        and not self.a_queue_upd_actv[idx_z_grp]:
-                    if self.b_group_cng_actv is False and (idx_coo == idx_z_grp or self.b_groups_diff):
-                        # mark current track
-                        self.get_cmd_info(' :2 Select Track: '
-                                          + str(idx_z_grp) + ': ' + str(int_cur_track_idx), 2)
-                        val1 = int(int_cur_track_idx)
-                        self.ev_play_track_idx(idx_z_grp, val1)  # call external method
-
-            # current track index
-            if str_cur_play_mode != self.a_play_mode[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_mode: ' + str(a_cur_group) + ': ' + str_cur_play_mode, 2)
-                self.a_play_mode[idx_z_grp] = str_cur_play_mode
-                self.ev_play_mode(idx_z_grp, str_cur_play_mode)
-
-            # current transport state
-            if str_trans_state != self.a_play_trans_state[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_trans_state: ' + str(a_cur_group) + ': ' + str_trans_state, 2)
-                self.a_play_trans_state[idx_z_grp] = str_trans_state
-
-            # current transport status
-            if str_trans_status != self.a_play_trans_status[idx_z_grp] and str_trans_status is not None:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_trans_status: ' + str(a_cur_group) + ': ' + str_trans_status, 2)
-                self.a_play_trans_status[idx_z_grp] = str_trans_status
-
-            # current play valid
-            if b_track_is_valid != self.a_play_is_valid[idx_z_grp]:
-                if idx_coo == idx_z_grp:
-                    self.get_cmd_info(' :2 a_play_is_valid: ' + str(a_cur_group) + ': ' + str(b_track_is_valid), 2)
-                self.a_play_is_valid[idx_z_grp] = b_track_is_valid
-
-            if self.a_play_is_valid[idx_z_grp]:
-                if self.a_play_is_radio[idx_z_grp]:
-                    str_track_idx_disp = '\nRADIO'
-                elif self.a_play_is_auxin[idx_z_grp]:
-                    # is radio or aux
-                    str_track_idx_disp = '\nAUX'
-                else:
-                    str_track_idx_disp = '\nPL' + str(self.a_play_track_idx[idx_z_grp])
+    def set_restore_bal(self, idx_zone, d_bal, a_done):
+        """
+        restore balance of zone
+        :param idx_zone:
+        :param d_bal:
+        :param a_done: list of applied changes (appended)
+        """
+        self.set_balance(idx_zone, 'value', d_bal)
+        a_done.append(('balance', idx_zone, d_bal))
 
-                if self.a_play_trans_state[idx_z_grp] == 'PLAYING':
-                    cur_play_state = 'PLAY' + str_track_idx_disp
-                elif self.a_play_trans_state[idx_z_grp] == 'PAUSED_PLAYBACK':
-                    cur_play_state = 'PAUSE' + str_track_idx_disp
+    def set_restore_grp(self, d_grp, a_done):
+        """
+        restore source, track, play mode and transport state of a group
+        :param d_grp: group entry of snapshot
+        :param a_done: list of applied changes (appended)
+        """
+        idx_coo = d_grp['co']
+        z_req = self.get_zone(idx_coo)
+        if z_req is None:
+            return
+        event_var = self.a_event2_last[idx_coo] or {}
+        str_uri = d_grp['uri']
+        b_queue = str_uri.startswith('x-rincon-queue:')
+        b_src = self.chk_str(event_var.get('av_transport_uri', '')) != str_uri
+        try:
+            b_track = b_queue and int(event_var.get('current_track', 0)) != d_grp['track']
+        except:
+            b_track = b_queue
+        b_playing = self.chk_str(event_var.get('transport_state', '')) == 'PLAYING'
+
+        with self.get_req_slot(z_req):
+            if b_src or b_track:
+                if b_queue:
+                    self.get_call(z_req, 'write', 'play_from_queue', lambda: z_req.play_from_queue(
+                        max(0, d_grp['track'] - 1), start=False))
+                    if d_grp['position'] not in ('', 'NOT_IMPLEMENTED', '0:00:00'):
+                        self.get_call(z_req, 'write', 'seek', lambda: z_req.seek(d_grp['position']))
+                elif str_uri != '':
+                    self.get_call(z_req, 'write', 'play_uri', lambda: z_req.play_uri(str_uri, d_grp['meta'],
+                                                                                     start=False))
+                a_done.append(('source', idx_coo, str_uri, d_grp['track']))
+            if d_grp['play_mode'] != '' and b_queue and d_grp['play_mode'] != self.a_play_mode[idx_coo]:
+                self.get_call(z_req, 'write', 'SetPlayMode', lambda: z_req.avTransport.SetPlayMode(
+                    [('InstanceID', 0), ('NewPlayMode', d_grp['play_mode'])]))
+                a_done.append(('play_mode', idx_coo, d_grp['play_mode']))
+            if d_grp['trans_state'] == 'PLAYING' and (b_src or b_track or not b_playing):
+                self.get_call(z_req, 'write', 'play', z_req.play)
+                a_done.append(('play', idx_coo))
+            elif d_grp['trans_state'] != 'PLAYING' and b_playing and not (b_src or b_track):
+                if b_queue:
+                    self.get_call(z_req, 'write', 'pause', z_req.pause)
                 else:
-                    cur_play_state = 'STOP'
+                    self.get_call(z_req, 'write', 'stop', z_req.stop)
+                a_done.append(('stop', idx_coo))
 
-                if self.a_play_state[idx_z_grp] != cur_play_state:
-                    # print cur_play_state
-                    self.a_play_state[idx_z_grp] = cur_play_state
-                    self.ev_play_state(idx_z_grp, cur_play_state)  # call external method
+    def set_groups_sync(self):
+        """
+        read groups and update play status of changed groups
+        """
+        self.get_groups()
+        if self.a_groups != self.a_groups_chk:
+            self.b_groups_diff = True  # if groups have changed
+            self.add_trace('group', 2, ' # CurGroups: %s Co: %s', self.a_groups, self.a_group_co)
+            for idx in self.a_group_co:
+                if idx is not None:
+                    self.get_play_status(idx, self.a_event2_last[idx])
+            self.a_groups_chk = self.a_groups
+            self.b_groups_diff = False
+        self.b_evsub4_addturn = False
 
     def get_zone_events(self):
         """
@@ -1224,17 +2842,8 @@ class CoSoCoW(object):
         num_zones = len(self.a_zone_soco)
 
         # detect change of groups
-        if self.b_evsub4_addturn is True:
-            self.get_groups()
-            if self.a_groups != self.a_groups_chk:
-                self.b_groups_diff = True  # if groups have changed
-                self.get_cmd_info(' # CurGroups: ' + str(self.a_groups) + ' Co: ' + str(self.a_group_co), 2)
-                for idx in self.a_group_co:
-                    if idx is not None:
-                        self.get_play_status(idx, self.a_event2_last[idx])
-                self.a_groups_chk = self.a_groups
-                self.b_groups_diff = False
-                self.b_evsub4_addturn = False
+        if self.b_evsub4_addturn is True and self.b_group_cng_actv is False:
+            self.set_groups_sync()
 
         # loop over zones
         for idx in range(num_zones):
@@ -1246,146 +2855,148 @@ class CoSoCoW(object):
             if z_req is None:
                 continue
 
-            try:
-                # 1 renderingControl
-                if self.a_zone_ev_sub1[idx] is None or not self.a_zone_ev_sub1[idx].is_subscribed:
-                    self.a_zone_ev_sub1[idx] = z_req.renderingControl.subscribe()
-                if not self.a_zone_ev_sub1[idx].events.empty():
-                    event = self.a_zone_ev_sub1[idx].events.get(timeout=0.5)
-                    b_is_avail1 = True
-                else:
-                    b_is_avail1 = False
-            except:
-                b_is_avail1 = False
-
-            if b_is_avail1:
-                self.get_cmd_info('### E1 Z:' + str(idx) + ' Sound', 4)
-
-                event_var = event.variables
-                if self.b_zone_ev_sub1_prnt:
-                    pprint(event_var)
-                    print('\n')
-
-                self.get_volume()
-                self.get_balance()
-
-            if True:
-                # 3 contentDirectory
-                try:
-                    if self.a_zone_ev_sub3[idx] is None or not self.a_zone_ev_sub3[idx].is_subscribed:
-                        self.a_zone_ev_sub3[idx] = z_req.contentDirectory.subscribe()
-                    if not self.a_zone_ev_sub3[idx].events.empty():
-                        event = self.a_zone_ev_sub3[idx].events.get(timeout=0.5)
-                        b_is_avail3 = True
-                    else:
-                        b_is_avail3 = False
-                except:
-                    b_is_avail3 = False
-
-                if b_is_avail3:
-                    self.get_cmd_info('### E3 Z:' + str(idx) + ' Queue', 4)
-
-                    event_var = event.variables
-                    if self.b_zone_ev_sub3_prnt:
-                        pprint(event_var)
-
-                    if 'container_update_i_ds' in event_var.keys():
-                        container_update_i_ds = event_var['container_update_i_ds']
-                        if self.a_queue_upd_idnew[idx] != container_update_i_ds:
-                            if self.a_queue_rem_actv[idx] == False and self.b_group_cng_actv == False:
-                                # no queue update while queue item removing or group change is active
-                                self.a_queue_upd_actv[idx] = True
-                                self.get_cmd_info(' :3 a_queue_upd_idnew: ' + container_update_i_ds, 3)
-                                self.a_queue_upd_idnew[idx] = container_update_i_ds
-                            else:
-                                self.get_cmd_info(' :3 Queue update: suppressed', 3)
-
-                    if 'favorites_update_id' in event_var.keys():
-                        favorites_update_id = event_var['favorites_update_id']
-                        if self.a_radio_fav_upd_idnew[idx] != favorites_update_id:
-                            self.get_cmd_info(' :3 a_radio_fav_upd_idnew: ' + favorites_update_id, 3)
-                            self.a_radio_fav_upd_idnew[idx] = favorites_update_id
-
-                    if 'share_list_update_id' in event_var.keys():
-                        share_list_update_id = event_var['share_list_update_id']
-                        if self.a_mudb_upd_idnew[idx] != share_list_update_id:
-                            self.get_cmd_info(' :3 a_mudb_upd_idnew: ' + share_list_update_id, 3)
-                            self.a_mudb_upd_idnew[idx] = share_list_update_id
-
-            if True:
-                # 2 avTransport
+            for num_srv, str_srv, str_name, str_fn in self.A_ZONE_EV:
+                a_zone_ev_sub = getattr(self, 'a_zone_ev_sub' + str(num_srv))
                 try:
-                    if self.a_zone_ev_sub2[idx] is None or not self.a_zone_ev_sub2[idx].is_subscribed:
-                        self.a_zone_ev_sub2[idx] = z_req.avTransport.subscribe()
-                    if not self.a_zone_ev_sub2[idx].events.empty():
-                        event2 = self.a_zone_ev_sub2[idx].events.get(timeout=0.5)
-                        b_is_avail2 = True
-                    else:
-                        b_is_avail2 = False
+                    if a_zone_ev_sub[idx] is None or not a_zone_ev_sub[idx].is_subscribed:
+                        a_zone_ev_sub[idx] = self.get_call(z_req, 'probe', 'subscribe',
+                                                           getattr(z_req, str_srv).subscribe, ReqSched.PRIO_STATE_SYNC)
+                    if a_zone_ev_sub[idx].events.empty():
+                        continue
+                    event = a_zone_ev_sub[idx].events.get(timeout=0.5)
                 except:
-                    b_is_avail2 = False
+                    continue
 
-                if b_is_avail2:
-                    self.get_cmd_info('### E2 Z:' + str(idx) + ' Track', 4)
+                self.set_zone_event(idx, num_srv, event.variables)
 
-                    event_var = event2.variables
-                    if self.b_zone_ev_sub2_prnt:
-                        pprint(event_var)
-                        print('\n')
+    def set_zone_event(self, idx_zone, num_srv, event_var):
+        """
+        handle event of zone service (also used by event replay)
+        :param idx_zone:
+        :param num_srv: number of service, see A_ZONE_EV
+        :param event_var: event variables
+        """
+        if self.ev_rec is not None:
+            self.ev_rec.add(idx_zone, num_srv, event_var)
 
-                    if 'sleep_timer_generation' in event_var.keys():
-                        sleep_timer_generation = event_var['sleep_timer_generation']
-                        self.get_sleep_timer(idx)
+        num_srv, str_srv, str_name, str_fn = self.A_ZONE_EV[self.D_ZONE_EV_IDX[num_srv]]
+        self.add_trace('event', 4, '### E%s Z:%s %s', num_srv, idx_zone, str_name)
+        if getattr(self, 'b_zone_ev_sub' + str(num_srv) + '_prnt'):
+            pprint(event_var)
+            print('\n')
 
-                        self.get_cmd_info(' :3 sleep_timer_generation: ' + sleep_timer_generation, 2)
-                    if 'transport_state' in event_var.keys():
-                        self.a_event2_last[idx] = event_var
-                        self.get_play_status(idx, event_var)
+        getattr(self, str_fn)(idx_zone, event_var)
 
-            if True:
-                # 4 zoneGroupTopology
-                try:
-                    if self.a_zone_ev_sub4[idx] is None or not self.a_zone_ev_sub4[idx].is_subscribed:
-                        self.a_zone_ev_sub4[idx] = z_req.zoneGroupTopology.subscribe()
-                    if not self.a_zone_ev_sub4[idx].events.empty():
-                        event = self.a_zone_ev_sub4[idx].events.get(timeout=0.5)
-                        b_is_avail4 = True
-                    else:
-                        b_is_avail4 = False
-                except:
-                    b_is_avail4 = False
+    def get_sound_event(self, idx_zone, event_var):
+        """
+        1 renderingControl event
+        :param idx_zone:
+        :param event_var:
+        """
+        if not self.get_volume_event(idx_zone, event_var):
+            self.get_volume()
+            self.get_balance()
 
-                if b_is_avail4:
-                    self.get_cmd_info('### E4 Z:' + str(idx) + ' Zone', 4)
+    def get_track_event(self, idx_zone, event_var):
+        """
+        2 avTransport event
+        :param idx_zone:
+        :param event_var:
+        """
+        if 'sleep_timer_generation' in event_var.keys():
+            sleep_timer_generation = event_var['sleep_timer_generation']
+            self.get_sleep_timer(idx_zone)
 
-                    event_var = event.variables
-                    if self.b_zone_ev_sub4_prnt:
-                        pprint(event_var)
-                        print('\n')
+            self.add_trace('play', 2, ' :3 sleep_timer_generation: %s', sleep_timer_generation)
+        if 'transport_state' in event_var.keys():
+            self.a_event2_last[idx_zone] = event_var
+            self.get_play_status(idx_zone, event_var)
 
-                    self.get_groups()
-                    self.b_evsub4_addturn = True
+    def get_queue_event(self, idx_zone, event_var):
+        """
+        3 contentDirectory event
+        :param idx_zone:
+        :param event_var:
+        """
+        idx = idx_zone
+        if 'container_update_i_ds' in event_var.keys():
+            container_update_i_ds = event_var['container_update_i_ds']
+            if self.a_queue_upd_idnew[idx] != container_update_i_ds:
+                if self.a_queue_rem_actv[idx] == False and self.b_group_cng_actv == False:
+                    # no queue update while queue item removing or group change is active
+                    self.a_queue_upd_actv[idx] = True
+                    self.add_trace('queue', 3, ' :3 a_queue_upd_idnew: %s', container_update_i_ds)
+                    self.a_queue_upd_idnew[idx] = container_update_i_ds
+                    self.set_state_upd(idx, 'queue_upd_id', container_update_i_ds)
+                else:
+                    self.add_trace('queue', 3, ' :3 Queue update: suppressed')
+
+        if 'favorites_update_id' in event_var.keys():
+            favorites_update_id = event_var['favorites_update_id']
+            if self.a_radio_fav_upd_idnew[idx] != favorites_update_id:
+                self.add_trace('queue', 3, ' :3 a_radio_fav_upd_idnew: %s', favorites_update_id)
+                self.a_radio_fav_upd_idnew[idx] = favorites_update_id
+                self.set_state_upd(idx, 'fav_upd_id', favorites_update_id)
+
+        if 'share_list_update_id' in event_var.keys():
+            share_list_update_id = event_var['share_list_update_id']
+            if self.a_mudb_upd_idnew[idx] != share_list_update_id:
+                self.add_trace('queue', 3, ' :3 a_mudb_upd_idnew: %s', share_list_update_id)
+                self.a_mudb_upd_idnew[idx] = share_list_update_id
+                self.set_state_upd(idx, 'share_upd_id', share_list_update_id)
+
+    def get_topology_event(self, idx_zone, event_var):
+        """
+        4 zoneGroupTopology event
+        :param idx_zone:
+        :param event_var:
+        """
+        if self.b_group_cng_actv is False:
+            # no group read while group change is active, see apply_topology
+            self.get_groups()
+        self.b_evsub4_addturn = True
 
-            if True:
-                # 5 deviceProperties
-                try:
-                    if self.a_zone_ev_sub5[idx] is None or not self.a_zone_ev_sub5[idx].is_subscribed:
-                        self.a_zone_ev_sub5[idx] = z_req.deviceProperties.subscribe()
-                    if not self.a_zone_ev_sub5[idx].events.empty():
-                        event = self.a_zone_ev_sub5[idx].events.get(timeout=0.5)
-                        b_is_avail5 = True
-                    else:
-                        b_is_avail5 = False
-                except:
-                    b_is_avail5 = False
+    def get_prop_event(self, idx_zone, event_var):
+        """
+        5 deviceProperties event
+        :param idx_zone:
+        :param event_var:
+        """
+        z_req = self.get_zone(idx_zone)
+        if z_req is not None:
+            self.get_dev_event(idx_zone, z_req, event_var)
 
-                if b_is_avail5:
-                    self.get_cmd_info('### E5 Z:' + str(idx) + ' Prop', 4)
+    def get_dev_event(self, idx_zone, z_req, event_var):
+        """
+        update device registry from deviceProperties event
+        :param idx_zone:
+        :param z_req:
+        :param event_var: event variables
+        """
+        dev = self.dev_reg.get_dev(z_req.ip_address)
+        if dev is None:
+            self.set_dev_reval()
+            return
 
-                    event_var = event.variables
-                    if self.b_zone_ev_sub5_prnt:
-                        pprint(event_var)
-                        print('\n')
+        b_cng = False
+        if 'zone_name' in event_var.keys():
+            str_zone_name = self.chk_str(event_var['zone_name'], True)
+            if str_zone_name != dev.get('zone_name'):
+                b_cng = True
+                self.dev_reg.set_dev(z_req.ip_address, zone_name=str_zone_name)
+                self.a_zone_name[idx_zone] = str_zone_name
+                self.set_state_upd(idx_zone, 'zone_name', str_zone_name)
+                self.add_trace('zone', 2, ' :x zone name: Z%s: %s', idx_zone, str_zone_name)
+
+        if 'channel_map_set' in event_var.keys():
+            str_chn_map = self.chk_str(event_var['channel_map_set'], True)
+            if str_chn_map != dev.get('channel_map_set'):
+                b_cng = True
+                self.dev_reg.set_dev(z_req.ip_address, channel_map_set=str_chn_map)
+
+        if b_cng:
+            # revalidate the rest (pair membership, line in) in background
+            self.set_dev_reval()
 
     def set_play_mode(self, idx_zone=0, idx_mode=0):
         """
@@ -1399,14 +3010,10 @@ class CoSoCoW(object):
         if z_req is not None:
             if self.a_play_is_radio[idx_coo] or self.a_play_is_auxin[idx_coo]:
                 return
-            if idx_mode == 0:
-                z_req.avTransport.SetPlayMode([('InstanceID', 0), ('NewPlayMode', 'NORMAL')])
-            elif idx_mode == 1:
-                z_req.avTransport.SetPlayMode([('InstanceID', 0), ('NewPlayMode', 'SHUFFLE')])
-            elif idx_mode == 2:
-                z_req.avTransport.SetPlayMode([('InstanceID', 0), ('NewPlayMode', 'SHUFFLE_NOREPEAT')])
-            elif idx_mode == 3:
-                z_req.avTransport.SetPlayMode([('InstanceID', 0), ('NewPlayMode', 'REPEAT_ALL')])
+            a_mode = ['NORMAL', 'SHUFFLE', 'SHUFFLE_NOREPEAT', 'REPEAT_ALL']
+            if 0 <= idx_mode < len(a_mode):
+                self.get_call(z_req, 'write', 'SetPlayMode', lambda: z_req.avTransport.SetPlayMode(
+                    [('InstanceID', 0), ('NewPlayMode', a_mode[idx_mode])]))
 
     def get_sleep_timer(self, idx_zone=-1):
         """
@@ -1422,7 +3029,11 @@ class CoSoCoW(object):
                 idx_coo = self.get_zone_co_idx(idxZ)
                 z_req = self.get_zone(idx_coo)
                 if z_req is not None:
-                    d_cur_sleep_time = z_req.get_sleep_timer()
+                    try:
+                        d_cur_sleep_time = self.get_call(z_req, 'read', 'get_sleep_timer', z_req.get_sleep_timer,
+                                                         ReqSched.PRIO_STATE_SYNC)
+                    except Exception:
+                        continue  # keep last value, other zones are updated
                     if d_cur_sleep_time is None:
                         self.a_sleep_time_val[idx_coo] = d_cur_sleep_time
                         self.ev_sleep_time_val(idx_coo, d_cur_sleep_time)
@@ -1432,7 +3043,7 @@ class CoSoCoW(object):
                         self.ev_sleep_time_val(idx_coo, str_time)
 
         # check
-        if idx_zone == -1:
+        elif idx_zone == -1:
 
             for idxZ in range(num_zones):
                 idx_coo = self.get_zone_co_idx(idxZ)
@@ -1440,7 +3051,11 @@ class CoSoCoW(object):
                 if z_req is not None:
 
                     if self.a_sleep_time_val[idx_coo] is not None:
-                        d_cur_sleep_time = z_req.get_sleep_timer()
+                        try:
+                            d_cur_sleep_time = self.get_call(z_req, 'read', 'get_sleep_timer',
+                                                             z_req.get_sleep_timer, ReqSched.PRIO_STATE_SYNC)
+                        except Exception:
+                            continue  # keep last value, other zones are updated
                         if d_cur_sleep_time is None:
                             self.a_sleep_time_val[idx_coo] = d_cur_sleep_time
                             self.ev_sleep_time_val(idx_coo, d_cur_sleep_time)
@@ -1453,7 +3068,8 @@ class CoSoCoW(object):
             idx_coo = self.get_zone_co_idx(idx_zone)
             z_req = self.get_zone(idx_coo)
             if z_req is not None:
-                d_cur_sleep_time = z_req.get_sleep_timer()
+                d_cur_sleep_time = self.get_call(z_req, 'read', 'get_sleep_timer', z_req.get_sleep_timer,
+                                                 ReqSched.PRIO_STATE_SYNC)
                 if d_cur_sleep_time is None:
                     self.a_sleep_time_val[idx_coo] = d_cur_sleep_time
                     self.ev_sleep_time_val(idx_coo, d_cur_sleep_time)
@@ -1470,12 +3086,13 @@ class CoSoCoW(object):
         idx_coo = self.get_zone_co_idx(idx_zone)
         z_req = self.get_zone(idx_coo)
         if z_req is not None:
-            d_cur_sleep_time = z_req.get_sleep_timer()
+            with self.get_req_slot(z_req):
+                d_cur_sleep_time = self.get_call(z_req, 'read', 'get_sleep_timer', z_req.get_sleep_timer)
 
-            if d_cur_sleep_time is None:
-                z_req.set_sleep_timer(d_time * 60)
-            else:
-                z_req.set_sleep_timer(None)
+                if d_cur_sleep_time is None:
+                    self.get_call(z_req, 'write', 'set_sleep_timer', lambda: z_req.set_sleep_timer(d_time * 60))
+                else:
+                    self.get_call(z_req, 'write', 'set_sleep_timer', lambda: z_req.set_sleep_timer(None))
 
     def timestamp4sec(self, d_time_sec):
         """
@@ -1502,19 +3119,5732 @@ class CoSoCoW(object):
 
 
 class EventCall(list):
+    """
+    event with subscribers
+
+    Callbacks in the list get all calls. Subscriptions (subscribe) get only the calls of their zones and event
+    kinds: they are indexed by (zone, kind), a call looks up its zone and kinds only. The zone is the call argument
+    idx_zone_arg (index or list of indices, e.g. group members), the kind is the argument idx_kind_arg (name or
+    dict with names as keys, e.g. changed fields). The index is replaced on change (no lock in the call).
+    """
+    prof = None  # (RunProfiler, name) in profiling window
+
+    def __init__(self, idx_zone_arg=0, idx_kind_arg=None):
+        """
+
+        :param idx_zone_arg: position of zone in call arguments, None: event has no zone
+        :param idx_kind_arg: position of event kind in call arguments, None: event has no kind
+        """
+        super(EventCall, self).__init__()
+        self.idx_zone_arg = idx_zone_arg
+        self.idx_kind_arg = idx_kind_arg
+        self.lock_sub = threading.RLock()  # weak reference callbacks may cancel in the same thread
+        self.d_sub = {}  # (zone, kind) -> tuple of EventSub, None: any
 
     def __call__(self, *args, **kwargs):
+        if self.prof is not None:
+            self.prof[0].run_ev_call(self.prof[1], self, args, kwargs)
+            return
         for f in self:
             f(*args, **kwargs)
+        if self.d_sub:
+            for sub in self.get_subs(args):
+                sub.call(args, kwargs)
 
     def __repr__(self):
         return "Event(%s)" % list.__repr__(self)
 
     def num_ev(self):
-        return len(self)
+        return len(self) + len(set(sub for a_sub in self.d_sub.values() for sub in a_sub))
 
     def is_linked(self):
-        if len(self) > 0:
+        if self.num_ev() > 0:
             return True
         else:
             return False
+
+    def get_subs(self, args):
+        """
+        get subscriptions matching call arguments
+        :param args:
+        :return: list of EventSub
+        """
+        d_sub = self.d_sub
+        a_zone = (None,)
+        if self.idx_zone_arg is not None and len(args) > self.idx_zone_arg:
+            zone = args[self.idx_zone_arg]
+            a_zone = (None,) + (tuple(zone) if isinstance(zone, (list, tuple)) else (zone,))
+        a_kind = (None,)
+        if self.idx_kind_arg is not None and len(args) > self.idx_kind_arg:
+            kind = args[self.idx_kind_arg]
+            a_kind = (None,) + (tuple(kind) if isinstance(kind, dict) else (kind,))
+        a_sub = []
+        for zone in a_zone:
+            for kind in a_kind:
+                a_sub.extend(d_sub.get((zone, kind), ()))
+        if len(a_zone) > 2 or len(a_kind) > 2:
+            # subscription of several matching zones / kinds is called once
+            a_sub = list(collections.OrderedDict.fromkeys(a_sub))
+        return a_sub
+
+    def subscribe(self, fn, a_zone=None, a_kind=None, b_weak=None, sub=None):
+        """
+        add subscription with zone and kind filter
+        :param fn: callback, called with the arguments of the event
+        :param a_zone: zone indices (or one index), None: all zones
+        :param a_kind: event kinds (or one kind), None: all kinds
+        :param b_weak: hold callback by weak reference, None: bound methods only (ends with their object)
+        :param sub: EventSub object to add this event to (one handle for several events), None: new object
+        :return: EventSub object (cancel() ends the subscription)
+        """
+        if a_zone is not None and self.idx_zone_arg is None:
+            raise ValueError('event has no zone')
+        if a_kind is not None and self.idx_kind_arg is None:
+            raise ValueError('event has no kind')
+        if sub is None:
+            sub = EventSub(fn, b_weak)
+        a_zone = [None] if a_zone is None else (list(a_zone) if isinstance(a_zone, (list, tuple, set)) else [a_zone])
+        a_kind = [None] if a_kind is None else (list(a_kind) if isinstance(a_kind, (list, tuple, set)) else [a_kind])
+        self.add_sub(sub, [(zone, kind) for zone in a_zone for kind in a_kind])
+        return sub
+
+    @staticmethod
+    def subscribe_obj(obj, fn, a_ev, a_zone=None, a_kind=None, b_weak=None):
+        """
+        add subscription to events (ev_*) of object
+        :param obj: CoSoCoW or CoSoCoWClient object
+        :param fn:
+        :param a_ev: event names (or one name), with or without 'ev_'
+        :param a_zone:
+        :param a_kind:
+        :param b_weak:
+        :return: EventSub object
+        """
+        sub = None
+        for str_ev in ([a_ev] if isinstance(a_ev, str) else a_ev):
+            ev_call = getattr(obj, str_ev if str_ev.startswith('ev_') else 'ev_' + str_ev, None)
+            if not isinstance(ev_call, EventCall):
+                raise ValueError('unknown event: ' + str(str_ev))
+            sub = ev_call.subscribe(fn, a_zone, a_kind, b_weak, sub)
+        return sub
+
+    def add_sub(self, sub, a_key):
+        """
+        add subscription to index
+        :param sub:
+        :param a_key: list of (zone, kind)
+        """
+        with self.lock_sub:
+            d_sub = dict(self.d_sub)
+            for key in a_key:
+                d_sub[key] = d_sub.get(key, ()) + (sub,)
+            self.d_sub = d_sub
+            sub.a_reg.append((self, a_key))
+
+    def rem_sub(self, sub, a_key):
+        """
+        remove subscription from index
+        :param sub:
+        :param a_key: list of (zone, kind)
+        """
+        with self.lock_sub:
+            d_sub = dict(self.d_sub)
+            for key in a_key:
+                a_sub = tuple(sub_cur for sub_cur in d_sub.get(key, ()) if sub_cur is not sub)
+                if a_sub:
+                    d_sub[key] = a_sub
+                else:
+                    d_sub.pop(key, None)
+            self.d_sub = d_sub
+
+
+class EventSub(object):
+    """
+    subscription of EventCall(s), handle to end the subscription
+    """
+
+    def __init__(self, fn, b_weak=None):
+        """
+
+        :param fn: callback
+        :param b_weak: hold callback by weak reference, None: bound methods only
+        """
+        if b_weak is None:
+            b_weak = hasattr(fn, '__self__') and hasattr(fn, '__func__')
+        if b_weak:
+            ref_cls = weakref.WeakMethod if hasattr(fn, '__func__') else weakref.ref
+            self.ref = ref_cls(fn, self.set_dead)
+            self.fn = None
+        else:
+            self.ref = None
+            self.fn = fn
+        self.str_name = getattr(fn, '__qualname__', repr(fn))
+        self.a_reg = []  # (EventCall, keys)
+        self.b_actv = True
+
+    def __repr__(self):
+        return '<EventSub ' + self.str_name + ('' if self.b_actv else ' cancelled') + '>'
+
+    def call(self, args, kwargs):
+        """
+        call callback
+        :param args:
+        :param kwargs:
+        """
+        fn = self.fn if self.ref is None else self.ref()
+        if fn is None:
+            self.cancel()
+            return
+        if self.b_actv:
+            fn(*args, **kwargs)
+
+    def set_dead(self, ref):
+        # object of weak referenced callback is gone
+        self.cancel()
+
+    def cancel(self):
+        """
+        end subscription (all events)
+        """
+        if not self.b_actv:
+            return
+        self.b_actv = False
+        a_reg, self.a_reg = self.a_reg, []
+        for ev_call, a_key in a_reg:
+            ev_call.rem_sub(self, a_key)
+
+
+class ReqSched(object):
+    """
+    per speaker request scheduler with priority classes
+
+    Every request to a speaker has to hold a slot of its priority class.
+    Slots are granted per speaker in priority order and limited per class and per speaker.
+    A bulk transfer gives its slot back between pages as soon as interactive work arrives.
+    """
+    PRIO_INTERACTIVE = 0
+    PRIO_STATE_SYNC = 1
+    PRIO_BULK = 2
+
+    def __init__(self, num_max_speaker=2, a_num_max_prio=None):
+        """
+
+        :param num_max_speaker: max. number of parallel requests per speaker
+        :param a_num_max_prio: max. number of parallel requests per speaker and priority class
+        """
+        if a_num_max_prio is None:
+            a_num_max_prio = [2, 1, 1]
+
+        self.num_max_speaker = num_max_speaker
+        self.a_num_max_prio = list(a_num_max_prio)
+        self.cond = threading.Condition()
+        self.d_speaker = {}
+        self.loc_held = threading.local()
+
+    def get_speaker(self, key):
+        """
+        get counters of active and waiting requests of speaker
+        :param key: speaker key (ip address)
+        :return: [a_num_actv, a_num_wait]
+        """
+        d_cnt = self.d_speaker.get(key)
+        if d_cnt is None:
+            d_cnt = [[0, 0, 0], [0, 0, 0]]
+            self.d_speaker[key] = d_cnt
+        return d_cnt
+
+    def get_held(self):
+        """
+        get slots held by the calling thread
+        :return: dict speaker key -> priority class
+        """
+        d_held = getattr(self.loc_held, 'd_held', None)
+        if d_held is None:
+            d_held = {}
+            self.loc_held.d_held = d_held
+        return d_held
+
+    def chk_grant(self, key, idx_prio):
+        """
+        check if a slot can be granted (call with lock)
+        :param key:
+        :param idx_prio:
+        :return:
+        """
+        a_num_actv, a_num_wait = self.get_speaker(key)
+        if sum(a_num_actv) >= self.num_max_speaker:
+            return False
+        if a_num_actv[idx_prio] >= self.a_num_max_prio[idx_prio]:
+            return False
+        for idx in range(idx_prio):
+            if a_num_wait[idx] > 0:
+                return False  # higher priority first
+        if idx_prio == self.PRIO_BULK and a_num_actv[self.PRIO_INTERACTIVE] > 0:
+            return False  # bulk steps aside while interactive work is running
+        return True
+
+    def chk_preempt(self, key, idx_prio):
+        """
+        check if work of higher priority is waiting or running for speaker
+        :param key:
+        :param idx_prio:
+        :return:
+        """
+        with self.cond:
+            a_num_actv, a_num_wait = self.get_speaker(key)
+            for idx in range(idx_prio):
+                if a_num_wait[idx] > 0 or (idx == self.PRIO_INTERACTIVE and a_num_actv[idx] > 0):
+                    return True
+            return False
+
+    def acquire(self, key, idx_prio, d_timeout=None):
+        """
+        acquire slot of speaker, block until granted
+        :param key:
+        :param idx_prio:
+        :param d_timeout: max. waiting time [sec], None waits forever
+        :return: True if slot is granted
+        """
+        d_held = self.get_held()
+        if key in d_held:
+            # thread holds already a slot of this speaker (nested call)
+            d_held[key][1] = d_held[key][1] + 1
+            return True
+
+        with self.cond:
+            a_num_actv, a_num_wait = self.get_speaker(key)
+            a_num_wait[idx_prio] = a_num_wait[idx_prio] + 1
+            try:
+                b_grant = self.cond.wait_for(lambda: self.chk_grant(key, idx_prio), d_timeout)
+            finally:
+                a_num_wait[idx_prio] = a_num_wait[idx_prio] - 1
+            if b_grant:
+                a_num_actv[idx_prio] = a_num_actv[idx_prio] + 1
+            else:
+                self.cond.notify_all()
+
+        if b_grant:
+            d_held[key] = [idx_prio, 1]
+        return b_grant
+
+    def release(self, key):
+        """
+        release slot of speaker
+        :param key:
+        """
+        d_held = self.get_held()
+        idx_prio, num_nest = d_held[key]
+        if num_nest > 1:
+            d_held[key][1] = num_nest - 1
+            return
+
+        del d_held[key]
+        with self.cond:
+            a_num_actv = self.get_speaker(key)[0]
+            a_num_actv[idx_prio] = a_num_actv[idx_prio] - 1
+            self.cond.notify_all()
+
+    def set_yield(self, key):
+        """
+        give slot back to waiting work of higher priority and reacquire it (bulk page boundary)
+        :param key:
+        :return: True if slot was given back
+        """
+        d_held = self.get_held()
+        if key not in d_held or d_held[key][1] > 1:
+            return False
+        idx_prio = d_held[key][0]
+        if not self.chk_preempt(key, idx_prio):
+            return False
+        self.release(key)
+        self.acquire(key, idx_prio)
+        return True
+
+    def get_hold(self, key):
+        """
+        keep slot of calling thread busy after its release until the returned method is called
+        (request still running on a worker thread after its timeout)
+        :param key:
+        :return: method releasing the slot
+        """
+        idx_prio = self.get_held()[key][0]
+        with self.cond:
+            a_num_actv = self.get_speaker(key)[0]
+            a_num_actv[idx_prio] = a_num_actv[idx_prio] + 1
+
+        def release():
+            with self.cond:
+                a_num_actv[idx_prio] = a_num_actv[idx_prio] - 1
+                self.cond.notify_all()
+        return release
+
+    def slot(self, key, idx_prio):
+        """
+        get slot of speaker as context manager
+        :param key:
+        :param idx_prio:
+        :return:
+        """
+        return ReqSlot(self, key, idx_prio)
+
+    def get_stat(self):
+        """
+        get active and waiting requests per speaker
+        :return: dict speaker key -> {'actv': [...], 'wait': [...]}
+        """
+        with self.cond:
+            return dict((key, {'actv': list(d_cnt[0]), 'wait': list(d_cnt[1])})
+                        for key, d_cnt in self.d_speaker.items())
+
+
+class ReqSlot(object):
+
+    def __init__(self, sched, key, idx_prio):
+        self.sched = sched
+        self.key = key
+        self.idx_prio = idx_prio
+
+    def __enter__(self):
+        self.sched.acquire(self.key, self.idx_prio)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.sched.release(self.key)
+        return False
+
+    def get_hold(self):
+        return self.sched.get_hold(self.key)
+
+
+class TraceLog(object):
+    """
+    trace records with deferred formatting, levels per subsystem and ring buffer of recent records
+
+    A record is kept as (time, subsystem, level, format, arguments), the message is formatted
+    ('%' operator) only when it is printed or dumped. A record above the console and ring level of its
+    subsystem costs one dictionary lookup and is not built. Arguments other than numbers and strings
+    are kept as text (str), the record does not hold exceptions or mutable objects.
+    Levels: 0 error, 1 info, 2 detail, 3 debug, 4 trace.
+    """
+    A_SUB = ('main', 'zone', 'group', 'sound', 'play', 'queue', 'event', 'call', 'sched')
+    A_LVL_NAME = ('E', 'I', 'D', 'G', 'T')
+    A_TYPE_KEEP = (str, int, float, type(None))  # arguments kept as they are
+
+    def __init__(self, idx_lvl=3, idx_lvl_ring=2, num_ring=4096, fn_print=None):
+        """
+
+        :param idx_lvl: console level of all subsystems
+        :param idx_lvl_ring: ring buffer level of all subsystems
+        :param num_ring: number of records in ring buffer
+        :param fn_print: console output, called with message and level (None: print with time)
+        """
+        self.fn_print = fn_print
+        self.idx_lvl_def = idx_lvl
+        self.idx_lvl_ring_def = idx_lvl_ring
+        self.d_lvl = {}  # subsystem -> console level
+        self.d_lvl_ring = {}  # subsystem -> ring level
+        self.d_lvl_max = {}  # subsystem -> max. of both (checked first)
+        self.idx_lvl_max_def = max(idx_lvl, idx_lvl_ring)
+        self.ring = collections.deque(maxlen=num_ring)
+        self.lock = threading.Lock()
+        self.str_dump_file = None
+        self.b_dump_err = False
+        self.d_dump_min = 10.0  # min. time between dumps on error [sec]
+        self.d_time_dump = 0.0
+
+    def set_lvl(self, idx_lvl=None, str_sub=None, idx_lvl_ring=None):
+        """
+        set console and ring buffer level
+        :param idx_lvl: console level, None: unchanged
+        :param str_sub: subsystem, None: all subsystems (levels of single subsystems are reset)
+        :param idx_lvl_ring: ring buffer level, None: unchanged
+        """
+        with self.lock:
+            if str_sub is None:
+                if idx_lvl is not None:
+                    self.idx_lvl_def = idx_lvl
+                    self.d_lvl = {}
+                if idx_lvl_ring is not None:
+                    self.idx_lvl_ring_def = idx_lvl_ring
+                    self.d_lvl_ring = {}
+            else:
+                if idx_lvl is not None:
+                    self.d_lvl[str_sub] = idx_lvl
+                if idx_lvl_ring is not None:
+                    self.d_lvl_ring[str_sub] = idx_lvl_ring
+            self.idx_lvl_max_def = max(self.idx_lvl_def, self.idx_lvl_ring_def)
+            self.d_lvl_max = dict((str_cur, max(self.d_lvl.get(str_cur, self.idx_lvl_def),
+                                                self.d_lvl_ring.get(str_cur, self.idx_lvl_ring_def)))
+                                  for str_cur in set(self.d_lvl) | set(self.d_lvl_ring))
+
+    def get_lvl(self, str_sub=None):
+        """
+        get console and ring buffer level
+        :param str_sub: subsystem, None: default of all subsystems
+        :return: [console level, ring level]
+        """
+        return [self.d_lvl.get(str_sub, self.idx_lvl_def), self.d_lvl_ring.get(str_sub, self.idx_lvl_ring_def)]
+
+    def chk(self, str_sub, idx_lvl):
+        """
+        check if records of level are taken (to skip expensive arguments)
+        :param str_sub:
+        :param idx_lvl:
+        :return:
+        """
+        return idx_lvl <= self.d_lvl_max.get(str_sub, self.idx_lvl_max_def)
+
+    def add(self, str_sub, idx_lvl, str_fmt, *args):
+        """
+        add record
+        :param str_sub: subsystem (A_SUB)
+        :param idx_lvl: level
+        :param str_fmt: message format ('%' operator)
+        :param args: arguments of format
+        """
+        if idx_lvl > self.d_lvl_max.get(str_sub, self.idx_lvl_max_def):
+            return
+        if args:
+            args = tuple(arg if isinstance(arg, self.A_TYPE_KEEP) else str(arg) for arg in args)
+        record = (time.time(), str_sub, idx_lvl, str_fmt, args)
+        if idx_lvl <= self.d_lvl_ring.get(str_sub, self.idx_lvl_ring_def):
+            self.ring.append(record)
+        if idx_lvl <= self.d_lvl.get(str_sub, self.idx_lvl_def):
+            if self.fn_print is None:
+                print(self.get_time_str(record[0]) + ' ' + self.get_msg(record))
+            else:
+                self.fn_print(self.get_msg(record), idx_lvl)
+        if idx_lvl == 0 and self.b_dump_err:
+            self.set_dump_err()
+
+    @staticmethod
+    def get_time_str(d_time):
+        """
+        get time of day with microseconds
+        :param d_time:
+        :return:
+        """
+        return time.strftime('%H:%M:%S', time.localtime(d_time)) + '.{0:06d}'.format(int(d_time % 1 * 1e6))
+
+    @staticmethod
+    def get_msg(record):
+        """
+        format message of record
+        :param record:
+        :return:
+        """
+        str_fmt, args = record[3], record[4]
+        if not args:
+            return str_fmt
+        try:
+            return str_fmt % args
+        except Exception:
+            return str_fmt + ' ' + repr(args)
+
+    def get_records(self, num_max=None, str_sub=None, idx_lvl=None, d_time_start=None):
+        """
+        get formatted records of ring buffer (oldest first)
+        :param num_max: max. number of records (newest), None: all
+        :param str_sub: subsystem, None: all
+        :param idx_lvl: max. level, None: all
+        :param d_time_start: records from this time, None: all
+        :return: list of lines
+        """
+        a_rec = [record for record in list(self.ring)
+                 if (str_sub is None or record[1] == str_sub) and (idx_lvl is None or record[2] <= idx_lvl)
+                 and (d_time_start is None or record[0] >= d_time_start)]
+        if num_max is not None:
+            a_rec = a_rec[-num_max:] if num_max > 0 else []
+        return [self.get_time_str(record[0]) + ' ' + self.A_LVL_NAME[min(record[2], 4)] + ' '
+                + '{0:5s} '.format(record[1]) + self.get_msg(record) for record in a_rec]
+
+    def set_dump(self, str_file=None, **kwargs):
+        """
+        write records of ring buffer
+        :param str_file: file (appended), None: dump file (see set_dump_err) or stderr
+        :param kwargs: filter, see get_records
+        :return: number of records
+        """
+        a_line = self.get_records(**kwargs)
+        str_file = str_file or self.str_dump_file
+        str_head = '--- trace dump ' + time.strftime('%Y-%m-%d %H:%M:%S') + ' ---\n'
+        if str_file is None:
+            sys.stderr.write(str_head + ''.join(str_line + '\n' for str_line in a_line))
+        else:
+            with open(str_file, 'a') as f_dump:
+                f_dump.write(str_head + ''.join(str_line + '\n' for str_line in a_line))
+        return len(a_line)
+
+    def set_dump_err(self):
+        """
+        dump ring buffer after error record, at most once per d_dump_min
+        """
+        d_time = time.time()
+        with self.lock:
+            if d_time - self.d_time_dump < self.d_dump_min:
+                return
+            self.d_time_dump = d_time
+        try:
+            self.set_dump()
+        except Exception:
+            pass
+
+
+class RunProfiler(object):
+    """
+    profiling window on a running CoSoCoW: timing of cyclic tasks, event handlers and EventCall subscribers,
+    optional sampling (sys._current_frames) or deterministic (cProfile) profiling and allocation tracking
+    (tracemalloc), the report is written to a file at the end of the window
+
+    Methods of A_FN and the event handlers are wrapped by instance attributes only while the window is open,
+    there is no overhead when off. Times are inclusive (nested handlers are part of the caller).
+    """
+    A_MODE = ('time', 'sample', 'det')
+    A_FN = ('cyclic_task_0', 'cyclic_task_1', 'cyclic_task_1_zone', 'get_zone_events', 'get_groups',
+            'get_play_status', 'get_play_queue', 'get_queue_upd', 'get_radio_fav', 'get_mudb_list',
+            'get_volume', 'get_balance', 'get_sleep_timer')
+
+    def __init__(self, mc, str_mode='sample', str_file=None, b_mem=False, d_interval=0.005, num_top=30):
+        """
+
+        :param mc: CoSoCoW object
+        :param str_mode: 'time': handler timing, 'sample': + stack sampling, 'det': + cProfile
+        :param str_file: report file, None: file in temp. directory
+        :param b_mem: track allocations
+        :param d_interval: sampling interval [sec]
+        :param num_top: number of lines per report table
+        """
+        if str_mode not in self.A_MODE:
+            raise ValueError('profile mode: ' + str(str_mode))
+        self.mc = mc
+        self.str_mode = str_mode
+        self.str_file = str_file or os.path.join(tempfile.gettempdir(),
+                                                 time.strftime('cosocow_prof_%Y%m%d_%H%M%S.txt'))
+        self.b_mem = b_mem
+        self.d_interval = d_interval
+        self.num_top = num_top
+        self.lock = threading.Lock()
+        self.lock_det = threading.Lock()
+        self.loc = threading.local()
+        self.d_stat = {}  # (section, name, zone) -> [count, total time, max. time]
+        self.stats_det = None
+        self.str_det = io.StringIO()
+        self.cnt_self = collections.Counter()  # function -> samples on top of stack
+        self.cnt_cum = collections.Counter()  # function -> samples in stack
+        self.cnt_thread = collections.Counter()  # thread name -> samples
+        self.num_sample = 0
+        self.a_mem = []
+        self.snap_mem = None
+        self.b_mem_start = False
+        self.a_wrap = []
+        self.a_ev_call = []
+        self.th_sample = None
+        self.timer = None
+        self.d_time_start = 0.0
+        self.d_time_stop = None
+        self.b_run = False
+
+    def start(self, d_duration=None):
+        """
+        open profiling window
+        :param d_duration: length of window [sec], None: until stop
+        """
+        d_ev_name = dict((a_ev[3], a_ev[2]) for a_ev in self.mc.A_ZONE_EV)
+        for str_fn in self.A_FN + tuple(d_ev_name):
+            str_sec = 'event ' + d_ev_name[str_fn] if str_fn in d_ev_name else 'task'
+            setattr(self.mc, str_fn, self.get_wrap(str_sec, str_fn, getattr(self.mc, str_fn)))
+            self.a_wrap.append(str_fn)
+        for str_attr, ev_call in vars(self.mc).items():
+            if isinstance(ev_call, EventCall):
+                ev_call.prof = (self, str_attr)
+                self.a_ev_call.append(ev_call)
+        if self.b_mem:
+            self.b_mem_start = not tracemalloc.is_tracing()
+            if self.b_mem_start:
+                tracemalloc.start(5)
+            self.snap_mem = self.get_snap_mem()
+        self.d_time_start = time.time()
+        self.b_run = True
+        if self.str_mode == 'sample':
+            self.th_sample = threading.Thread(target=self.set_sample_loop, name='CoSoCoW-Prof', daemon=True)
+            self.th_sample.start()
+        if d_duration is not None:
+            self.timer = threading.Timer(d_duration, self.stop)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def stop(self):
+        """
+        close profiling window and write report
+        :return: report file
+        """
+        with self.lock:
+            if not self.b_run:
+                return self.str_file
+            self.b_run = False
+        if self.timer is not None and self.timer is not threading.current_thread():
+            self.timer.cancel()
+        for str_fn in self.a_wrap:
+            self.mc.__dict__.pop(str_fn, None)
+        for ev_call in self.a_ev_call:
+            ev_call.prof = None
+        if self.th_sample is not None:
+            self.th_sample.join(5)
+        if self.snap_mem is not None:
+            self.a_mem = self.get_snap_mem().compare_to(self.snap_mem, 'lineno')[:self.num_top]
+            if self.b_mem_start:
+                tracemalloc.stop()
+        self.d_time_stop = time.time()
+        with open(self.str_file, 'w') as f_rep:
+            f_rep.write(self.get_report())
+        self.mc.add_trace('main', 1, ' :p profile written: %s', self.str_file)
+        return self.str_file
+
+    @staticmethod
+    def get_snap_mem():
+        """
+        get allocation snapshot without the allocations of tracemalloc (same filter for start and end)
+        :return:
+        """
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def get_wrap(self, str_sec, str_name, fn):
+        """
+        get timing wrapper of method
+        :param str_sec: section of report
+        :param str_name: name of method
+        :param fn: bound method
+        :return:
+        """
+        def fn_wrap(*args, **kwargs):
+            idx_zone = args[0] if args and type(args[0]) is int else None
+            return self.run(str_sec, str_name, idx_zone, fn, *args, **kwargs)
+        fn_wrap.__name__ = fn.__name__
+        return fn_wrap
+
+    def run(self, str_sec, str_name, idx_zone, fn, *args, **kwargs):
+        """
+        run function with timing (outermost call of thread in cProfile for mode 'det')
+        :param str_sec: section of report
+        :param str_name: name of handler
+        :param idx_zone: zone of call, None: no zone
+        :param fn:
+        :return: result of fn
+        """
+        num_depth = getattr(self.loc, 'num_depth', 0)
+        prof = None
+        if num_depth == 0 and self.str_mode == 'det' and self.b_run and self.lock_det.acquire(False):
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # other profiler active
+                prof = None
+                self.lock_det.release()
+        self.loc.num_depth = num_depth + 1
+        d_start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            d_run = time.perf_counter() - d_start
+            self.loc.num_depth = num_depth
+            if prof is not None:
+                prof.disable()
+                if self.stats_det is None:
+                    self.stats_det = pstats.Stats(prof, stream=self.str_det)
+                else:
+                    self.stats_det.add(prof)
+                self.lock_det.release()
+            key = (str_sec, str_name, idx_zone)
+            with self.lock:
+                a_stat = self.d_stat.get(key)
+                if a_stat is None:
+                    self.d_stat[key] = [1, d_run, d_run]
+                else:
+                    a_stat[0] += 1
+                    a_stat[1] += d_run
+                    if d_run > a_stat[2]:
+                        a_stat[2] = d_run
+
+    def run_ev_call(self, str_attr, ev_call, args, kwargs):
+        """
+        call subscribers of EventCall with timing per subscriber
+        :param str_attr: attribute name of EventCall
+        :param ev_call:
+        :param args:
+        :param kwargs:
+        """
+        idx_zone = args[0] if args and type(args[0]) is int else None
+        for f in ev_call:
+            self.run('call ' + str_attr, getattr(f, '__qualname__', repr(f)), idx_zone, f, *args, **kwargs)
+        if ev_call.d_sub:
+            for sub in ev_call.get_subs(args):
+                self.run('call ' + str_attr, sub.str_name, idx_zone, sub.call, args, kwargs)
+
+    def set_sample_loop(self):
+        """
+        sampling thread: count functions in stacks of all other threads
+        """
+        num_ident_own = threading.get_ident()
+        while self.b_run:
+            d_names = dict((th.ident, th.name) for th in threading.enumerate())
+            a_sample = []
+            for num_ident, frame in sys._current_frames().items():
+                if num_ident == num_ident_own:
+                    continue
+                str_self = self.get_frame_name(frame)
+                a_name = set()
+                while frame is not None:
+                    a_name.add(self.get_frame_name(frame))
+                    frame = frame.f_back
+                a_sample.append((d_names.get(num_ident, str(num_ident)), str_self, a_name))
+            with self.lock:
+                for str_thread, str_self, a_name in a_sample:
+                    self.num_sample += 1
+                    self.cnt_thread[str_thread] += 1
+                    self.cnt_self[str_self] += 1
+                    self.cnt_cum.update(a_name)
+            time.sleep(self.d_interval)
+
+    @staticmethod
+    def get_frame_name(frame):
+        """
+        get function name of frame
+        :param frame:
+        :return: file:line(function) of function start
+        """
+        code = frame.f_code
+        return os.path.basename(code.co_filename) + ':' + str(code.co_firstlineno) + '(' + code.co_name + ')'
+
+    def get_stat(self):
+        """
+        get handler timing
+        :return: list of [section, name, zone, count, total time, max. time], largest total time first
+        """
+        with self.lock:
+            a_stat = [list(key) + list(a_val) for key, a_val in self.d_stat.items()]
+        return sorted(a_stat, key=lambda a_val: -a_val[4])
+
+    def get_report(self):
+        """
+        get profile report: handler timing per zone and event type, samples, cProfile and allocation statistics
+        :return: text
+        """
+        d_dur = (self.d_time_stop or time.time()) - self.d_time_start
+        a_line = ['--- CoSoCoW profile ' + time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.d_time_start))
+                  + ', mode ' + self.str_mode + ', ' + '{0:.1f}'.format(d_dur) + ' s ---', '',
+                  'handlers (inclusive time):',
+                  '{0:24s} {1:32s} {2:>4s} {3:>7s} {4:>10s} {5:>9s} {6:>9s}'.format(
+                      'section', 'name', 'zone', 'count', 'total ms', 'mean ms', 'max ms')]
+        for str_sec, str_name, idx_zone, num_cnt, d_total, d_max in self.get_stat():
+            a_line.append('{0:24s} {1:32s} {2:>4s} {3:7d} {4:10.1f} {5:9.2f} {6:9.2f}'.format(
+                str_sec[:24], str_name[:32], '-' if idx_zone is None else str(idx_zone), num_cnt,
+                d_total * 1e3, d_total * 1e3 / num_cnt, d_max * 1e3))
+        with self.lock:
+            # copy of sample counters, the sampling thread may still run
+            num_sample = self.num_sample
+            cnt_thread = collections.Counter(self.cnt_thread)
+            cnt_self = collections.Counter(self.cnt_self)
+            cnt_cum = collections.Counter(self.cnt_cum)
+        if num_sample > 0:
+            a_line += ['', 'samples: ' + str(num_sample) + ' (interval '
+                       + '{0:.1f}'.format(self.d_interval * 1e3) + ' ms)', '', 'threads:']
+            a_line += ['{0:7d} {1}'.format(num_cnt, str_name)
+                       for str_name, num_cnt in cnt_thread.most_common(self.num_top)]
+            for str_title, cnt in (('top functions (self):', cnt_self),
+                                   ('top functions (cumulative):', cnt_cum)):
+                a_line += ['', str_title]
+                a_line += ['{0:7d} {1:6.1f}% {2}'.format(num_cnt, 100.0 * num_cnt / num_sample, str_name)
+                           for str_name, num_cnt in cnt.most_common(self.num_top)]
+        with self.lock_det:
+            if self.stats_det is not None:
+                self.str_det.seek(0)
+                self.str_det.truncate()
+                self.stats_det.sort_stats('cumulative').print_stats(self.num_top)
+                a_line += ['', 'cProfile (outermost handler calls):', self.str_det.getvalue()]
+        if self.a_mem:
+            a_line += ['', 'allocations (growth in window):']
+            a_line += [str(stat) for stat in self.a_mem]
+        return '\n'.join(a_line) + '\n'
+
+
+class CallPolicy(object):
+    """
+    timeout, retry and deadline policy for speaker calls
+
+    Every call belongs to an operation class with its own timeout. Calls with a timeout run on a
+    worker thread, a hung speaker costs the caller the timeout and not more; the request slot of the
+    call stays busy until the worker is finished. Idempotent reads are retried with exponential backoff
+    and jitter, calls of non idempotent classes (writes) are never repeated after a timeout, as the
+    speaker may have executed them. A deadline set for a multi
+    call operation (see deadline) bounds the timeouts and retries of all calls within it.
+    A speaker with repeated failures is put on hold for a while, calls to it fail at once.
+    """
+    D_CLS_DEF = {
+        'read': {'d_timeout': 3.0, 'num_retry': 2, 'b_idem': True},  # idempotent state reads
+        'bulk': {'d_timeout': 15.0, 'num_retry': 1, 'b_idem': True},  # pages of queue and music db
+        'probe': {'d_timeout': 3.0, 'num_retry': 0, 'b_idem': True},  # device info, aux (registry as fallback)
+        'write': {'d_timeout': 5.0, 'num_retry': 0, 'b_idem': False},  # commands, never repeated
+    }
+    A_EXC_RETRY = (OSError, concurrent.futures.TimeoutError)  # transient: network and timeout
+    A_EXC_TIMEOUT = (TimeoutError, concurrent.futures.TimeoutError, requests.exceptions.Timeout)
+    A_STAT = ['ok', 'err', 'timeout', 'retry', 'reject']
+
+    def __init__(self, d_cls=None, d_backoff=0.2, num_fail_max=3, d_hold=10.0, num_workers_max=16,
+                 num_run_host_max=4, fn_log=None):
+        """
+
+        :param d_cls: settings per operation class, merged into D_CLS_DEF
+        :param d_backoff: base time of retry backoff [sec]
+        :param num_fail_max: failures in a row until speaker is put on hold
+        :param d_hold: hold time of speaker [sec]
+        :param num_workers_max: max. number of worker threads
+        :param num_run_host_max: max. number of running calls per speaker (incl. calls after their timeout)
+        :param fn_log: method called with error messages
+        """
+        self.d_cls = dict((str_cls, dict(d_set)) for str_cls, d_set in self.D_CLS_DEF.items())
+        for str_cls, d_set in (d_cls or {}).items():
+            self.d_cls.setdefault(str_cls, {'d_timeout': None, 'num_retry': 0, 'b_idem': False}).update(d_set)
+        self.d_backoff = d_backoff
+        self.num_fail_max = num_fail_max
+        self.d_hold = d_hold
+        self.num_workers_max = num_workers_max
+        self.num_run_host_max = num_run_host_max
+        self.fn_log = fn_log
+
+        self.loc = threading.local()
+        self.lock = threading.Lock()
+        self.q_call = queue.Queue()
+        self.a_worker = []
+        self.num_idle = 0
+        self.b_closed = False
+
+        # error counters
+        self.d_stat = {}  # operation -> {'ok': n, 'err': n, ...}
+        self.d_err_type = collections.Counter()  # exception class -> n
+        self.d_host = {}  # speaker key -> {'num_fail': n, 'num_err': n, 'num_run': n, 'd_hold_end': t, ...}
+
+    def set_cls(self, str_cls, d_timeout=-1, num_retry=None, b_idem=None):
+        """
+        set timeout and retries of operation class
+        :param str_cls:
+        :param d_timeout: [sec], None: no timeout (call runs in calling thread), -1: unchanged
+        :param num_retry: None: unchanged
+        :param b_idem: calls are idempotent (retried also after a timeout), None: unchanged
+        """
+        d_set = self.d_cls.setdefault(str_cls, {'d_timeout': None, 'num_retry': 0, 'b_idem': False})
+        if d_timeout != -1:
+            d_set['d_timeout'] = d_timeout
+        if num_retry is not None:
+            d_set['num_retry'] = num_retry
+        if b_idem is not None:
+            d_set['b_idem'] = b_idem
+
+    def deadline(self, d_time):
+        """
+        get deadline for all calls of the calling thread as context manager (nested deadlines: earliest wins)
+        :param d_time: time from now [sec]
+        :return:
+        """
+        return CallDeadline(self, d_time)
+
+    def get_remain(self):
+        """
+        get remaining time until deadline of calling thread
+        :return: [sec], None: no deadline
+        """
+        d_time_end = getattr(self.loc, 'd_time_end', None)
+        if d_time_end is None:
+            return None
+        return d_time_end - time.time()
+
+    def get_timeout(self, str_cls):
+        """
+        get timeout of next call of operation class, limited by deadline
+        :param str_cls:
+        :return: [sec], None: no timeout
+        """
+        d_timeout = self.d_cls[str_cls]['d_timeout']
+        d_remain = self.get_remain()
+        if d_remain is None:
+            return d_timeout
+        if d_remain <= 0:
+            raise TimeoutError('deadline exceeded')
+        return d_remain if d_timeout is None else min(d_timeout, d_remain)
+
+    def call(self, str_cls, str_op, fn, key=None, fn_slot=None):
+        """
+        call method with policy of operation class
+        :param str_cls: operation class ('read', 'bulk', 'probe', 'write')
+        :param str_op: operation name (error counters)
+        :param fn: method without arguments
+        :param key: speaker key (ip address)
+        :param fn_slot: method returning context manager held during each try (request slot), if the context
+                        manager has a method get_hold, the slot is kept busy until a timed out call is finished
+        :return: result of fn
+        """
+        num_retry = self.d_cls[str_cls]['num_retry']
+        b_idem = self.d_cls[str_cls].get('b_idem', False)
+        idx_try = 0
+        while True:
+            try:
+                self.chk_hold(key)
+                d_timeout = self.get_timeout(str_cls)
+                if fn_slot is None:
+                    result = self.get_run(fn, d_timeout, key)
+                else:
+                    with fn_slot() as slot:
+                        result = self.get_run(fn, d_timeout, key, getattr(slot, 'get_hold', None))
+            except Exception as err:
+                str_res = self.set_err(str_op, key, err)
+                if str_res == 'reject' or idx_try >= num_retry or not isinstance(err, self.A_EXC_RETRY):
+                    raise
+                if str_res == 'timeout' and not b_idem:
+                    raise  # call may have been executed by the speaker
+                d_wait = self.d_backoff * 2 ** idx_try * random.uniform(0.5, 1.5)
+                d_remain = self.get_remain()
+                if d_remain is not None and d_remain <= d_wait:
+                    raise
+                idx_try = idx_try + 1
+                self.add_stat(str_op, 'retry')
+                time.sleep(d_wait)
+            else:
+                self.set_ok(str_op, key)
+                return result
+
+    def get_run(self, fn, d_timeout, key=None, fn_hold=None):
+        """
+        run method on worker thread and wait for result
+        :param fn:
+        :param d_timeout: [sec], None: run in calling thread
+        :param key: speaker key, limits the calls per speaker still running after their timeout
+        :param fn_hold: method called on timeout, returns method called when the worker is finished
+        :return:
+        """
+        if d_timeout is None:
+            return fn()
+        fut = concurrent.futures.Future()
+        with self.lock:
+            if self.b_closed:
+                raise RuntimeError('call policy is closed')
+            if key is not None:
+                d_host = self.get_host(key)
+                if d_host['num_run'] >= self.num_run_host_max:
+                    raise CallRejected('too many pending calls: ' + str(key))
+                d_host['num_run'] = d_host['num_run'] + 1
+            self.q_call.put((fut, fn, key))
+            if self.num_idle > 0:
+                self.num_idle = self.num_idle - 1
+            elif len(self.a_worker) < self.num_workers_max:
+                th_worker = threading.Thread(target=self.run, name='CoSoCoW-Call')
+                th_worker.daemon = True
+                self.a_worker.append(th_worker)
+                th_worker.start()
+        try:
+            return fut.result(d_timeout)
+        except concurrent.futures.TimeoutError:
+            if not fut.cancel() and fn_hold is not None:
+                # call is running: request slot stays busy until it is finished
+                fn_release = fn_hold()
+                fut.add_done_callback(lambda fut_done: fn_release())
+            raise TimeoutError('no response within ' + str(round(d_timeout, 3)) + ' s')
+
+    def run(self):
+        """
+        worker thread, runs calls until idle for some time
+        """
+        while True:
+            try:
+                item = self.q_call.get(timeout=30.0)
+            except queue.Empty:
+                with self.lock:
+                    if self.q_call.empty():
+                        self.num_idle = self.num_idle - 1
+                        self.a_worker.remove(threading.current_thread())
+                        return
+                continue
+            if item is None:
+                return
+            fut, fn, key = item
+            if fut.set_running_or_notify_cancel():
+                try:
+                    fut.set_result(fn())
+                except BaseException as err:
+                    fut.set_exception(err)
+            with self.lock:
+                self.num_idle = self.num_idle + 1
+                if key is not None:
+                    d_host = self.d_host[key]
+                    d_host['num_run'] = d_host['num_run'] - 1
+
+    def chk_hold(self, key):
+        """
+        check if speaker is on hold (raises CallRejected)
+        :param key:
+        """
+        with self.lock:
+            d_host = self.d_host.get(key)
+            if d_host is not None and d_host['d_hold_end'] > time.time():
+                raise CallRejected('speaker on hold: ' + str(key))
+
+    def add_stat(self, str_op, str_res):
+        """
+        count result of operation
+        :param str_op:
+        :param str_res: one of A_STAT
+        """
+        with self.lock:
+            d_op = self.d_stat.get(str_op)
+            if d_op is None:
+                d_op = dict((str_key, 0) for str_key in self.A_STAT)
+                self.d_stat[str_op] = d_op
+            d_op[str_res] = d_op[str_res] + 1
+
+    def get_host(self, key):
+        """
+        get error state of speaker (call with lock)
+        :param key:
+        :return:
+        """
+        d_host = self.d_host.get(key)
+        if d_host is None:
+            d_host = {'num_fail': 0, 'num_err': 0, 'num_run': 0, 'd_hold_end': 0.0, 'last': None}
+            self.d_host[key] = d_host
+        return d_host
+
+    def set_ok(self, str_op, key):
+        """
+        count successful call
+        :param str_op:
+        :param key:
+        """
+        self.add_stat(str_op, 'ok')
+        if key is not None:
+            with self.lock:
+                d_host = self.d_host.get(key)
+                if d_host is not None:
+                    d_host['num_fail'] = 0
+
+    def set_err(self, str_op, key, err):
+        """
+        count failed call, put speaker on hold after num_fail_max transient failures in a row
+        :param str_op:
+        :param key:
+        :param err: exception
+        :return: counted result ('err', 'timeout' or 'reject')
+        """
+        if isinstance(err, CallRejected):
+            self.add_stat(str_op, 'reject')
+            return 'reject'
+        str_res = 'timeout' if isinstance(err, self.A_EXC_TIMEOUT) else 'err'
+        self.add_stat(str_op, str_res)
+        b_hold = False
+        with self.lock:
+            self.d_err_type[err.__class__.__name__] += 1
+            if key is not None:
+                d_host = self.get_host(key)
+                d_host['num_err'] = d_host['num_err'] + 1
+                d_host['last'] = [time.time(), str_op, err.__class__.__name__ + ': ' + str(err)]
+                if isinstance(err, self.A_EXC_RETRY):
+                    d_host['num_fail'] = d_host['num_fail'] + 1
+                    if d_host['num_fail'] >= self.num_fail_max:
+                        d_host['d_hold_end'] = time.time() + self.d_hold
+                        b_hold = True
+        if self.fn_log is not None:
+            self.fn_log(' :x call failed: ' + str(str_op) + ' ' + str(key) + ': ' + err.__class__.__name__ + ' '
+                        + str(err) + (' (on hold)' if b_hold else ''))
+        return str_res
+
+    def get_stat(self):
+        """
+        get error counters
+        :return: {'op': {operation: {'ok': n, ...}}, 'err_type': {exception class: n}, 'host': {key: {...}}}
+        """
+        with self.lock:
+            d_time = time.time()
+            return {'op': dict((str_op, dict(d_op)) for str_op, d_op in self.d_stat.items()),
+                    'err_type': dict(self.d_err_type),
+                    'host': dict((key, {'num_err': d_host['num_err'], 'num_fail': d_host['num_fail'],
+                                        'num_run': d_host['num_run'], 'b_hold': d_host['d_hold_end'] > d_time,
+                                        'last': d_host['last']})
+                                 for key, d_host in self.d_host.items())}
+
+    def close(self):
+        """
+        stop worker threads (running calls are not waited for)
+        """
+        with self.lock:
+            self.b_closed = True
+            num_worker = len(self.a_worker)
+        for idx in range(num_worker):
+            self.q_call.put(None)
+
+
+class CallDeadline(object):
+
+    def __init__(self, policy, d_time):
+        self.policy = policy
+        self.d_time = d_time
+        self.d_time_end_old = None
+
+    def __enter__(self):
+        self.d_time_end_old = getattr(self.policy.loc, 'd_time_end', None)
+        d_time_end = time.time() + self.d_time
+        if self.d_time_end_old is not None:
+            d_time_end = min(d_time_end, self.d_time_end_old)
+        self.policy.loc.d_time_end = d_time_end
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.policy.loc.d_time_end = self.d_time_end_old
+        return False
+
+
+class CallRejected(ConnectionError):
+    """
+    call not sent, speaker is on hold after repeated failures
+    """
+
+
+class VolCtrl(object):
+    """
+    coalesced volume control with cached volume level per zone
+
+    Changes within a short time window are merged into one command per zone. Only one command per zone is
+    sent at a time, changes during a send are sent after it (so levels arrive in order, last value wins).
+    Absolute levels are sent as absolute levels (SetVolume / SetGroupVolume), so a stale cached level
+    (CoSoCoW.a_volume / a_group_volume) does not change the result. Steps ('up' / 'dn') use the relative
+    volume action of the speaker (if available), which clamps and returns the new level.
+    """
+
+    def __init__(self, mc, d_window=0.05):
+        """
+
+        :param mc: CoSoCoW object
+        :param d_window: time window to coalesce volume changes [sec]
+        """
+        self.mc = mc
+        self.d_window = d_window
+        self.lock = threading.Lock()
+        self.d_pend = {}
+        self.d_timer = {}
+        self.d_actv = {}
+        self.d_rel_avail = {}
+
+    def set_vol_rel(self, idx_zone, d_delta, b_group=False):
+        """
+        change volume relative, coalesced
+        :param idx_zone: index of zone (group: index of coordinator)
+        :param d_delta: volume step
+        :param b_group:
+        """
+        with self.lock:
+            a_pend = self.d_pend.setdefault((idx_zone, b_group), [0, None])
+            if a_pend[1] is None:
+                a_pend[0] = a_pend[0] + int(d_delta)
+            else:
+                a_pend[1] = a_pend[1] + int(d_delta)
+            self.set_timer((idx_zone, b_group))
+
+    def set_vol(self, idx_zone, d_vol, b_group=False):
+        """
+        set volume absolute, coalesced (last value wins)
+        :param idx_zone: index of zone (group: index of coordinator)
+        :param d_vol: volume level
+        :param b_group:
+        """
+        with self.lock:
+            self.d_pend[(idx_zone, b_group)] = [0, int(d_vol)]
+            self.set_timer((idx_zone, b_group))
+
+    def close(self):
+        """
+        drop pending volume changes
+        """
+        with self.lock:
+            for t_flush in self.d_timer.values():
+                t_flush.cancel()
+            self.d_timer = {}
+            self.d_pend = {}
+            self.d_actv = {}
+
+    def set_zone_remove(self, idx_zone):
+        """
+        drop pending volume changes of removed zone, zones behind get index - 1
+        :param idx_zone:
+        """
+        with self.lock:
+            for key in sorted(self.d_actv):
+                if key[0] >= idx_zone:
+                    t_actv = self.d_actv.pop(key)
+                    if key[0] > idx_zone:
+                        self.d_actv[(key[0] - 1, key[1])] = t_actv
+            for key in sorted(set(self.d_pend) | set(self.d_timer)):
+                if key[0] < idx_zone:
+                    continue
+                t_flush = self.d_timer.pop(key, None)
+                if t_flush is not None:
+                    t_flush.cancel()
+                a_pend = self.d_pend.pop(key, None)
+                if key[0] > idx_zone and a_pend is not None:
+                    key_new = (key[0] - 1, key[1])
+                    self.d_pend[key_new] = a_pend
+                    self.set_timer(key_new)
+
+    def set_timer(self, key):
+        """
+        start timer of time window (call with lock), not while a command of the zone is sent
+        :param key:
+        """
+        if key not in self.d_timer and key not in self.d_actv:
+            t_flush = threading.Timer(self.d_window, self.set_flush, [key])
+            t_flush.daemon = True
+            self.d_timer[key] = t_flush
+            t_flush.start()
+
+    def set_flush(self, key):
+        """
+        send pending volume change of zone
+        :param key: (idx_zone, b_group)
+        """
+        with self.lock:
+            if self.d_timer.get(key) is threading.current_thread():
+                del self.d_timer[key]
+            if key not in self.d_pend:
+                return  # dropped by close or zone removal
+            d_delta, d_vol_abs = self.d_pend.pop(key)
+            self.d_actv[key] = threading.current_thread()
+
+        idx_zone, b_group = key
+        try:
+            if b_group:
+                self.set_vol_group(idx_zone, d_delta, d_vol_abs)
+            else:
+                self.set_vol_zone(idx_zone, d_delta, d_vol_abs)
+        except:
+            self.mc.add_trace('sound', 1, ' :1 set_volume: Z%s failed', idx_zone)
+        finally:
+            with self.lock:
+                # key may be renumbered by zone removal meanwhile
+                for key_actv, t_actv in list(self.d_actv.items()):
+                    if t_actv is threading.current_thread():
+                        del self.d_actv[key_actv]
+                        if key_actv in self.d_pend:
+                            self.set_timer(key_actv)
+
+    def set_vol_zone(self, idx_zone, d_delta=0, d_vol_abs=None):
+        """
+        send volume of zone now: absolute level by SetVolume, step by SetRelativeVolume (clamped by the speaker)
+        :param idx_zone:
+        :param d_delta: volume step (used if d_vol_abs is None)
+        :param d_vol_abs: volume level
+        :return: new volume level
+        """
+        z_req = self.mc.get_zone(idx_zone)
+        if z_req is None:
+            return -1  # zone not available
+
+        with self.mc.get_req_slot(z_req):
+            if d_vol_abs is not None:
+                d_vol_new = max(0, min(int(d_vol_abs), 100))
+                self.set_vol_abs(z_req, d_vol_new)
+            elif d_delta == 0:
+                return self.mc.a_volume[idx_zone]
+            elif self.d_rel_avail.get(z_req.ip_address, True):
+                try:
+                    res = self.mc.get_call(z_req, 'write', 'SetRelativeVolume', lambda: z_req.renderingControl.
+                                           SetRelativeVolume([('InstanceID', 0), ('Channel', 'Master'),
+                                                              ('Adjustment', int(d_delta))]))
+                    d_vol_new = int(res['NewVolume'])
+                except CallPolicy.A_EXC_RETRY:
+                    raise  # speaker not reachable, not a missing action
+                except:
+                    self.d_rel_avail[z_req.ip_address] = False
+                    d_vol_new = self.set_vol_step(z_req, d_delta)
+            else:
+                d_vol_new = self.set_vol_step(z_req, d_delta)
+
+        self.mc.set_volume_cache(idx_zone, d_vol_new)
+        return d_vol_new
+
+    def set_vol_step(self, z_req, d_delta):
+        """
+        change volume by step without relative volume action: read current level from speaker, send absolute level
+        :param z_req: speaker object
+        :param d_delta: volume step
+        :return: new volume level
+        """
+        d_vol_cur = self.mc.get_call(z_req, 'read', 'volume', lambda: z_req.volume)
+        d_vol_new = max(0, min(int(d_vol_cur + d_delta), 100))
+        if d_vol_new != d_vol_cur:
+            self.set_vol_abs(z_req, d_vol_new)
+        return d_vol_new
+
+    def set_vol_abs(self, z_req, d_vol):
+        """
+        send absolute volume level to speaker
+        :param z_req: speaker object
+        :param d_vol: volume level
+        """
+        def set_vol():
+            z_req.volume = d_vol
+        self.mc.get_call(z_req, 'write', 'set_volume', set_vol)
+
+    def set_vol_group(self, idx_coo, d_delta=0, d_vol_abs=None):
+        """
+        send volume of group now by the group rendering service of the coordinator:
+        absolute level by SetGroupVolume, step by SetRelativeGroupVolume (clamped by the speaker)
+        :param idx_coo: index of group coordinator
+        :param d_delta: volume step (used if d_vol_abs is None)
+        :param d_vol_abs: volume level
+        :return: new group volume level
+        """
+        z_req = self.mc.get_zone(idx_coo)
+        if z_req is None:
+            return -1  # zone not available
+        if d_vol_abs is None and d_delta == 0:
+            return self.mc.a_group_volume[idx_coo]
+
+        with self.mc.get_req_slot(z_req):
+            self.mc.get_call(z_req, 'write', 'SnapshotGroupVolume', lambda: z_req.groupRenderingControl.
+                             SnapshotGroupVolume([('InstanceID', 0)]))
+            if d_vol_abs is not None:
+                d_vol_new = max(0, min(int(d_vol_abs), 100))
+                self.mc.get_call(z_req, 'write', 'SetGroupVolume', lambda: z_req.groupRenderingControl.
+                                 SetGroupVolume([('InstanceID', 0), ('DesiredVolume', d_vol_new)]))
+            else:
+                res = self.mc.get_call(z_req, 'write', 'SetRelativeGroupVolume', lambda: z_req.groupRenderingControl.
+                                       SetRelativeGroupVolume([('InstanceID', 0), ('Adjustment', int(d_delta))]))
+                d_vol_new = int(res['NewVolume'])
+
+        self.mc.set_volume_cache(idx_coo, d_vol_new, True)
+        return d_vol_new
+
+    def get_vol_group(self, idx_coo):
+        """
+        read volume of group from coordinator and update cache (group volume is not sent by events)
+        :param idx_coo: index of group coordinator
+        :return: group volume level
+        """
+        z_req = self.mc.get_zone(idx_coo)
+        if z_req is None:
+            return -1  # zone not available
+        res = self.mc.get_call(z_req, 'read', 'GetGroupVolume', lambda: z_req.groupRenderingControl.
+                               GetGroupVolume([('InstanceID', 0)]))
+        d_vol_cur = int(res['CurrentVolume'])
+        self.mc.set_volume_cache(idx_coo, d_vol_cur, True)
+        return d_vol_cur
+
+
+class VolFade(object):
+    """
+    running volume fade of a set of zones
+    """
+
+    def __init__(self, eng, a_idx_zone, a_lvl, d_period):
+        """
+
+        :param eng: VolFadeEng object
+        :param a_idx_zone: zone indices
+        :param a_lvl: volume levels per zone and step
+        :param d_period: time between two steps [sec]
+        """
+        self.eng = eng
+        self.a_idx_zone = list(a_idx_zone)
+        self.d_lvl = dict(zip(a_idx_zone, a_lvl))
+        self.num_steps = len(a_lvl[0]) - 1 if len(a_lvl) > 0 else 0
+        self.d_period = d_period
+        self.d_time_start = time.time()
+        self.d_sent = {}
+        self.ev_done = threading.Event()
+        self.b_cancel = False
+
+    def __repr__(self):
+        return 'VolFade(%s, %d steps)' % (self.a_idx_zone, self.num_steps)
+
+    def cancel(self):
+        """
+        stop fade, volume levels stay where they are
+        """
+        self.eng.set_cancel(self)
+
+    def wait(self, d_timeout=None):
+        """
+        wait until fade is finished
+        :param d_timeout: [sec]
+        :return: True if finished
+        """
+        return self.ev_done.wait(d_timeout)
+
+    def is_done(self):
+        return self.ev_done.is_set()
+
+    def get_step(self, d_time_cur):
+        """
+        get current step index
+        :param d_time_cur:
+        :return:
+        """
+        if self.d_period <= 0:
+            return self.num_steps
+        return max(0, min(self.num_steps, int((d_time_cur - self.d_time_start) / self.d_period)))
+
+
+class VolFadeEng(object):
+    """
+    volume fade engine
+
+    All volume levels of a fade are computed up front. One engine thread sends the
+    levels of all running fades at a fixed rate per speaker, the zones of a step are
+    sent concurrently. A new fade on a zone replaces the running fade on that zone.
+    """
+
+    def __init__(self, mc, num_workers=8):
+        """
+
+        :param mc: CoSoCoW object
+        :param num_workers: max. number of parallel volume commands
+        """
+        self.mc = mc
+        self.num_workers = num_workers
+        self.cond = threading.Condition()
+        self.a_fade = []
+        self.d_zone_fade = {}
+        self.d_zone_busy = {}
+        self.th_fade = None
+        self.pool = None
+
+    @staticmethod
+    def get_curve(str_curve, num_steps):
+        """
+        get curve values (0 .. 1) of all steps
+        :param str_curve: 'linear', 'ease', 'exp' or 'log'
+        :param num_steps:
+        :return: list with num_steps + 1 values
+        """
+        a_t = [idx / float(num_steps) for idx in range(num_steps + 1)]
+        if str_curve == 'linear':
+            return a_t
+        elif str_curve == 'ease':
+            return [t * t * (3.0 - 2.0 * t) for t in a_t]
+        elif str_curve == 'exp':
+            return [t * t for t in a_t]
+        elif str_curve == 'log':
+            return [1.0 - (1.0 - t) * (1.0 - t) for t in a_t]
+        else:
+            raise ValueError('unknown fade curve: ' + str(str_curve))
+
+    def set_fade(self, a_idx_zone, a_vol_start, a_vol_target, d_duration, str_curve='linear', d_rate=4.0):
+        """
+        start fade
+        :param a_idx_zone: zone indices
+        :param a_vol_start: start level per zone
+        :param a_vol_target: target level per zone
+        :param d_duration: [sec]
+        :param str_curve:
+        :param d_rate: steps per sec
+        :return: VolFade object
+        """
+        num_steps = max(1, int(round(d_duration * d_rate)))
+        a_curve = self.get_curve(str_curve, num_steps)
+        a_lvl = []
+        for d_vol_start, d_vol_target in zip(a_vol_start, a_vol_target):
+            d_vol_start = max(0, min(int(d_vol_start), 100))
+            d_vol_diff = max(0, min(int(d_vol_target), 100)) - d_vol_start
+            a_lvl.append([int(round(d_vol_start + d_vol_diff * c)) for c in a_curve])
+
+        fade = VolFade(self, a_idx_zone, a_lvl, d_duration / float(num_steps))
+        with self.cond:
+            for idx_zone in a_idx_zone:
+                self.set_release_zone(idx_zone)
+                self.d_zone_fade[idx_zone] = fade
+            self.a_fade.append(fade)
+            if self.th_fade is None:
+                self.th_fade = threading.Thread(target=self.run, name='CoSoCoW-VolFade')
+                self.th_fade.daemon = True
+                self.th_fade.start()
+            self.cond.notify_all()
+        return fade
+
+    def set_release_zone(self, idx_zone):
+        """
+        remove zone from its running fade (call with lock)
+        :param idx_zone:
+        """
+        fade = self.d_zone_fade.pop(idx_zone, None)
+        if fade is not None and idx_zone in fade.a_idx_zone:
+            fade.a_idx_zone.remove(idx_zone)
+            if len(fade.a_idx_zone) == 0:
+                self.set_done(fade)
+
+    def set_done(self, fade):
+        """
+        mark fade as finished (call with lock)
+        :param fade:
+        """
+        for idx_zone in fade.a_idx_zone:
+            if self.d_zone_fade.get(idx_zone) is fade:
+                del self.d_zone_fade[idx_zone]
+        if fade in self.a_fade:
+            self.a_fade.remove(fade)
+        fade.ev_done.set()
+
+    def set_cancel(self, fade):
+        """
+        stop fade
+        :param fade:
+        """
+        with self.cond:
+            fade.b_cancel = True
+            self.set_done(fade)
+            self.cond.notify_all()
+
+    def set_cancel_zone(self, idx_zone):
+        """
+        stop fade of zone
+        :param idx_zone:
+        """
+        with self.cond:
+            if idx_zone in self.d_zone_fade:
+                self.set_release_zone(idx_zone)
+                self.cond.notify_all()
+
+    def set_zone_remove(self, idx_zone):
+        """
+        stop fade of removed zone, zones behind get index - 1
+        :param idx_zone:
+        """
+        def get_idx(idx):
+            return idx - 1 if idx > idx_zone else idx
+
+        with self.cond:
+            self.set_release_zone(idx_zone)
+            self.d_zone_busy.pop(idx_zone, None)
+            for fade in self.a_fade:
+                fade.a_idx_zone = [get_idx(idx) for idx in fade.a_idx_zone]
+                fade.d_lvl = dict((get_idx(idx), a_lvl) for idx, a_lvl in fade.d_lvl.items() if idx != idx_zone)
+                fade.d_sent = dict((get_idx(idx), d_vol) for idx, d_vol in fade.d_sent.items() if idx != idx_zone)
+            self.d_zone_fade = dict((get_idx(idx), fade) for idx, fade in self.d_zone_fade.items())
+            self.d_zone_busy = dict((get_idx(idx), busy) for idx, busy in self.d_zone_busy.items())
+            self.cond.notify_all()
+
+    def set_cancel_all(self):
+        """
+        stop all fades
+        """
+        with self.cond:
+            for fade in list(self.a_fade):
+                fade.b_cancel = True
+                self.set_done(fade)
+            self.cond.notify_all()
+
+    def set_send(self, fade, idx_zone, d_vol):
+        """
+        send volume level of zone (worker thread)
+        :param fade:
+        :param idx_zone:
+        :param d_vol:
+        """
+        try:
+            self.mc.vol_ctrl.set_vol_zone(idx_zone, d_vol_abs=d_vol)
+        except:
+            self.mc.add_trace('sound', 1, ' :1 set_volume_fade: Z%s failed', idx_zone)
+
+    def run(self):
+        """
+        engine thread
+        """
+        while True:
+            with self.cond:
+                if len(self.a_fade) == 0:
+                    self.th_fade = None
+                    return
+
+                d_time_cur = time.time()
+                d_time_wait = None
+                a_send = []
+                for fade in list(self.a_fade):
+                    idx_step = fade.get_step(d_time_cur)
+                    b_final = idx_step == fade.num_steps
+                    b_pend = False
+                    num_send = len(a_send)
+                    for idx_zone in fade.a_idx_zone:
+                        d_vol = fade.d_lvl[idx_zone][idx_step]
+                        busy = self.d_zone_busy.get(idx_zone)
+                        if busy is not None and not busy.done():
+                            b_pend = True  # speaker is still busy with last step
+                            continue
+                        if fade.d_sent.get(idx_zone) == d_vol:
+                            continue
+                        fade.d_sent[idx_zone] = d_vol
+                        a_send.append((fade, idx_zone, d_vol))
+
+                    if b_final and not b_pend and len(a_send) == num_send:
+                        self.set_done(fade)
+                        continue
+
+                    if b_final:
+                        continue  # final level is pending: woken when the speaker is done (set_notify)
+                    d_time_next = fade.d_time_start + (idx_step + 1) * fade.d_period
+                    if d_time_wait is None or d_time_next - d_time_cur < d_time_wait:
+                        d_time_wait = max(0.0, d_time_next - d_time_cur)
+
+                if len(a_send) > 0 and self.pool is None:
+                    self.pool = concurrent.futures.ThreadPoolExecutor(self.num_workers)
+                for fade, idx_zone, d_vol in a_send:
+                    busy = self.pool.submit(self.set_send, fade, idx_zone, d_vol)
+                    self.d_zone_busy[idx_zone] = busy
+                    busy.add_done_callback(self.set_notify)
+
+                if len(a_send) == 0 and len(self.a_fade) > 0:
+                    self.cond.wait(d_time_wait)
+
+    def set_notify(self, busy):
+        """
+        wake engine thread, a volume command is finished (done callback of send)
+        :param busy: future of send
+        """
+        with self.cond:
+            self.cond.notify_all()
+
+    def close(self):
+        """
+        stop all fades and workers
+        """
+        self.set_cancel_all()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+
+class ActionSched(object):
+    """
+    scheduler of actions (CoSoCoW commands) with one-shot, interval and cron rules
+
+    All rules are kept in one timer heap served by one thread, removed or rescheduled rules leave stale heap
+    entries that are dropped when popped (version per rule). Rule times are wall clock times. A jump of the
+    wall clock against the monotonic clock (clock change, suspend) is detected after each wait. A rule found due
+    later than its grace time is a misfire: 'skip' drops the occurrence, 'run' runs it once (also if several
+    occurrences were missed). Actions run in a worker thread, the actions of one rule in order.
+    Zone indices in the arguments of actions are stored as zone reference (speaker uid and zone name) and
+    resolved to the current index when the rule runs, an action of an unknown zone fails.
+    Rules are stored as json file by the timer thread, at most once per d_save.
+    """
+    A_ACT = ('set_radio_play', 'set_volume', 'set_volume_fade', 'set_play_start_stop', 'set_group',
+             'apply_topology', 'set_play_mode', 'set_sleep_timer', 'set_queue_track_play', 'set_aux_play')
+    D_ACT_ZONE = {  # command -> (positions, names) of zone arguments
+        'set_radio_play': ((0,), ('idx_zone',)),
+        'set_volume': ((0,), ('idx_zone',)),
+        'set_volume_fade': ((0,), ('a_idx_zone',)),
+        'set_play_start_stop': ((0,), ('idx_zone',)),
+        'set_group': ((1, 2), ('idx_main_zone', 'idx_join_zone')),
+        'apply_topology': ((0,), ('a_target',)),
+        'set_play_mode': ((0,), ('idx_zone',)),
+        'set_sleep_timer': ((0,), ('idx_zone',)),
+        'set_queue_track_play': ((0,), ('idx_zone',)),
+        'set_aux_play': ((0,), ('idx_zone',)),
+    }
+    A_MISFIRE = ('skip', 'run')
+    A_CRON_RANGE = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))  # minute, hour, day of month, month, day of week
+    A_AT_FMT = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%H:%M:%S', '%H:%M')
+
+    def __init__(self, mc, str_file=''):
+        """
+
+        :param mc: CoSoCoW object
+        :param str_file: rule file, '': not persistent
+        """
+        self.mc = mc
+        self.str_file = str_file
+        self.cond = threading.Condition()
+        self.d_rule = {}  # id -> rule
+        self.d_ver = {}  # id -> version of heap entry
+        self.heap = []  # (time, version, id)
+        self.num_ver = 0
+        self.num_id = 0
+        self.d_check = 30.0  # max. wait between clock checks [sec]
+        self.d_jump_tol = 2.0  # tolerance of clock jump detection [sec]
+        self.d_save = 1.0  # delay of saving after change [sec]
+        self.d_time_save = None  # time of pending save (monotonic)
+        self.b_cng = False
+        self.b_closed = False
+        self.pool = concurrent.futures.ThreadPoolExecutor(2)
+        self.load()
+        self.th_sched = threading.Thread(target=self.run, name='CoSoCoW-Sched')
+        self.th_sched.daemon = True
+        self.th_sched.start()
+
+    def load(self):
+        """
+        load rule file
+        """
+        if not self.str_file or not os.path.isfile(self.str_file):
+            return
+        try:
+            with open(self.str_file, 'r') as f:
+                d_rule = json.load(f).get('rules', {})
+        except (IOError, OSError, ValueError):
+            print('Schedule not readable: ' + self.str_file)
+            return
+        with self.cond:
+            for str_id, rule in d_rule.items():
+                self.d_rule[str_id] = rule
+                if rule.get('d_next') is None:
+                    rule['d_next'] = self.get_next(rule, time.time())
+                self.set_push(rule)
+
+    def set_cng(self):
+        """
+        rules changed, save is pending (call with lock)
+        """
+        self.b_cng = True
+        if self.d_time_save is None:
+            self.d_time_save = time.monotonic() + self.d_save
+        self.cond.notify_all()
+
+    def save(self):
+        """
+        save rule file (only if changed)
+        """
+        with self.cond:
+            self.d_time_save = None
+            if not self.b_cng or not self.str_file:
+                return
+            str_data = json.dumps({'version': 1, 'rules': self.d_rule}, indent=1, sort_keys=True)
+            self.b_cng = False
+        str_file_tmp = self.str_file + '.tmp'
+        try:
+            with open(str_file_tmp, 'w') as f:
+                f.write(str_data)
+            os.replace(str_file_tmp, self.str_file)
+        except (IOError, OSError):
+            print('Schedule not writable: ' + self.str_file)
+
+    def add(self, a_act, d_at=None, d_every=None, str_cron=None, str_id=None, str_misfire='skip', d_grace=300.0):
+        """
+        add rule (replaces rule of same id)
+        :param a_act: actions, list of [command, args] or [command, args, kwargs] (commands of A_ACT),
+                      zone indices are stored as zone reference (see get_zone_ref)
+        :param d_at: one-shot: time (epoch) or local time 'YYYY-MM-DD HH:MM[:SS]' or 'HH:MM[:SS]' (next occurrence),
+                     with d_every: first run
+        :param d_every: interval [sec]
+        :param str_cron: cron expression 'minute hour day_of_month month day_of_week' (local time, 0 = Sunday)
+        :param str_id: id of rule, None: new id
+        :param str_misfire: 'skip' or 'run', see class
+        :param d_grace: max. delay of a run before it is a misfire [sec]
+        :return: id of rule
+        """
+        a_act_chk = []
+        for act in a_act:
+            if act[0] not in self.A_ACT:
+                raise ValueError('schedule: command not allowed: ' + str(act[0]))
+            a_act_chk.append([act[0], list(act[1]) if len(act) > 1 else [], dict(act[2]) if len(act) > 2 else {}])
+        a_act_chk = self.set_zone_arg(a_act_chk, self.get_zone_ref)
+        if str_misfire not in self.A_MISFIRE:
+            raise ValueError('schedule: misfire: ' + str(str_misfire))
+        if (str_cron is None) == (d_at is None and d_every is None):
+            raise ValueError('schedule: either time / interval or cron expression')
+        if str_cron is not None:
+            self.get_cron(str_cron)
+        if d_every is not None and d_every <= 0:
+            raise ValueError('schedule: interval: ' + str(d_every))
+
+        d_now = time.time()
+        rule = {'a_act': a_act_chk, 'd_every': d_every, 'str_cron': str_cron, 'str_misfire': str_misfire,
+                'd_grace': d_grace, 'd_last': None, 'num_run': 0, 'num_miss': 0, 'str_err': None}
+        if d_at is not None:
+            rule['d_next'] = self.get_at(d_at, d_now)
+        else:
+            rule['d_next'] = self.get_next(rule, d_now)
+        with self.cond:
+            if str_id is None:
+                while 'r' + str(self.num_id) in self.d_rule:
+                    self.num_id += 1
+                str_id = 'r' + str(self.num_id)
+            rule['str_id'] = str_id
+            self.d_rule[str_id] = rule
+            self.set_push(rule)
+            self.set_cng()
+        self.mc.add_trace('sched', 2, ' :t add rule %s, next %s', str_id, self.get_time_str(rule['d_next']))
+        return str_id
+
+    def remove(self, str_id):
+        """
+        remove rule
+        :param str_id:
+        :return: True if found
+        """
+        with self.cond:
+            rule = self.d_rule.pop(str_id, None)
+            self.d_ver.pop(str_id, None)
+            if rule is None:
+                return False
+            if len(self.heap) > 2 * len(self.d_rule) + 64:
+                # drop stale heap entries
+                self.heap = [entry for entry in self.heap if self.d_ver.get(entry[2]) == entry[1]]
+                heapq.heapify(self.heap)
+            self.set_cng()
+        return True
+
+    def get_rules(self):
+        """
+        get rules
+        :return: list of rule copies, next run first
+        """
+        with self.cond:
+            a_rule = [dict(rule) for rule in self.d_rule.values()]
+        return sorted(a_rule, key=lambda rule: rule['d_next'] if rule['d_next'] is not None else float('inf'))
+
+    def set_push(self, rule):
+        """
+        put rule into timer heap with new version (call with lock)
+        :param rule:
+        """
+        self.num_ver += 1
+        self.d_ver[rule['str_id']] = self.num_ver
+        if rule['d_next'] is not None:
+            heapq.heappush(self.heap, (rule['d_next'], self.num_ver, rule['str_id']))
+
+    def run(self):
+        """
+        timer thread
+        """
+        with self.cond:
+            d_wall = time.time()
+            d_mono = time.monotonic()
+            while not self.b_closed:
+                d_now = time.time()
+                d_jump = (d_now - d_wall) - (time.monotonic() - d_mono)
+                if abs(d_jump) > self.d_jump_tol:
+                    self.set_clock_jump(d_now, d_jump)
+                while self.heap and self.heap[0][0] <= d_now:
+                    d_due, num_ver, str_id = heapq.heappop(self.heap)
+                    if self.d_ver.get(str_id) == num_ver:
+                        self.set_due(self.d_rule[str_id], d_due, d_now)
+                if self.d_time_save is not None and time.monotonic() >= self.d_time_save:
+                    self.save()
+                d_wait = self.d_check if not self.heap else min(self.d_check, self.heap[0][0] - d_now)
+                if self.d_time_save is not None:
+                    d_wait = min(d_wait, self.d_time_save - time.monotonic())
+                d_wall = time.time()
+                d_mono = time.monotonic()
+                self.cond.wait(max(0.0, d_wait))
+
+    def set_due(self, rule, d_due, d_now):
+        """
+        rule is due: run actions or skip misfire, schedule next run (call with lock)
+        :param rule:
+        :param d_due: scheduled time
+        :param d_now:
+        """
+        str_id = rule['str_id']
+        if d_now - d_due > rule['d_grace'] and rule['str_misfire'] == 'skip':
+            rule['num_miss'] += 1
+            self.mc.add_trace('sched', 1, ' :t rule %s missed (%.0f s late)', str_id, d_now - d_due)
+        else:
+            rule['d_last'] = d_now
+            rule['num_run'] += 1
+            self.pool.submit(self.set_act, rule, rule['a_act'])
+        if rule['d_every'] is not None:
+            # next occurrence after now, missed occurrences are passed over
+            num_step = max(1, int(math.floor((d_now - d_due) / rule['d_every'])) + 1)
+            rule['d_next'] = d_due + num_step * rule['d_every']
+        else:
+            rule['d_next'] = self.get_next(rule, max(d_now, d_due))
+        self.set_cng()
+        if rule['d_next'] is None:
+            # one-shot done
+            del self.d_rule[str_id]
+            del self.d_ver[str_id]
+        else:
+            self.set_push(rule)
+
+    def set_clock_jump(self, d_now, d_jump):
+        """
+        wall clock jumped (clock change, suspend), rules due now are handled as misfire (call with lock)
+        :param d_now:
+        :param d_jump: jump against monotonic clock [sec]
+        """
+        self.mc.add_trace('sched', 1, ' :t clock jump %+.0f s', d_jump)
+        if d_jump > 0:
+            return
+        # backwards: intervals restart from now, cron rules after last run (no second run of an occurrence)
+        for rule in self.d_rule.values():
+            if rule['d_every'] is not None:
+                d_next = min(rule['d_next'], d_now + rule['d_every'])
+            elif rule['str_cron'] is not None:
+                d_next = self.get_next(rule, max(d_now, rule['d_last'] or 0.0))
+            else:
+                continue
+            if d_next != rule['d_next']:
+                rule['d_next'] = d_next
+                self.set_push(rule)
+                self.set_cng()
+
+    def set_act(self, rule, a_act):
+        """
+        run actions of rule (worker thread)
+        :param rule:
+        :param a_act:
+        """
+        for act in a_act:
+            str_cmd = act[0]
+            try:
+                str_cmd, args, kwargs = self.set_zone_arg([act], self.get_zone_idx)[0]
+                getattr(self.mc, str_cmd)(*args, **kwargs)
+            except Exception as err:
+                rule['str_err'] = str_cmd + ': ' + str(err)
+                self.mc.add_trace('sched', 0, ' :t rule %s: %s failed: %s', rule['str_id'], str_cmd, err)
+        self.mc.add_trace('sched', 2, ' :t rule %s done', rule['str_id'])
+
+    def set_zone_arg(self, a_act, fn_zone):
+        """
+        convert zone arguments of actions (D_ACT_ZONE)
+        :param a_act: actions, list of [command, args, kwargs]
+        :param fn_zone: conversion of one zone argument (get_zone_ref or get_zone_idx)
+        :return: converted actions
+        """
+        a_act_new = []
+        for str_cmd, args, kwargs in a_act:
+            a_pos, a_name = self.D_ACT_ZONE.get(str_cmd, ((), ()))
+            args = [self.get_zone_val(arg, fn_zone) if idx in a_pos else arg for idx, arg in enumerate(args)]
+            kwargs = dict((str_key, self.get_zone_val(val, fn_zone) if str_key in a_name else val)
+                          for str_key, val in kwargs.items())
+            a_act_new.append([str_cmd, args, kwargs])
+        return a_act_new
+
+    @classmethod
+    def get_zone_val(cls, value, fn_zone):
+        """
+        convert zone argument, lists of zones (also nested) element by element, other values (e.g. 'party') stay
+        :param value: zone index, zone reference or list
+        :param fn_zone:
+        :return:
+        """
+        if isinstance(value, (list, tuple)):
+            return [cls.get_zone_val(val, fn_zone) for val in value]
+        if isinstance(value, dict) or (isinstance(value, int) and not isinstance(value, bool)):
+            return fn_zone(value)
+        return value
+
+    def get_zone_ref(self, idx_zone):
+        """
+        get zone reference of zone index
+        :param idx_zone: zone index (a zone reference is returned as it is)
+        :return: {'uid': uid of first speaker, 'name': zone name}
+        """
+        if isinstance(idx_zone, dict):
+            return idx_zone
+        with self.mc.lock_zones:
+            if not 0 <= idx_zone < len(self.mc.a_zone_ip):
+                raise ValueError('schedule: zone index: ' + str(idx_zone))
+            z_ip = self.mc.a_zone_ip[idx_zone]
+            dev = self.mc.dev_reg.get_dev(z_ip if isinstance(z_ip, str) else z_ip[0])
+            return {'uid': None if dev is None else dev.get('uid'), 'name': self.mc.a_zone_name[idx_zone]}
+
+    def get_zone_idx(self, zone_ref):
+        """
+        get current zone index of zone reference, by speaker uid, else by zone name
+        :param zone_ref: zone reference (a zone index of rules of older files is returned as it is)
+        :return: zone index
+        """
+        if not isinstance(zone_ref, dict):
+            return zone_ref
+        with self.mc.lock_zones:
+            if zone_ref.get('uid') is not None:
+                for idx_zone, z_ip in enumerate(self.mc.a_zone_ip):
+                    for str_ip in ([z_ip] if isinstance(z_ip, str) else z_ip):
+                        dev = self.mc.dev_reg.get_dev(str_ip)
+                        if dev is not None and dev.get('uid') == zone_ref['uid']:
+                            return idx_zone
+            if zone_ref.get('name') and zone_ref['name'] in self.mc.a_zone_name:
+                return self.mc.a_zone_name.index(zone_ref['name'])
+        raise ValueError('zone unknown: ' + str(zone_ref.get('name') or zone_ref.get('uid')))
+
+    def get_next(self, rule, d_time):
+        """
+        get next run of rule after time
+        :param rule:
+        :param d_time:
+        :return: time, None: no further run
+        """
+        if rule['str_cron'] is not None:
+            return self.get_cron_next(self.get_cron(rule['str_cron']), d_time)
+        if rule['d_every'] is not None:
+            return d_time + rule['d_every']
+        return None
+
+    @classmethod
+    def get_at(cls, d_at, d_now):
+        """
+        get time of one-shot rule
+        :param d_at: time (epoch) or local time string (A_AT_FMT), time of day: next occurrence
+        :param d_now:
+        :return:
+        """
+        if not isinstance(d_at, str):
+            return float(d_at)
+        for str_fmt in cls.A_AT_FMT:
+            try:
+                dt_at = datetime.datetime.strptime(d_at, str_fmt)
+            except ValueError:
+                continue
+            if '%Y' not in str_fmt:
+                dt_now = datetime.datetime.fromtimestamp(d_now)
+                dt_at = dt_now.replace(hour=dt_at.hour, minute=dt_at.minute, second=dt_at.second, microsecond=0)
+                if dt_at.timestamp() <= d_now:
+                    dt_at += datetime.timedelta(days=1)
+            return dt_at.timestamp()
+        raise ValueError('schedule: time: ' + d_at)
+
+    @classmethod
+    def get_cron(cls, str_cron):
+        """
+        parse cron expression (fields: '*', 'a', 'a-b', 'a,b', with step '/n')
+        :param str_cron: 'minute hour day_of_month month day_of_week'
+        :return: list of value sets, flags day of month / day of week restricted
+        """
+        a_field = str_cron.split()
+        if len(a_field) != 5:
+            raise ValueError('schedule: cron: ' + str_cron)
+        a_set = []
+        for str_field, (num_min, num_max) in zip(a_field, cls.A_CRON_RANGE):
+            a_val = set()
+            for str_part in str_field.split(','):
+                str_range, _, str_step = str_part.partition('/')
+                num_step = int(str_step) if str_step else 1
+                if str_range == '*':
+                    num_from, num_to = num_min, num_max
+                elif '-' in str_range:
+                    num_from, num_to = [int(str_val) for str_val in str_range.split('-', 1)]
+                else:
+                    num_from = int(str_range)
+                    num_to = num_max if str_step else num_from
+                if num_from < num_min or num_to > num_max or num_from > num_to or num_step < 1:
+                    raise ValueError('schedule: cron: ' + str_cron)
+                a_val.update(range(num_from, num_to + 1, num_step))
+            a_set.append(a_val)
+        if 7 in a_set[4]:
+            a_set[4].add(0)  # Sunday
+        return [a_set, a_field[2] != '*', a_field[4] != '*']
+
+    @staticmethod
+    def get_cron_next(a_cron, d_time):
+        """
+        get next time of cron expression after time (local time)
+        :param a_cron: parsed expression, see get_cron
+        :param d_time:
+        :return: time, None: no time within 5 years
+        """
+        (a_min, a_hour, a_dom, a_month, a_dow), b_dom, b_dow = a_cron
+        a_hour = sorted(a_hour)
+        a_min = sorted(a_min)
+        dt = datetime.datetime.fromtimestamp(d_time).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        for _ in range(366 * 5):
+            b_day_dom = dt.day in a_dom
+            b_day_dow = (dt.weekday() + 1) % 7 in a_dow
+            # cron: if both day fields are restricted, either matches
+            b_day = (b_day_dom or b_day_dow) if b_dom and b_dow else (b_day_dom and b_day_dow)
+            if dt.month in a_month and b_day:
+                for num_hour in a_hour:
+                    if num_hour < dt.hour:
+                        continue
+                    for num_min in a_min:
+                        if num_hour == dt.hour and num_min < dt.minute:
+                            continue
+                        return dt.replace(hour=num_hour, minute=num_min).timestamp()
+            dt = (dt + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+        return None
+
+    @staticmethod
+    def get_time_str(d_time):
+        return '-' if d_time is None else time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(d_time))
+
+    def close(self):
+        """
+        stop timer thread and save rules
+        """
+        with self.cond:
+            self.b_closed = True
+            self.cond.notify_all()
+        if self.th_sched is not threading.current_thread():
+            self.th_sched.join(5)
+        self.pool.shutdown(wait=False)
+        self.save()
+
+
+class DevRegistry(object):
+    """
+    persistent registry of speaker capabilities (zone name, model, pair membership, line in)
+
+    Entries are keyed by the speaker UUID, with an index by ip address.
+    The registry is stored as json file.
+    """
+
+    def __init__(self, str_file=''):
+        """
+
+        :param str_file: registry file, '': not persistent
+        """
+        self.str_file = str_file
+        self.lock = threading.Lock()
+        self.d_dev = {}
+        self.d_ip = {}
+        self.b_cng = False
+        self.load()
+
+    def load(self):
+        """
+        load registry file
+        """
+        if not self.str_file or not os.path.isfile(self.str_file):
+            return
+        try:
+            with open(self.str_file, 'r') as f:
+                d_dev = json.load(f).get('devices', {})
+        except (IOError, OSError, ValueError):
+            print('Device registry not readable: ' + self.str_file)
+            return
+        with self.lock:
+            self.d_dev = d_dev
+            self.d_ip = dict((dev.get('ip'), uid) for uid, dev in d_dev.items())
+
+    def save(self):
+        """
+        save registry file (only if changed)
+        """
+        if not self.str_file:
+            return
+        with self.lock:
+            if not self.b_cng:
+                return
+            str_data = json.dumps({'version': 1, 'devices': self.d_dev}, indent=1, sort_keys=True)
+            self.b_cng = False
+        str_file_tmp = self.str_file + '.tmp'
+        try:
+            with open(str_file_tmp, 'w') as f:
+                f.write(str_data)
+            os.replace(str_file_tmp, self.str_file)
+        except (IOError, OSError):
+            print('Device registry not writable: ' + self.str_file)
+
+    def get_dev(self, str_ip):
+        """
+        get device entry by ip address
+        :param str_ip:
+        :return: copy of entry or None
+        """
+        with self.lock:
+            uid = self.d_ip.get(str_ip)
+            if uid is None:
+                return None
+            return dict(self.d_dev[uid])
+
+    def set_dev(self, str_ip, uid=None, **kwargs):
+        """
+        set device entry fields
+        :param str_ip: ip address
+        :param uid: speaker UUID (None: known by ip address)
+        :param kwargs: fields
+        """
+        with self.lock:
+            if uid is None:
+                uid = self.d_ip.get(str_ip, str_ip)
+            dev = self.d_dev.setdefault(uid, {})
+
+            # speaker got a new ip address
+            if dev.get('ip') not in (None, str_ip) and self.d_ip.get(dev['ip']) == uid:
+                del self.d_ip[dev['ip']]
+            # entry stored by ip address before the UUID was known
+            uid_old = self.d_ip.get(str_ip)
+            if uid_old == str_ip and uid != str_ip:
+                for key, val in self.d_dev.pop(uid_old, {}).items():
+                    dev.setdefault(key, val)
+
+            kwargs['ip'] = str_ip
+            kwargs['uid'] = uid
+            for key, val in kwargs.items():
+                if dev.get(key) != val:
+                    dev[key] = val
+                    self.b_cng = True
+            self.d_ip[str_ip] = uid
+
+    def del_dev(self, str_ip):
+        """
+        remove device entry
+        :param str_ip:
+        """
+        with self.lock:
+            uid = self.d_ip.pop(str_ip, None)
+            if uid is not None:
+                self.d_dev.pop(uid, None)
+                self.b_cng = True
+
+
+class HistRingBuf(object):
+    """
+    fixed size ring buffer of time stamped values (array backed)
+    """
+
+    def __init__(self, num_size):
+        """
+
+        :param num_size: max. number of records
+        """
+        self.num_size = num_size
+        self.a_time = array.array('d', [0.0]) * num_size
+        self.a_val = array.array('d', [0.0]) * num_size
+        self.idx_head = 0
+        self.num_len = 0
+
+    def __len__(self):
+        return self.num_len
+
+    def add(self, d_time, d_val):
+        """
+        add record, the oldest record is overwritten if buffer is full
+        :param d_time:
+        :param d_val:
+        """
+        self.a_time[self.idx_head] = d_time
+        self.a_val[self.idx_head] = d_val
+        self.idx_head = (self.idx_head + 1) % self.num_size
+        if self.num_len < self.num_size:
+            self.num_len = self.num_len + 1
+
+    def get_pos(self, idx):
+        """
+        get array position of record index (0: oldest record)
+        :param idx:
+        :return:
+        """
+        return (self.idx_head - self.num_len + idx) % self.num_size
+
+    def get_idx_time(self, d_time):
+        """
+        get index of first record with time stamp >= d_time (binary search)
+        :param d_time:
+        :return:
+        """
+        idx_lo = 0
+        idx_hi = self.num_len
+        while idx_lo < idx_hi:
+            idx_mid = (idx_lo + idx_hi) // 2
+            if self.a_time[self.get_pos(idx_mid)] < d_time:
+                idx_lo = idx_mid + 1
+            else:
+                idx_hi = idx_mid
+        return idx_lo
+
+    def get_range(self, d_time_start=None, d_time_end=None, b_prev=False):
+        """
+        get records in time range
+        :param d_time_start: None: from oldest record
+        :param d_time_end: None: up to newest record
+        :param b_prev: add last record before d_time_start (value valid at d_time_start)
+        :return: ([time], [value])
+        """
+        idx_start = 0 if d_time_start is None else self.get_idx_time(d_time_start)
+        idx_end = self.num_len if d_time_end is None else self.get_idx_time(d_time_end)
+        if b_prev and idx_start > 0:
+            idx_start = idx_start - 1
+        a_pos = [self.get_pos(idx) for idx in range(idx_start, idx_end)]
+        return [self.a_time[pos] for pos in a_pos], [self.a_val[pos] for pos in a_pos]
+
+
+class HistRecorder(object):
+    """
+    time series history of zone state in ring buffers per zone and state field
+
+    Numeric fields (A_FIELD_NUM) are stored as numbers (None: nan), all other fields (e.g. transport state)
+    as index of a bounded symbol table.
+    Memory use is fixed by the buffer size, independent of the runtime.
+    """
+    NUM_SYM_MAX = 4096
+    STR_SYM_OTHER = '<other>'
+    A_FIELD_NUM = frozenset(('volume', 'group_volume', 'balance', 'play_track_idx', 'queue_size', 'group_co'))
+
+    def __init__(self, num_size=4096):
+        """
+
+        :param num_size: number of records per zone and state field
+        """
+        self.num_size = num_size
+        self.lock = threading.Lock()
+        self.d_buf = {}
+        self.a_sym = [None, self.STR_SYM_OTHER]
+        self.d_sym = {None: 0, self.STR_SYM_OTHER: 1}
+
+    def get_sym(self, value):
+        """
+        get symbol index of text value
+        :param value:
+        :return:
+        """
+        idx_sym = self.d_sym.get(value)
+        if idx_sym is None:
+            if len(self.a_sym) >= self.NUM_SYM_MAX:
+                return 1  # symbol table full
+            idx_sym = len(self.a_sym)
+            self.a_sym.append(value)
+            self.d_sym[value] = idx_sym
+        return idx_sym
+
+    def set_zone_remove(self, idx_zone):
+        """
+        drop history of removed zone, zones behind get index - 1
+        :param idx_zone:
+        """
+        with self.lock:
+            self.d_buf = dict(((idx - (idx > idx_zone), str_field), buf)
+                              for (idx, str_field), buf in self.d_buf.items() if idx != idx_zone)
+
+    def add(self, idx_zone, str_field, value, d_time=None):
+        """
+        add state value
+        :param idx_zone:
+        :param str_field:
+        :param value: number, text or None
+        :param d_time: time stamp, None: now
+        """
+        if d_time is None:
+            d_time = time.time()
+        with self.lock:
+            key = (idx_zone, str_field)
+            buf = self.d_buf.get(key)
+            if buf is None:
+                buf = HistRingBuf(self.num_size)
+                self.d_buf[key] = buf
+
+            if str_field not in self.A_FIELD_NUM:
+                d_val = self.get_sym(value if value is None else str(value))
+            else:
+                try:
+                    d_val = float(value)
+                except (TypeError, ValueError):
+                    d_val = float('nan')
+            buf.add(d_time, d_val)
+
+    def get_val(self, str_field, d_val):
+        """
+        get state value of stored value
+        :param str_field:
+        :param d_val:
+        :return:
+        """
+        if str_field not in self.A_FIELD_NUM:
+            return self.a_sym[int(d_val)]
+        if d_val != d_val:
+            return None  # nan
+        if d_val == int(d_val):
+            return int(d_val)
+        return d_val
+
+    def get_fields(self):
+        """
+        get recorded (zone, field) keys
+        :return:
+        """
+        with self.lock:
+            return sorted(self.d_buf.keys(), key=str)
+
+    def get_range(self, idx_zone, str_field, d_time_start=None, d_time_end=None):
+        """
+        get state changes in time range
+        :param idx_zone:
+        :param str_field:
+        :param d_time_start: None: from oldest record
+        :param d_time_end: None: up to now
+        :return: list of (time, value)
+        """
+        with self.lock:
+            buf = self.d_buf.get((idx_zone, str_field))
+            if buf is None:
+                return []
+            a_time, a_val = buf.get_range(d_time_start, d_time_end)
+            return [(d_time, self.get_val(str_field, d_val)) for d_time, d_val in zip(a_time, a_val)]
+
+    def get_segments(self, idx_zone, str_field, d_time_start, d_time_end):
+        """
+        get time segments with constant value (value holds until next change)
+        :param idx_zone:
+        :param str_field:
+        :param d_time_start:
+        :param d_time_end:
+        :return: list of (time start, time end, stored value)
+        """
+        buf = self.d_buf.get((idx_zone, str_field))
+        if buf is None:
+            return []
+        a_time, a_val = buf.get_range(d_time_start, d_time_end, True)
+        a_seg = []
+        for idx in range(len(a_time)):
+            d_seg_start = max(a_time[idx], d_time_start)
+            d_seg_end = a_time[idx + 1] if idx + 1 < len(a_time) else d_time_end
+            if d_seg_end > d_seg_start:
+                a_seg.append((d_seg_start, d_seg_end, a_val[idx]))
+        return a_seg
+
+    def get_downsample(self, idx_zone, str_field, d_step, d_time_start=None, d_time_end=None, str_mode='mean'):
+        """
+        get state downsampled to fixed time steps
+        :param idx_zone:
+        :param str_field:
+        :param d_step: time step [sec]
+        :param d_time_start: None: time of oldest record
+        :param d_time_end: None: now
+        :param str_mode: 'mean' (time weighted), 'min', 'max' or 'last' (text fields: 'last' or most frequent)
+        :return: list of (time of step start, value)
+        """
+        if d_time_end is None:
+            d_time_end = time.time()
+        with self.lock:
+            buf = self.d_buf.get((idx_zone, str_field))
+            if buf is None or len(buf) == 0:
+                return []
+            if d_time_start is None:
+                d_time_start = buf.a_time[buf.get_pos(0)]
+            a_seg = self.get_segments(idx_zone, str_field, d_time_start, d_time_end)
+            b_sym = str_field not in self.A_FIELD_NUM
+
+            a_out = []
+            idx_seg = 0
+            num_steps = int((d_time_end - d_time_start) / d_step + 0.999999)
+            for idx_step in range(num_steps):
+                d_step_start = d_time_start + idx_step * d_step
+                d_step_end = min(d_step_start + d_step, d_time_end)
+                while idx_seg < len(a_seg) and a_seg[idx_seg][1] <= d_step_start:
+                    idx_seg = idx_seg + 1
+                d_time_val = {}
+                d_val_last = None
+                idx = idx_seg
+                while idx < len(a_seg) and a_seg[idx][0] < d_step_end:
+                    d_dur = min(a_seg[idx][1], d_step_end) - max(a_seg[idx][0], d_step_start)
+                    d_time_val[a_seg[idx][2]] = d_time_val.get(a_seg[idx][2], 0.0) + d_dur
+                    d_val_last = a_seg[idx][2]
+                    idx = idx + 1
+
+                if len(d_time_val) == 0:
+                    a_out.append((d_step_start, None))
+                    continue
+                if str_mode == 'last':
+                    d_val = d_val_last
+                elif b_sym:
+                    d_val = max(d_time_val.items(), key=lambda item: item[1])[0]
+                elif str_mode == 'min':
+                    d_val = min(d_time_val.keys())
+                elif str_mode == 'max':
+                    d_val = max(d_time_val.keys())
+                else:
+                    a_num = [(d_val, d_dur) for d_val, d_dur in d_time_val.items() if d_val == d_val]
+                    d_dur_sum = sum(d_dur for d_val, d_dur in a_num)
+                    if d_dur_sum <= 0:
+                        a_out.append((d_step_start, None))
+                        continue
+                    a_out.append((d_step_start, sum(d_val * d_dur for d_val, d_dur in a_num) / d_dur_sum))
+                    continue
+                a_out.append((d_step_start, self.get_val(str_field, d_val)))
+            return a_out
+
+    def get_aggr(self, idx_zone, str_field, d_time_start=None, d_time_end=None):
+        """
+        get aggregates of state in time range
+        :param idx_zone:
+        :param str_field:
+        :param d_time_start: None: time of oldest record
+        :param d_time_end: None: now
+        :return: dict with 'num_cng', 'd_time' and
+                 for numbers: 'min', 'max', 'mean' (time weighted),
+                 for text: 'd_time_val' (time per value), 'num_enter' (changes to value)
+        """
+        if d_time_end is None:
+            d_time_end = time.time()
+        with self.lock:
+            buf = self.d_buf.get((idx_zone, str_field))
+            if buf is None or len(buf) == 0:
+                return {}
+            if d_time_start is None:
+                d_time_start = buf.a_time[buf.get_pos(0)]
+            a_seg = self.get_segments(idx_zone, str_field, d_time_start, d_time_end)
+            a_time, a_val = buf.get_range(d_time_start, d_time_end)
+
+            d_aggr = {'num_cng': len(a_time), 'd_time': d_time_end - d_time_start}
+            if str_field not in self.A_FIELD_NUM:
+                d_time_val = {}
+                for d_seg_start, d_seg_end, d_val in a_seg:
+                    str_val = self.get_val(str_field, d_val)
+                    d_time_val[str_val] = d_time_val.get(str_val, 0.0) + d_seg_end - d_seg_start
+                num_enter = {}
+                d_val_prev = None
+                for d_val in a_val:
+                    if d_val != d_val_prev:
+                        str_val = self.get_val(str_field, d_val)
+                        num_enter[str_val] = num_enter.get(str_val, 0) + 1
+                    d_val_prev = d_val
+                d_aggr['d_time_val'] = d_time_val
+                d_aggr['num_enter'] = num_enter
+            else:
+                a_seg = [seg for seg in a_seg if seg[2] == seg[2]]
+                if len(a_seg) > 0:
+                    d_dur_sum = sum(seg[1] - seg[0] for seg in a_seg)
+                    d_aggr['min'] = self.get_val(str_field, min(seg[2] for seg in a_seg))
+                    d_aggr['max'] = self.get_val(str_field, max(seg[2] for seg in a_seg))
+                    if d_dur_sum > 0:
+                        d_aggr['mean'] = sum((seg[1] - seg[0]) * seg[2] for seg in a_seg) / d_dur_sum
+            return d_aggr
+
+    def get_mem_size(self):
+        """
+        get memory size of buffers [byte]
+        :return:
+        """
+        with self.lock:
+            return sum(buf.a_time.itemsize * buf.num_size * 2 for buf in self.d_buf.values())
+
+
+class ListenLog(object):
+    """
+    listening log: play sessions (zone, group, source, track, start, end) in a sqlite data base
+
+    Sessions are derived from the play state transitions of the zones. A background
+    writer inserts finished sessions batch wise in transactions, so the event
+    handling never waits for the disk.
+    """
+    STR_SQL_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS play_session (
+            id INTEGER PRIMARY KEY,
+            zone TEXT NOT NULL,
+            zone_idx INTEGER,
+            grp TEXT,
+            src_type TEXT,
+            src TEXT,
+            track TEXT,
+            t_start REAL NOT NULL,
+            t_end REAL NOT NULL,
+            dur REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_session_track ON play_session (track, src);
+        CREATE INDEX IF NOT EXISTS idx_session_zone ON play_session (zone, t_start);
+        CREATE INDEX IF NOT EXISTS idx_session_start ON play_session (t_start);
+    """
+    STR_SQL_INSERT = 'INSERT INTO play_session (zone, zone_idx, grp, src_type, src, track, t_start, t_end, dur) ' \
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+    def __init__(self, str_db_file, num_batch=100, d_time_batch=2.0, d_dur_min=1.0):
+        """
+
+        :param str_db_file: sqlite data base file
+        :param num_batch: max. number of sessions per transaction
+        :param d_time_batch: max. time to collect sessions for one transaction [sec]
+        :param d_dur_min: min. session duration, shorter sessions are dropped [sec]
+        """
+        self.str_db_file = str_db_file
+        self.num_batch = num_batch
+        self.d_time_batch = d_time_batch
+        self.d_dur_min = d_dur_min
+        self.lock = threading.Lock()
+        self.d_session = {}
+        self.q_write = queue.Queue()
+
+        # create schema before the first query
+        conn = sqlite3.connect(self.str_db_file)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.STR_SQL_SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.th_write = threading.Thread(target=self.run, name='CoSoCoW-ListenLog')
+        self.th_write.daemon = True
+        self.th_write.start()
+
+    def set_zone_state(self, idx_zone, str_zone, str_group, str_src_type, str_src, str_track, b_playing,
+                       d_time=None):
+        """
+        set current play state of zone, starts or finishes sessions
+        :param idx_zone:
+        :param str_zone: zone name
+        :param str_group: names of grouped zones
+        :param str_src_type: 'radio', 'aux', 'mudb' or ''
+        :param str_src: name of source (radio, playlist, line in)
+        :param str_track: track display name
+        :param b_playing:
+        :param d_time: time stamp, None: now
+        """
+        if d_time is None:
+            d_time = time.time()
+        a_key = [str_zone, str_group, str_src_type, str(str_src), str(str_track)]
+        with self.lock:
+            session = self.d_session.get(idx_zone)
+            if session is not None and (not b_playing or session[0] != a_key):
+                del self.d_session[idx_zone]
+                self.set_session_end(idx_zone, session, d_time)
+                session = None
+            if session is None and b_playing:
+                self.d_session[idx_zone] = [a_key, d_time]
+
+    def set_zone_remove(self, idx_zone, d_time=None):
+        """
+        finish session of removed zone, zones behind get index - 1
+        :param idx_zone:
+        :param d_time: time stamp, None: now
+        """
+        with self.lock:
+            session = self.d_session.pop(idx_zone, None)
+            if session is not None:
+                self.set_session_end(idx_zone, session, time.time() if d_time is None else d_time)
+            self.d_session = dict((idx - (idx > idx_zone), session) for idx, session in self.d_session.items())
+
+    def set_session_end(self, idx_zone, session, d_time):
+        """
+        finish session and pass it to the writer
+        :param idx_zone:
+        :param session: [a_key, d_time_start]
+        :param d_time: end time
+        """
+        a_key, d_time_start = session
+        d_dur = d_time - d_time_start
+        if d_dur < self.d_dur_min:
+            return
+        str_zone, str_group, str_src_type, str_src, str_track = a_key
+        self.q_write.put((str_zone, idx_zone, str_group, str_src_type, str_src, str_track,
+                          d_time_start, d_time, d_dur))
+
+    def run(self):
+        """
+        writer thread
+        """
+        conn = sqlite3.connect(self.str_db_file)
+        b_run = True
+        while b_run:
+            a_rows = [self.q_write.get()]
+            d_time_end = time.time() + self.d_time_batch
+            while len(a_rows) < self.num_batch and a_rows[-1] is not None:
+                d_time_wait = d_time_end - time.time()
+                if d_time_wait <= 0:
+                    break
+                try:
+                    a_rows.append(self.q_write.get(timeout=d_time_wait))
+                except queue.Empty:
+                    break
+
+            if a_rows[-1] is None:
+                b_run = False  # stop request
+            a_rows_ins = [row for row in a_rows if row is not None]
+            try:
+                if len(a_rows_ins) > 0:
+                    with conn:
+                        conn.executemany(self.STR_SQL_INSERT, a_rows_ins)
+            except sqlite3.Error as err:
+                print('ListenLog: can not write sessions: ' + str(err))
+            for _ in a_rows:
+                self.q_write.task_done()
+        conn.close()
+
+    def flush(self, b_open=False):
+        """
+        wait until all finished sessions are written
+        :param b_open: finish the open sessions too
+        """
+        if b_open:
+            d_time = time.time()
+            with self.lock:
+                for idx_zone, session in self.d_session.items():
+                    self.set_session_end(idx_zone, session, d_time)
+                self.d_session = {}
+        self.q_write.join()
+
+    def close(self):
+        """
+        finish open sessions and stop the writer
+        """
+        self.flush(True)
+        self.q_write.put(None)
+        self.th_write.join()
+
+    def get_query(self, str_sql, a_args=()):
+        """
+        run query on data base
+        :param str_sql:
+        :param a_args:
+        :return: list of rows
+        """
+        conn = sqlite3.connect(self.str_db_file)
+        try:
+            return conn.execute(str_sql, a_args).fetchall()
+        finally:
+            conn.close()
+
+    def get_filter(self, d_time_start=None, d_time_end=None, str_zone=None):
+        """
+        get sql filter
+        :param d_time_start:
+        :param d_time_end:
+        :param str_zone:
+        :return: (str_where, a_args)
+        """
+        a_cond = []
+        a_args = []
+        if d_time_start is not None:
+            a_cond.append('t_start >= ?')
+            a_args.append(d_time_start)
+        if d_time_end is not None:
+            a_cond.append('t_start < ?')
+            a_args.append(d_time_end)
+        if str_zone is not None:
+            a_cond.append('zone = ?')
+            a_args.append(str_zone)
+        if len(a_cond) == 0:
+            return '', a_args
+        return ' WHERE ' + ' AND '.join(a_cond), a_args
+
+    def get_top_tracks(self, num_tracks=10, d_time_start=None, d_time_end=None, str_zone=None):
+        """
+        get most played tracks
+        :param num_tracks:
+        :param d_time_start:
+        :param d_time_end:
+        :param str_zone: zone name, None: all zones
+        :return: list of (track, source, number of sessions, play time [sec])
+        """
+        str_where, a_args = self.get_filter(d_time_start, d_time_end, str_zone)
+        return self.get_query('SELECT track, src, COUNT(*), SUM(dur) FROM play_session' + str_where
+                              + ' GROUP BY track, src ORDER BY COUNT(*) DESC, SUM(dur) DESC LIMIT ?',
+                              a_args + [num_tracks])
+
+    def get_time_per_zone(self, d_time_start=None, d_time_end=None):
+        """
+        get play time per zone
+        :param d_time_start:
+        :param d_time_end:
+        :return: list of (zone, play time [sec])
+        """
+        str_where, a_args = self.get_filter(d_time_start, d_time_end)
+        return self.get_query('SELECT zone, SUM(dur) FROM play_session' + str_where
+                              + ' GROUP BY zone ORDER BY SUM(dur) DESC', a_args)
+
+    def get_sessions(self, d_time_start=None, d_time_end=None, str_zone=None, num_max=1000):
+        """
+        get play sessions
+        :param d_time_start:
+        :param d_time_end:
+        :param str_zone:
+        :param num_max:
+        :return: list of (zone, group, source type, source, track, start, end)
+        """
+        str_where, a_args = self.get_filter(d_time_start, d_time_end, str_zone)
+        return self.get_query('SELECT zone, grp, src_type, src, track, t_start, t_end FROM play_session' + str_where
+                              + ' ORDER BY t_start LIMIT ?', a_args + [num_max])
+
+
+class ArtCache(object):
+    """
+    album art cache: size bounded LRU in memory, backed by a disk cache (file name: hash of uri)
+
+    Downloads use a pooled http session. Prefetch requests are downloaded in background
+    in the bulk lane of the request scheduler.
+    """
+
+    def __init__(self, str_dir='', num_mem_max=16 * 1024 * 1024, num_disk_max=256 * 1024 * 1024, req_sched=None,
+                 num_workers=2, d_timeout=5.0):
+        """
+
+        :param str_dir: directory of disk cache, '': no disk cache
+        :param num_mem_max: max. size of memory cache [byte]
+        :param num_disk_max: max. size of disk cache [byte]
+        :param req_sched: ReqSched object (None: no scheduling)
+        :param num_workers: number of prefetch threads
+        :param d_timeout: download timeout [sec]
+        """
+        self.str_dir = str_dir
+        self.num_mem_max = num_mem_max
+        self.num_disk_max = num_disk_max
+        self.req_sched = req_sched
+        self.d_timeout = d_timeout
+        self.lock = threading.Lock()
+        self.d_mem = collections.OrderedDict()
+        self.num_mem_size = 0
+        self.num_disk_size = -1
+        self.d_pend = {}
+        self.d_stat = {'mem_hit': 0, 'disk_hit': 0, 'download': 0, 'error': 0}
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=num_workers + 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool = concurrent.futures.ThreadPoolExecutor(num_workers)
+
+        if self.str_dir and not os.path.isdir(self.str_dir):
+            os.makedirs(self.str_dir)
+
+    def get_file(self, str_uri):
+        """
+        get disk cache file of uri
+        :param str_uri:
+        :return:
+        """
+        return os.path.join(self.str_dir, hashlib.sha1(str_uri.encode('utf-8')).hexdigest())
+
+    def set_mem(self, str_uri, data):
+        """
+        put data to memory cache, drop least recently used entries (call with lock)
+        :param str_uri:
+        :param data:
+        """
+        if len(data) > self.num_mem_max:
+            return
+        if str_uri in self.d_mem:
+            self.num_mem_size = self.num_mem_size - len(self.d_mem.pop(str_uri))
+        self.d_mem[str_uri] = data
+        self.num_mem_size = self.num_mem_size + len(data)
+        while self.num_mem_size > self.num_mem_max:
+            self.num_mem_size = self.num_mem_size - len(self.d_mem.popitem(last=False)[1])
+
+    def get_cached(self, str_uri):
+        """
+        get data from memory or disk cache
+        :param str_uri:
+        :return: data or None
+        """
+        with self.lock:
+            data = self.d_mem.get(str_uri)
+            if data is not None:
+                self.d_mem.move_to_end(str_uri)
+                self.d_stat['mem_hit'] = self.d_stat['mem_hit'] + 1
+                return data
+
+        if self.str_dir:
+            try:
+                with open(self.get_file(str_uri), 'rb') as f:
+                    data = f.read()
+            except (IOError, OSError):
+                return None
+            with self.lock:
+                self.set_mem(str_uri, data)
+                self.d_stat['disk_hit'] = self.d_stat['disk_hit'] + 1
+            return data
+        return None
+
+    def get_download(self, str_uri, idx_prio):
+        """
+        download album art and store it in the caches
+        :param str_uri:
+        :param idx_prio: priority class of request scheduler
+        :return: data or None
+        """
+        data = self.get_cached(str_uri)
+        if data is not None:
+            return data
+
+        try:
+            if self.req_sched is not None:
+                with self.req_sched.slot(requests.compat.urlparse(str_uri).hostname, idx_prio):
+                    response = self.session.get(str_uri, timeout=self.d_timeout)
+            else:
+                response = self.session.get(str_uri, timeout=self.d_timeout)
+            if response.status_code != 200:
+                raise IOError('http status ' + str(response.status_code))
+            data = response.content
+        except Exception as err:
+            with self.lock:
+                self.d_stat['error'] = self.d_stat['error'] + 1
+            print('ArtCache: can not get ' + str_uri + ': ' + str(err))
+            return None
+
+        with self.lock:
+            self.set_mem(str_uri, data)
+            self.d_stat['download'] = self.d_stat['download'] + 1
+        if self.str_dir:
+            self.set_disk(str_uri, data)
+        return data
+
+    def set_disk(self, str_uri, data):
+        """
+        write data to disk cache, drop oldest files if cache is full
+        :param str_uri:
+        :param data:
+        """
+        str_file = self.get_file(str_uri)
+        try:
+            num_size_old = os.path.getsize(str_file)  # overwritten entry
+        except OSError:
+            num_size_old = 0
+        try:
+            with open(str_file + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(str_file + '.tmp', str_file)
+        except (IOError, OSError):
+            return
+
+        with self.lock:
+            if self.num_disk_size < 0:
+                self.num_disk_size = sum(os.path.getsize(os.path.join(self.str_dir, str_name))
+                                         for str_name in os.listdir(self.str_dir))
+            else:
+                self.num_disk_size = self.num_disk_size - num_size_old + len(data)
+            if self.num_disk_size <= self.num_disk_max:
+                return
+
+            a_file = [os.path.join(self.str_dir, str_name) for str_name in os.listdir(self.str_dir)]
+            a_file.sort(key=os.path.getmtime)
+            for str_file_old in a_file:
+                if self.num_disk_size <= self.num_disk_max * 0.9:
+                    break
+                try:
+                    num_size = os.path.getsize(str_file_old)
+                    os.remove(str_file_old)
+                    self.num_disk_size = self.num_disk_size - num_size
+                except (IOError, OSError):
+                    pass
+
+    def get_art(self, str_uri, b_wait=True):
+        """
+        get album art
+        :param str_uri:
+        :param b_wait: download if not in cache (otherwise start prefetch and return None)
+        :return: image data (bytes) or None
+        """
+        data = self.get_cached(str_uri)
+        if data is not None or not b_wait:
+            if data is None:
+                self.set_prefetch([str_uri])
+            return data
+
+        with self.lock:
+            fut = self.d_pend.get(str_uri)
+        if fut is not None:
+            return fut.result()
+        return self.get_download(str_uri, ReqSched.PRIO_STATE_SYNC)
+
+    def set_prefetch(self, a_uri):
+        """
+        download album art in background
+        :param a_uri: list of uri
+        """
+        for str_uri in a_uri:
+            with self.lock:
+                if str_uri in self.d_mem or str_uri in self.d_pend:
+                    continue
+                fut = self.pool.submit(self.get_download, str_uri, ReqSched.PRIO_BULK)
+                self.d_pend[str_uri] = fut
+            fut.add_done_callback(lambda fut_done, str_uri_done=str_uri: self.set_pend_done(str_uri_done))
+
+    def set_pend_done(self, str_uri):
+        with self.lock:
+            self.d_pend.pop(str_uri, None)
+
+    def get_stat(self):
+        """
+        get cache statistics
+        :return:
+        """
+        with self.lock:
+            d_stat = dict(self.d_stat)
+            d_stat['mem_size'] = self.num_mem_size
+            d_stat['mem_num'] = len(self.d_mem)
+            d_stat['disk_size'] = self.num_disk_size
+            return d_stat
+
+    def close(self):
+        """
+        stop prefetch and release connections
+        """
+        self.pool.shutdown(wait=False)
+        self.session.close()
+
+
+class QueueWin(object):
+    """
+    page cache of the queue of a zone for windowed access
+
+    Pages are loaded on demand and adjacent pages are prefetched in background.
+    The number of cached pages is limited (LRU), so memory follows the viewed part of
+    the queue and not the queue size.
+    """
+
+    def __init__(self, fn_fetch, pool=None, num_page_size=100, num_pages_max=20):
+        """
+
+        :param fn_fetch: method to read a page, called with (idx_start, num_items, idx_prio),
+                         returns ([title], [album art uri])
+        :param pool: executor for prefetch (None: no prefetch)
+        :param num_page_size: number of queue entries per page
+        :param num_pages_max: max. number of cached pages
+        """
+        self.fn_fetch = fn_fetch
+        self.pool = pool
+        self.num_page_size = num_page_size
+        self.num_pages_max = num_pages_max
+        self.lock = threading.Lock()
+        self.d_page = collections.OrderedDict()
+        self.d_pend = {}
+        self.num_gen = 0
+        self.num_queue_size = -1
+
+    def get_page(self, idx_page, idx_prio=None, b_fetch=True):
+        """
+        get page from cache or read it
+        :param idx_page:
+        :param idx_prio: priority class of request scheduler
+        :param b_fetch: read page if not in cache
+        :return: ([title], [album art uri]) or None
+        """
+        with self.lock:
+            page = self.d_page.get(idx_page)
+            if page is not None:
+                self.d_page.move_to_end(idx_page)
+                return page
+            if not b_fetch:
+                return None
+            fut = self.d_pend.get(idx_page)
+            b_owner = fut is None
+            if b_owner:
+                fut = concurrent.futures.Future()
+                self.d_pend[idx_page] = fut
+            num_gen = self.num_gen
+
+        if not b_owner:
+            return fut.result()
+
+        try:
+            page = self.fn_fetch(idx_page * self.num_page_size, self.num_page_size, idx_prio)
+        except Exception as err:
+            with self.lock:
+                self.d_pend.pop(idx_page, None)
+            fut.set_exception(err)
+            raise
+
+        with self.lock:
+            self.d_pend.pop(idx_page, None)
+            if num_gen == self.num_gen:
+                # page is still valid
+                self.d_page[idx_page] = page
+                while len(self.d_page) > self.num_pages_max:
+                    self.d_page.popitem(last=False)
+        fut.set_result(page)
+        return page
+
+    def get_window(self, idx_start, num_count, b_fetch=True):
+        """
+        get window of queue entries
+        :param idx_start: index of first queue entry
+        :param num_count: number of queue entries
+        :param b_fetch: read missing pages (otherwise only cached entries are returned)
+        :return: ([title], [album art uri])
+        """
+        idx_start = max(0, idx_start)
+        idx_end = idx_start + max(0, num_count)
+        if self.num_queue_size >= 0:
+            idx_end = min(idx_end, self.num_queue_size)
+        if idx_end <= idx_start:
+            return [], []
+
+        idx_page_first = idx_start // self.num_page_size
+        idx_page_last = (idx_end - 1) // self.num_page_size
+        a_title = []
+        a_uri = []
+        for idx_page in range(idx_page_first, idx_page_last + 1):
+            page = self.get_page(idx_page, None, b_fetch)
+            if page is None:
+                break
+            idx_page_start = idx_page * self.num_page_size
+            idx_from = max(idx_start - idx_page_start, 0)
+            idx_to = idx_end - idx_page_start
+            a_title.extend(page[0][idx_from:idx_to])
+            a_uri.extend(page[1][idx_from:idx_to])
+
+        if b_fetch:
+            self.set_prefetch(idx_page_first - 1)
+            self.set_prefetch(idx_page_last + 1)
+        return a_title, a_uri
+
+    def set_prefetch(self, idx_page):
+        """
+        read page in background
+        :param idx_page:
+        """
+        if self.pool is None or idx_page < 0:
+            return
+        if 0 <= self.num_queue_size <= idx_page * self.num_page_size:
+            return
+        with self.lock:
+            if idx_page in self.d_page or idx_page in self.d_pend:
+                return
+        self.pool.submit(self.get_page_bg, idx_page)
+
+    def get_page_bg(self, idx_page):
+        try:
+            self.get_page(idx_page, ReqSched.PRIO_BULK)
+        except Exception:
+            pass  # page is read again on demand
+
+    def set_inval(self, idx_row_first=0, num_queue_size=None):
+        """
+        invalidate pages from queue entry idx_row_first on
+        :param idx_row_first: first changed queue entry
+        :param num_queue_size: new queue size (None: unchanged)
+        """
+        with self.lock:
+            self.num_gen = self.num_gen + 1
+            if num_queue_size is not None:
+                self.num_queue_size = num_queue_size
+            idx_page_first = max(0, idx_row_first) // self.num_page_size
+            for idx_page in list(self.d_page.keys()):
+                if idx_page >= idx_page_first:
+                    del self.d_page[idx_page]
+
+    def get_mem_num(self):
+        """
+        get number of cached queue entries
+        :return:
+        """
+        with self.lock:
+            return sum(len(page[0]) for page in self.d_page.values())
+
+
+class MudbStore(collections.abc.Sequence):
+    """
+    compact store of music db items (title, item id, uri, parent id)
+
+    The fields are kept as index columns (array) into a table of interned strings.
+    Uris ending with the item id only store their prefix. Full DIDL objects are rebuilt
+    on demand (e.g. to add an item to the queue) and kept in a small LRU.
+    """
+
+    def __init__(self, str_name='', num_lru=32):
+        """
+
+        :param str_name: name of store (for memory report)
+        :param num_lru: number of rebuilt DIDL objects to keep
+        """
+        self.str_name = str_name
+        self.num_lru = num_lru
+        self.a_str = ['']
+        self.d_str = {'': 0}
+        self.a_cls = []
+        self.col_title = array.array('I')
+        self.col_item_id = array.array('I')
+        self.col_parent_id = array.array('I')
+        self.col_uri = array.array('I')
+        self.col_uri_sfx = array.array('b')  # 1: uri = uri column + item id
+        self.col_prot = array.array('I')
+        self.col_cls = array.array('H')
+        self.d_lru = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_str_idx(self, str_val):
+        """
+        get index of string in string table
+        :param str_val:
+        :return:
+        """
+        if str_val is None:
+            str_val = ''
+        idx_str = self.d_str.get(str_val)
+        if idx_str is None:
+            idx_str = len(self.a_str)
+            str_val = sys.intern(str(str_val))
+            self.a_str.append(str_val)
+            self.d_str[str_val] = idx_str
+        return idx_str
+
+    def set_compact(self):
+        """
+        drop string lookup table (only needed while adding items)
+        """
+        with self.lock:
+            self.d_str = None
+
+    def add_items(self, a_items):
+        """
+        add DIDL objects
+        :param a_items:
+        """
+        with self.lock:
+            if self.d_str is None:
+                self.d_str = dict((str_val, idx_str) for idx_str, str_val in enumerate(self.a_str))
+            for item in a_items:
+                str_item_id = item.item_id or ''
+                a_res = getattr(item, 'resources', None) or []
+                str_uri = a_res[0].uri if len(a_res) > 0 else ''
+                str_prot = a_res[0].protocol_info if len(a_res) > 0 else ''
+                b_uri_sfx = len(str_item_id) > 0 and str_uri.endswith(str_item_id)
+                if b_uri_sfx:
+                    str_uri = str_uri[:len(str_uri) - len(str_item_id)]
+
+                cls_item = type(item)
+                if cls_item not in self.a_cls:
+                    self.a_cls.append(cls_item)
+
+                self.col_title.append(self.get_str_idx(item.title))
+                self.col_item_id.append(self.get_str_idx(str_item_id))
+                self.col_parent_id.append(self.get_str_idx(item.parent_id))
+                self.col_uri.append(self.get_str_idx(str_uri))
+                self.col_uri_sfx.append(1 if b_uri_sfx else 0)
+                self.col_prot.append(self.get_str_idx(str_prot))
+                self.col_cls.append(self.a_cls.index(cls_item))
+
+    def __len__(self):
+        return len(self.col_title)
+
+    def __getitem__(self, idx):
+        """
+        get DIDL object (rebuilt on demand)
+        :param idx:
+        :return:
+        """
+        if isinstance(idx, slice):
+            return [self[idx_sub] for idx_sub in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx = idx + len(self)
+        with self.lock:
+            item = self.d_lru.get(idx)
+            if item is not None:
+                self.d_lru.move_to_end(idx)
+                return item
+
+            str_uri = self.get_uri(idx)
+            a_res = []
+            if str_uri:
+                a_res.append(DidlResource(uri=str_uri, protocol_info=self.a_str[self.col_prot[idx]]))
+            item = self.a_cls[self.col_cls[idx]](title=self.a_str[self.col_title[idx]],
+                                                 parent_id=self.a_str[self.col_parent_id[idx]],
+                                                 item_id=self.a_str[self.col_item_id[idx]],
+                                                 resources=a_res)
+            self.d_lru[idx] = item
+            while len(self.d_lru) > self.num_lru:
+                self.d_lru.popitem(last=False)
+            return item
+
+    def get_title(self, idx):
+        return self.a_str[self.col_title[idx]]
+
+    def get_item_id(self, idx):
+        return self.a_str[self.col_item_id[idx]]
+
+    def get_parent_id(self, idx):
+        return self.a_str[self.col_parent_id[idx]]
+
+    def get_uri(self, idx):
+        """
+        get uri of item
+        :param idx:
+        :return:
+        """
+        str_uri = self.a_str[self.col_uri[idx]]
+        if self.col_uri_sfx[idx]:
+            str_uri = str_uri + self.a_str[self.col_item_id[idx]]
+        return str_uri
+
+    def get_names(self):
+        """
+        get titles of all items as read only list
+        :return:
+        """
+        return MudbNames(self)
+
+    def get_mem_size(self):
+        """
+        get memory size of store [byte]
+        :return:
+        """
+        with self.lock:
+            num_size = sum(col.itemsize * len(col) for col in (self.col_title, self.col_item_id, self.col_parent_id,
+                                                                self.col_uri, self.col_uri_sfx, self.col_prot,
+                                                                self.col_cls))
+            num_size = num_size + sys.getsizeof(self.a_str) + sum(sys.getsizeof(str_val) for str_val in self.a_str)
+            if self.d_str is not None:
+                num_size = num_size + sys.getsizeof(self.d_str)
+            return num_size
+
+
+class MudbNames(collections.abc.Sequence):
+    """
+    read only list view of the titles of a MudbStore
+
+    A new read of the music db replaces the stores and their views (a_mudb_items_name, a_mudb_tracks_name),
+    it does not merge into them: a kept view shows the titles of its read. Concatenation gives a list,
+    list(view) a mutable copy.
+    """
+
+    def __init__(self, mudb_store):
+        self.mudb_store = mudb_store
+
+    def __len__(self):
+        return len(self.mudb_store)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.mudb_store.get_title(idx_sub) for idx_sub in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx = idx + len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('title index out of range')
+        return self.mudb_store.get_title(idx)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def get_sock_path_def():
+    """
+    get default socket file of the daemon
+    :return:
+    """
+    return os.path.join(tempfile.gettempdir(), 'cosocow-%d.sock' % os.getuid())
+
+
+class CoSoCoWDaemon(object):
+    """
+    daemon mode: one CoSoCoW object shared by many clients over a local unix socket
+
+    Protocol: one json object per line.
+    request:  {"id": 1, "cmd": "set_volume", "args": [0, "up", 2], "kwargs": {}}
+    response: {"id": 1, "res": ...} or {"id": 1, "err": "..."}
+    commands: all of A_CMD, "get_info", "get_attr" (a_* state lists), "subscribe" / "unsubscribe" (event names)
+    event:    {"ev": "ev_volume", "args": [0, 25]}
+    Values are sent as json types, DIDL objects and play states as dicts (see get_json_val);
+    get_attr rejects state lists of other objects (e.g. a_zone_soco).
+    """
+    A_CMD = ('get_zone_avail', 'get_zone_co_idx', 'get_groups', 'set_group', 'get_topology', 'apply_topology',
+             'get_radio_fav', 'get_mudb_list', 'get_mudb_tracks', 'add_mudb_queue_item', 'rem_mudb_queue_item',
+             'get_aux_avail_all', 'set_aux_play', 'set_radio_play', 'set_queue_track_play', 'set_play_start_stop',
+             'set_play_track_next', 'get_volume', 'set_volume', 'set_volume_fade', 'get_balance', 'set_balance',
+             'get_play_queue', 'get_queue_window', 'get_queue_window_art', 'set_play_mode', 'get_sleep_timer',
+             'set_sleep_timer', 'get_mem_report', 'get_state_since', 'snapshot', 'restore',
+             'add_zone', 'remove_zone', 'get_discover', 'get_call_stat', 'get_trace', 'set_trace_lvl',
+             'set_prof', 'get_prof_report', 'add_sched', 'rem_sched', 'get_sched')
+
+    def __init__(self, mc, str_sock_path=None, num_send_buf=1000):
+        """
+
+        :param mc: CoSoCoW object
+        :param str_sock_path: socket file, None: default socket file
+        :param num_send_buf: max. number of pending messages per client
+        """
+        self.mc = mc
+        self.str_sock_path = str_sock_path if str_sock_path is not None else get_sock_path_def()
+        self.num_send_buf = num_send_buf
+        self.lock = threading.Lock()
+        self.d_sub = {}
+        self.a_conn = []
+        self.server = None
+        self.th_server = None
+
+        # forward events of the controller
+        self.a_ev = sorted(str_name for str_name, obj in vars(mc).items() if isinstance(obj, EventCall))
+        for str_ev in self.a_ev:
+            getattr(mc, str_ev).append(self.get_ev_fwd(str_ev))
+
+    def get_ev_fwd(self, str_ev):
+        """
+        get method to forward event to subscribed clients
+        :param str_ev:
+        :return:
+        """
+        return lambda *args: self.set_event(str_ev, args)
+
+    def set_event(self, str_ev, args):
+        """
+        send event to subscribed clients
+        :param str_ev:
+        :param args:
+        """
+        a_conn = self.d_sub.get(str_ev)
+        if not a_conn:
+            return
+        str_msg = json.dumps({'ev': str_ev, 'args': self.get_json_val(args, False)})
+        for conn in list(a_conn):
+            conn.set_send(str_msg)
+
+    def start(self):
+        """
+        start serving clients in background
+        """
+        if os.path.exists(self.str_sock_path):
+            os.remove(self.str_sock_path)
+        daemon = self
+
+        class DaemonHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.set_conn(self)
+
+        num_umask = os.umask(0o177)  # socket is created with mode 0o600, no window for other users
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.str_sock_path, DaemonHandler)
+        finally:
+            os.umask(num_umask)
+        self.server.daemon_threads = True
+        self.th_server = threading.Thread(target=self.server.serve_forever, name='CoSoCoW-Daemon')
+        self.th_server.daemon = True
+        self.th_server.start()
+        self.mc.add_trace('main', 1, ' :d daemon listening on %s', self.str_sock_path)
+
+    def set_conn(self, handler):
+        """
+        serve one client connection (handler thread)
+        :param handler: StreamRequestHandler object
+        """
+        conn = DaemonConn(handler, self.num_send_buf)
+        with self.lock:
+            self.a_conn.append(conn)
+        try:
+            for str_line in handler.rfile:
+                if not str_line.strip():
+                    continue
+                try:
+                    d_req = json.loads(str_line.decode('utf-8'))
+                except ValueError:
+                    conn.set_send(json.dumps({'id': None, 'err': 'invalid json'}))
+                    continue
+                conn.set_send(json.dumps(self.get_call(conn, d_req)))
+        except (IOError, OSError):
+            pass
+        finally:
+            self.set_conn_close(conn)
+
+    def set_conn_close(self, conn):
+        """
+        remove client connection
+        :param conn:
+        """
+        with self.lock:
+            if conn in self.a_conn:
+                self.a_conn.remove(conn)
+            for a_conn in self.d_sub.values():
+                if conn in a_conn:
+                    a_conn.remove(conn)
+        conn.close()
+
+    def get_call(self, conn, d_req):
+        """
+        run request of client
+        :param conn:
+        :param d_req: request
+        :return: response
+        """
+        str_cmd = d_req.get('cmd')
+        args = d_req.get('args') or []
+        kwargs = d_req.get('kwargs') or {}
+        d_resp = {'id': d_req.get('id')}
+        try:
+            if str_cmd == 'get_info':
+                d_resp['res'] = {'cmd': list(self.A_CMD), 'ev': self.a_ev, 'version': __version__}
+            elif str_cmd == 'get_attr':
+                str_attr = args[0]
+                if not str_attr.startswith('a_') or not hasattr(self.mc, str_attr):
+                    raise AttributeError('unknown state: ' + str(str_attr))
+                d_resp['res'] = self.get_json_val(list(getattr(self.mc, str_attr)))
+            elif str_cmd in ('subscribe', 'unsubscribe'):
+                with self.lock:
+                    for str_ev in args:
+                        if str_ev not in self.a_ev:
+                            raise ValueError('unknown event: ' + str(str_ev))
+                        a_conn = self.d_sub.setdefault(str_ev, [])
+                        if str_cmd == 'subscribe' and conn not in a_conn:
+                            a_conn.append(conn)
+                        elif str_cmd == 'unsubscribe' and conn in a_conn:
+                            a_conn.remove(conn)
+                    d_resp['res'] = sorted(str_ev for str_ev, a_conn in self.d_sub.items() if conn in a_conn)
+            elif str_cmd in self.A_CMD:
+                d_resp['res'] = self.get_json_val(getattr(self.mc, str_cmd)(*args, **kwargs), False)
+            else:
+                raise ValueError('unknown command: ' + str(str_cmd))
+        except Exception as err:
+            d_resp['err'] = type(err).__name__ + ': ' + str(err)
+        return d_resp
+
+    @staticmethod
+    def get_json_val(value, b_strict=True):
+        """
+        get value of json types: DIDL objects (to_dict) and play states (get_dict) as dicts, sequences as lists
+        :param value:
+        :param b_strict: raise TypeError for other objects, False: send them as text (command results, events)
+        :return:
+        """
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, dict):
+            return dict((str(key), CoSoCoWDaemon.get_json_val(val, b_strict)) for key, val in value.items())
+        if isinstance(value, (list, tuple, collections.abc.Sequence)):
+            return [CoSoCoWDaemon.get_json_val(val, b_strict) for val in value]
+        for str_fn in ('to_dict', 'get_dict'):
+            if callable(getattr(value, str_fn, None)):
+                return CoSoCoWDaemon.get_json_val(getattr(value, str_fn)(), b_strict)
+        if b_strict:
+            raise TypeError('not serializable: ' + type(value).__name__)
+        return str(value)
+
+    def close(self):
+        """
+        stop serving, close client connections and remove socket file
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self.lock:
+            a_conn = list(self.a_conn)
+        for conn in a_conn:
+            conn.close()
+        if os.path.exists(self.str_sock_path):
+            os.remove(self.str_sock_path)
+
+
+class DaemonConn(object):
+    """
+    client connection of the daemon with send buffer and writer thread
+    """
+
+    def __init__(self, handler, num_send_buf=1000):
+        self.handler = handler
+        self.q_send = queue.Queue(num_send_buf)
+        self.num_drop = 0
+        self.b_open = True
+        self.th_send = threading.Thread(target=self.run, name='CoSoCoW-DaemonConn')
+        self.th_send.daemon = True
+        self.th_send.start()
+
+    def set_send(self, str_msg):
+        """
+        queue message, the oldest message is dropped if the client does not read
+        :param str_msg:
+        """
+        while self.b_open:
+            try:
+                self.q_send.put_nowait(str_msg)
+                return
+            except queue.Full:
+                try:
+                    self.q_send.get_nowait()
+                    self.num_drop = self.num_drop + 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        """
+        writer thread
+        """
+        while True:
+            str_msg = self.q_send.get()
+            if str_msg is None:
+                return
+            try:
+                self.handler.wfile.write(str_msg.encode('utf-8') + b'\n')
+                self.handler.wfile.flush()
+            except (IOError, OSError, ValueError):
+                self.b_open = False
+                return
+
+    def close(self):
+        if self.b_open:
+            self.b_open = False
+            try:
+                self.q_send.put_nowait(None)
+            except queue.Full:
+                pass
+            try:
+                self.handler.connection.shutdown(socket.SHUT_RDWR)
+            except (IOError, OSError):
+                pass
+
+
+class CoSoCoWClient(object):
+    """
+    thin client of the daemon, mirrors the commands, state lists (a_*) and events (ev_*) of CoSoCoW
+
+    Event callbacks run in an own thread (in order of arrival), so they may call commands of the client.
+    """
+
+    def __init__(self, str_sock_path=None, d_timeout=30.0):
+        """
+
+        :param str_sock_path: socket file, None: default socket file
+        :param d_timeout: max. time to wait for a response [sec]
+        """
+        self.d_timeout = d_timeout
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str_sock_path if str_sock_path is not None else get_sock_path_def())
+        self.f_read = self.sock.makefile('rb')
+        self.lock = threading.Lock()
+        self.num_id = 0
+        self.d_wait = {}
+        self.q_ev = queue.Queue()
+        self.th_ev = threading.Thread(target=self.run_ev, name='CoSoCoW-ClientEvent')
+        self.th_ev.daemon = True
+        self.th_ev.start()
+        self.th_read = threading.Thread(target=self.run, name='CoSoCoW-Client')
+        self.th_read.daemon = True
+        self.th_read.start()
+
+        d_info = self.get_call('get_info')
+        self.a_cmd = d_info['cmd']
+        for str_ev in d_info['ev']:
+            setattr(self, str_ev, ClientEventCall(self, str_ev))
+
+    def __getattr__(self, str_name):
+        if str_name.startswith('a_'):
+            return self.get_call('get_attr', str_name)
+        if str_name in self.__dict__.get('a_cmd', ()):
+            return lambda *args, **kwargs: self.get_call(str_name, *args, **kwargs)
+        raise AttributeError(str_name)
+
+    def get_call(self, str_cmd, *args, **kwargs):
+        """
+        run command in daemon
+        :param str_cmd:
+        :param args:
+        :param kwargs:
+        :return: result
+        """
+        fut = concurrent.futures.Future()
+        with self.lock:
+            self.num_id = self.num_id + 1
+            num_id = self.num_id
+            self.d_wait[num_id] = fut
+            str_msg = json.dumps({'id': num_id, 'cmd': str_cmd, 'args': args, 'kwargs': kwargs})
+            self.sock.sendall(str_msg.encode('utf-8') + b'\n')
+        try:
+            d_resp = fut.result(self.d_timeout)
+        finally:
+            with self.lock:
+                self.d_wait.pop(num_id, None)
+        if 'err' in d_resp:
+            raise RuntimeError(d_resp['err'])
+        return d_resp.get('res')
+
+    def run(self):
+        """
+        reader thread
+        """
+        try:
+            for str_line in self.f_read:
+                d_msg = json.loads(str_line.decode('utf-8'))
+                if 'ev' in d_msg:
+                    ev_call = self.__dict__.get(d_msg['ev'])
+                    if ev_call is not None:
+                        self.q_ev.put((ev_call, d_msg['args']))
+                else:
+                    with self.lock:
+                        fut = self.d_wait.get(d_msg.get('id'))
+                    if fut is not None:
+                        fut.set_result(d_msg)
+        except (IOError, OSError, ValueError):
+            pass
+        with self.lock:
+            for fut in self.d_wait.values():
+                if not fut.done():
+                    fut.set_result({'err': 'connection closed'})
+        self.q_ev.put(None)
+
+    def run_ev(self):
+        """
+        event thread: call callbacks of received events
+        """
+        while True:
+            item = self.q_ev.get()
+            if item is None:
+                return
+            ev_call, args = item
+            try:
+                ev_call(*args)
+            except Exception as err:
+                print('CoSoCoWClient: event callback failed: ' + str(err))
+
+    def subscribe(self, fn, a_ev, a_zone=None, a_kind=None, b_weak=None):
+        """
+        subscribe to events of zones and kinds only (filtered in the client), see CoSoCoW.subscribe
+        :param fn:
+        :param a_ev:
+        :param a_zone:
+        :param a_kind:
+        :param b_weak:
+        :return: EventSub object
+        """
+        return EventCall.subscribe_obj(self, fn, a_ev, a_zone, a_kind, b_weak)
+
+    def close(self):
+        """
+        close connection
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+        self.sock.close()
+
+
+class ClientEventCall(EventCall):
+    """
+    event of CoSoCoWClient, subscribes at the daemon with the first callback or subscription
+    """
+    # arguments of events without zone at position 0 or with kind (see EventCall)
+    D_EV_ARG = {'ev_groups': (None, None), 'ev_grp_play': (1, 2), 'ev_snapshot': (None, None), 'ev_state': (0, 1)}
+
+    def __init__(self, client, str_ev):
+        super(ClientEventCall, self).__init__(*self.D_EV_ARG.get(str_ev, (0, None)))
+        self.client = client
+        self.str_ev = str_ev
+
+    def append(self, f):
+        if self.num_ev() == 0:
+            self.client.get_call('subscribe', self.str_ev)
+        super(ClientEventCall, self).append(f)
+
+    def remove(self, f):
+        super(ClientEventCall, self).remove(f)
+        self.set_unlink()
+
+    def add_sub(self, sub, a_key):
+        if self.num_ev() == 0:
+            self.client.get_call('subscribe', self.str_ev)
+        super(ClientEventCall, self).add_sub(sub, a_key)
+
+    def rem_sub(self, sub, a_key):
+        super(ClientEventCall, self).rem_sub(sub, a_key)
+        self.set_unlink()
+
+    def set_unlink(self):
+        # not in the reader thread (subscription of a gone object ends while the event is called)
+        if self.num_ev() == 0 and threading.current_thread() is not self.client.th_read:
+            self.client.get_call('unsubscribe', self.str_ev)
+
+
+class GrpPlayState(object):
+    """
+    play state of a group, kept once at the zone coordinator
+    """
+    D_DEF = collections.OrderedDict([
+        ('play_track_sub', 0), ('play_track', 0), ('play_track_meta', 0), ('play_is_radio', 0),
+        ('play_is_auxin', 0), ('play_is_mudb', 0), ('play_track_idx', 0), ('play_mode', 0),
+        ('play_trans_state', 0), ('play_trans_status', 'N/A'), ('play_is_valid', 0), ('play_state', 0),
+        ('play_art_uri', '')])
+    # field name of set_state_upd
+    D_STATE_FIELD = {'play_track_sub': 'play_track_sub', 'play_track': 'play_track', 'play_track_idx': 'play_track_idx',
+                     'play_mode': 'play_mode', 'play_trans_state': 'trans_state',
+                     'play_trans_status': 'trans_status', 'play_state': 'play_state', 'play_art_uri': 'play_art'}
+    __slots__ = tuple(D_DEF.keys()) + ('a_member',)
+
+    def __init__(self):
+        for str_field, value in self.D_DEF.items():
+            setattr(self, str_field, value)
+        self.a_member = []
+
+    def get_fields_set(self):
+        """
+        get fields which differ from initial value
+        :return:
+        """
+        return [str_field for str_field, value in self.D_DEF.items() if getattr(self, str_field) != value]
+
+    def get_dict(self):
+        d_out = dict((str_field, getattr(self, str_field)) for str_field in self.D_DEF)
+        d_out['a_member'] = list(self.a_member)
+        return d_out
+
+
+class GrpPlayView(collections.abc.Sequence):
+    """
+    per zone view of a group play state field through the zone coordinator (e.g. a_play_track)
+    """
+
+    def __init__(self, mc, str_field):
+        self.mc = mc
+        self.str_field = str_field
+
+    def get_grp(self, idx_zone):
+        num_zones = len(self.mc.a_grp_play)
+        if idx_zone < 0:
+            idx_zone = idx_zone + num_zones
+        if not 0 <= idx_zone < num_zones:
+            raise IndexError('zone index out of range')
+        idx_coo = self.mc.a_group_co[idx_zone] if idx_zone < len(self.mc.a_group_co) else None
+        if idx_coo is None:
+            idx_coo = idx_zone
+        return self.mc.a_grp_play[idx_coo]
+
+    def __len__(self):
+        return len(self.mc.a_grp_play)
+
+    def __getitem__(self, idx_zone):
+        if isinstance(idx_zone, slice):
+            return [self[idx] for idx in range(*idx_zone.indices(len(self)))]
+        return getattr(self.get_grp(idx_zone), self.str_field)
+
+    def __setitem__(self, idx_zone, value):
+        setattr(self.get_grp(idx_zone), self.str_field, value)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class EvDecoder(object):
+    """
+    lean decoder of UPnP event notifications, replacement of the soco event parser (see set_hook)
+
+    The property set and the LastChange document are scanned in one pass by regular expressions,
+    no element tree is built. Only the LastChange fields of a_field are decoded, DIDL meta data is
+    kept as string (EvDidl) and parsed completely only if an attribute beyond title and album art is read.
+    The result has the same keys and values as the soco parser. Events the scanner does not understand
+    are passed to the soco parser.
+    """
+    A_MOD = ('soco.events_base', 'soco.events')  # modules of soco parse_event_xml (new and old soco)
+    RE_PROP = re.compile(r'<(?:\w+:)?property>\s*<(\w+)(?:\s[^>]*?)?(/?)>')
+    RE_ELEM = re.compile(r'<(?:\w+:)?(\w+)([^>]*)>')  # attribute values have no '>' (escaped)
+    RE_ATTR = re.compile(r'([\w:]+)="([^"]*)"')
+    RE_ENT = re.compile(r'&#(\w+);')
+    RE_CAMEL1 = re.compile(r'(.)([A-Z][a-z]+)')
+    RE_CAMEL2 = re.compile(r'([a-z0-9])([A-Z])')
+    A_CONTAINER = ('Event', 'InstanceID', 'QueueID')
+
+    parse_orig = None  # soco parser, set by set_hook
+    d_tag = {}  # tag -> snake case key (shared cache)
+
+    def __init__(self, a_field=None, num_cache=32):
+        """
+
+        :param a_field: keys of LastChange fields to decode (snake case), None: all fields
+        :param num_cache: number of decoded notifications kept
+        """
+        self.a_field = None if a_field is None else frozenset(a_field)
+        self.num_fallback = 0
+        # the same notification arrives once per subscribed group member
+        self.d_cache = collections.OrderedDict()
+        self.num_cache = num_cache
+        self.lock = threading.Lock()
+
+    @classmethod
+    def set_hook(cls, decoder=None):
+        """
+        install decoder as event parser of soco (all subscriptions of the process), None: soco parser
+        :param decoder: EvDecoder object or None
+        :return: True if a soco event module was found
+        """
+        b_found = False
+        for str_mod in cls.A_MOD:
+            mod = sys.modules.get(str_mod)
+            if mod is None:
+                try:
+                    __import__(str_mod)
+                except ImportError:
+                    continue
+                mod = sys.modules[str_mod]
+            fn_parse = getattr(mod, 'parse_event_xml', None)
+            if fn_parse is None:
+                continue
+            if cls.parse_orig is None:
+                cls.parse_orig = getattr(fn_parse, 'parse_orig', fn_parse)
+            if decoder is None:
+                mod.parse_event_xml = cls.parse_orig
+            else:
+                fn_decode = decoder.decode
+                mod.parse_event_xml = lambda xml_event, fn_decode=fn_decode: fn_decode(xml_event)
+                mod.parse_event_xml.parse_orig = cls.parse_orig
+            b_found = True
+        return b_found
+
+    @classmethod
+    def get_key(cls, str_tag):
+        """
+        get snake case key of tag (as soco camel_to_underscore)
+        :param str_tag:
+        :return:
+        """
+        str_key = cls.d_tag.get(str_tag)
+        if str_key is None:
+            str_key = cls.RE_CAMEL2.sub(r'\1_\2', cls.RE_CAMEL1.sub(r'\1_\2', str_tag)).lower()
+            cls.d_tag[str_tag] = str_key
+        return str_key
+
+    @classmethod
+    def get_unesc(cls, str_val):
+        """
+        replace xml entities
+        :param str_val:
+        :return:
+        """
+        if '&' not in str_val:
+            return str_val
+        if '&#' in str_val:
+            str_val = cls.RE_ENT.sub(cls.get_ent_num, str_val)
+        str_val = str_val.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&apos;', "'")
+        return str_val.replace('&amp;', '&')
+
+    @staticmethod
+    def get_ent_num(match):
+        str_ent = match.group(1)
+        return chr(int(str_ent[1:], 16) if str_ent[0] in 'xX' else int(str_ent))
+
+    def decode(self, xml_event):
+        """
+        decode event notification
+        :param xml_event: body of notification (bytes or str)
+        :return: dict of event variables
+        """
+        with self.lock:
+            d_var = self.d_cache.get(xml_event)
+            if d_var is not None:
+                self.d_cache.move_to_end(xml_event)
+                return d_var
+
+        str_event = xml_event.decode('utf-8') if isinstance(xml_event, bytes) else xml_event
+        try:
+            d_var = self.get_vars(str_event)
+        except Exception:
+            fn_parse = EvDecoder.parse_orig  # plain function (not bound to the decoder)
+            if fn_parse is None:
+                raise
+            self.num_fallback = self.num_fallback + 1
+            return fn_parse(xml_event)
+
+        with self.lock:
+            self.d_cache[xml_event] = d_var
+            if len(self.d_cache) > self.num_cache:
+                self.d_cache.popitem(False)
+        return d_var
+
+    def get_vars(self, str_event):
+        """
+        decode property set
+        :param str_event:
+        :return:
+        """
+        d_var = {}
+        idx_pos = 0
+        while True:
+            match = self.RE_PROP.search(str_event, idx_pos)
+            if match is None:
+                break
+            str_tag = match.group(1)
+            if match.group(2) == '/':
+                str_text = None  # empty element
+                idx_pos = match.end()
+            else:
+                idx_end = str_event.index('</' + str_tag + '>', match.end())
+                str_text = str_event[match.end():idx_end] or None  # as element tree: no text is None
+                idx_pos = idx_end
+            if str_tag == 'LastChange':
+                self.get_last_change(self.get_unesc(str_text or ''), d_var)
+            else:
+                d_var[self.get_key(str_tag)] = None if str_text is None else self.get_unesc(str_text)
+        if not d_var and 'property' not in str_event:
+            raise ValueError('no property set')
+        return d_var
+
+    def get_last_change(self, str_lc, d_var):
+        """
+        decode LastChange document into event variables
+        :param str_lc: LastChange document (unescaped once)
+        :param d_var: event variables
+        """
+        a_field = self.a_field
+        for match in self.RE_ELEM.finditer(str_lc):
+            str_tag = match.group(1)
+            if str_tag in self.A_CONTAINER:
+                continue
+            str_attr_all = match.group(2)
+            if not str_attr_all.endswith('/'):
+                raise ValueError('element with text: ' + str_tag)  # not a LastChange value, soco parser
+            str_key = self.get_key(str_tag)
+            if a_field is not None and str_key not in a_field:
+                continue
+            str_val = None
+            str_chn = None
+            for str_attr, str_attr_val in self.RE_ATTR.findall(str_attr_all):
+                if str_attr == 'val':
+                    str_val = str_attr_val
+                elif str_attr == 'channel':
+                    str_chn = str_attr_val
+            if str_val is None:
+                raise ValueError('element without value: ' + str_tag)
+            if str_val.startswith('&lt;DIDL-Lite'):
+                value = EvDidl(self.get_unesc(str_val))
+            else:
+                value = self.get_unesc(str_val)
+            if str_chn is not None:
+                d_var.setdefault(str_key, {})[str_chn] = value
+            else:
+                d_var[str_key] = value
+
+    @staticmethod
+    def get_sample(num_track=0):
+        """
+        get avTransport LastChange notification as sent by a speaker (benchmark)
+        :param num_track: track number (varies the content)
+        :return:
+        """
+        def esc(str_val):
+            return str_val.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+        str_didl = ('<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                    'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+                    'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" '
+                    'xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+                    '<item id="-1" parentID="-1" restricted="true">'
+                    '<res protocolInfo="x-file-cifs:*:audio/mpeg:*" duration="0:03:{0:02d}">'
+                    'x-file-cifs://nas/music/Artist/Album/{0:02d} Track.mp3</res>'
+                    '<r:streamContent></r:streamContent>'
+                    '<upnp:albumArtURI>/getaa?s=1&amp;u=x-file-cifs%3a%2f%2fnas%2fmusic%2f{0:02d}.mp3'
+                    '</upnp:albumArtURI>'
+                    '<dc:title>Track {0} &amp; more</dc:title><upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+                    '<dc:creator>Artist</dc:creator><upnp:album>Album</upnp:album>'
+                    '<upnp:originalTrackNumber>{0}</upnp:originalTrackNumber>'
+                    '<r:albumArtist>Artist</r:albumArtist></item></DIDL-Lite>').format(num_track % 60)
+        str_src = ('<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                   'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+                   'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" '
+                   'xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+                   '<item id="A:ALBUM/Album" parentID="A:ALBUM" restricted="true"><dc:title>Album</dc:title>'
+                   '<upnp:class>object.container.album.musicAlbum</upnp:class>'
+                   '<desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">'
+                   'RINCON_AssociatedZPUDN</desc></item></DIDL-Lite>')
+        a_field = [('TransportState', 'PLAYING'), ('CurrentPlayMode', 'NORMAL'), ('CurrentCrossfadeMode', '0'),
+                   ('NumberOfTracks', '12'), ('CurrentTrack', str(num_track)), ('CurrentSection', '0'),
+                   ('CurrentTrackURI', 'x-file-cifs://nas/music/Artist/Album/{0:02d} Track.mp3'.format(num_track)),
+                   ('CurrentTrackDuration', '0:03:25'), ('CurrentTrackMetaData', str_didl),
+                   ('r:NextTrackURI', 'x-file-cifs://nas/music/Artist/Album/next.mp3'),
+                   ('r:NextTrackMetaData', str_didl), ('r:EnqueuedTransportURI', 'x-rincon-playlist:RINCON_1#A:ALBUM'),
+                   ('r:EnqueuedTransportURIMetaData', str_src), ('PlaybackStorageMedium', 'NETWORK'),
+                   ('AVTransportURI', 'x-rincon-queue:RINCON_1#0'), ('AVTransportURIMetaData', ''),
+                   ('NextAVTransportURI', ''), ('NextAVTransportURIMetaData', ''),
+                   ('CurrentTransportActions', 'Set, Stop, Pause, Play, X_DLNA_SeekTime, Next, Previous'),
+                   ('r:CurrentValidPlayModes', 'SHUFFLE,REPEAT,REPEATONE,CROSSFADE'),
+                   ('r:DirectControlClientID', ''), ('r:DirectControlIsSuspended', '0'),
+                   ('r:DirectControlAccountID', ''), ('TransportStatus', 'OK'), ('r:SleepTimerGeneration', '0'),
+                   ('r:AlarmRunning', '0'), ('r:SnoozeRunning', '0'), ('r:RestartPending', '0'),
+                   ('TransportPlaySpeed', '1'), ('CurrentMediaDuration', ''), ('RecordStorageMedium', 'NONE'),
+                   ('PossiblePlaybackStorageMedia', 'NONE,NETWORK'), ('PossibleRecordStorageMedia', 'NONE'),
+                   ('RecordMediumWriteStatus', 'NOT_IMPLEMENTED'), ('CurrentRecordQualityMode', 'NOT_IMPLEMENTED'),
+                   ('PossibleRecordQualityModes', 'NOT_IMPLEMENTED')]
+        str_lc = ('<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/" '
+                  'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/"><InstanceID val="0">'
+                  + ''.join('<{0} val="{1}"/>'.format(str_tag, esc(str_val)) for str_tag, str_val in a_field)
+                  + '</InstanceID></Event>')
+        return ('<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0"><e:property><LastChange>'
+                + esc(str_lc) + '</LastChange></e:property></e:propertyset>').encode('utf-8')
+
+    @classmethod
+    def get_bench(cls, num_events=2000, a_field=None):
+        """
+        benchmark lean decoder against soco parser with avTransport events (get_play_status reads title and art)
+        :param num_events:
+        :param a_field: fields of lean decoder, None: CoSoCoW.A_EV_FIELD
+        :return: dict parser -> time per event [us]
+        """
+        a_xml = [cls.get_sample(idx) for idx in range(num_events)]  # all different, no cache hits
+        d_res = {}
+        a_parser = [('lean', cls(CoSoCoW.A_EV_FIELD if a_field is None else a_field).decode),
+                    ('lean_all', cls().decode)]
+        cls.set_hook(None)  # finds soco parser
+        if cls.parse_orig is not None:
+            a_parser.insert(0, ('soco', getattr(cls.parse_orig, '__wrapped__', cls.parse_orig)))  # without cache
+        for str_name, fn_parse in a_parser:
+            d_time = time.perf_counter()
+            for xml_event in a_xml:
+                d_var = fn_parse(xml_event)
+                for str_key in ('current_track_meta_data', 'enqueued_transport_uri_meta_data'):
+                    obj = d_var[str_key]
+                    if obj != '':
+                        obj.title
+                        getattr(obj, 'album_art_uri', '')
+            d_res[str_name] = round((time.perf_counter() - d_time) / num_events * 1e6, 1)
+        return d_res
+
+
+class EvDidl(object):
+    """
+    DIDL meta data of event, parsed on demand
+
+    title and album_art_uri are read from the string, any other attribute parses the DIDL document
+    completely (soco DIDL object).
+    """
+    __slots__ = ('str_didl', 'obj_didl', 'd_quick')
+    RE_TITLE = re.compile(r'<dc:title>([^<]*)</dc:title>')
+    RE_ART = re.compile(r'<upnp:albumArtURI(?:\s[^>]*)?>([^<]*)</upnp:albumArtURI>')
+
+    def __init__(self, str_didl):
+        self.str_didl = str_didl
+        self.obj_didl = None
+        self.d_quick = None
+
+    def __repr__(self):
+        return '<EvDidl ' + repr(self.title) + '>'
+
+    def __eq__(self, other):
+        if isinstance(other, EvDidl):
+            return self.str_didl == other.str_didl
+        return NotImplemented if isinstance(other, DidlObject) else False
+
+    def __ne__(self, other):
+        b_eq = self.__eq__(other)
+        return b_eq if b_eq is NotImplemented else not b_eq
+
+    __hash__ = None
+
+    def get_quick(self, str_attr, re_attr):
+        """
+        get attribute from string without parsing the document
+        :param str_attr:
+        :param re_attr:
+        :return:
+        """
+        if self.d_quick is None:
+            self.d_quick = {}
+        if str_attr not in self.d_quick:
+            match = re_attr.search(self.str_didl)
+            if match is None:
+                return getattr(self.get_didl(), str_attr, '')
+            self.d_quick[str_attr] = EvDecoder.get_unesc(match.group(1))
+        return self.d_quick[str_attr]
+
+    @property
+    def title(self):
+        return self.get_quick('title', self.RE_TITLE)
+
+    @property
+    def album_art_uri(self):
+        return self.get_quick('album_art_uri', self.RE_ART)
+
+    def get_didl(self):
+        """
+        get soco DIDL object (parsed once)
+        :return:
+        """
+        if self.obj_didl is None:
+            self.obj_didl = from_didl_string(self.str_didl)[0]
+        return self.obj_didl
+
+    def __getattr__(self, str_name):
+        if str_name.startswith('__') or str_name in self.__slots__:
+            raise AttributeError(str_name)
+        return getattr(self.get_didl(), str_name)
+
+
+class EvRecorder(object):
+    """
+    append-only log of zone events
+
+    Format: one json array per line, first line is the header {"h": {...}}.
+    event: [time, idx_zone, num_srv, variables], DIDL objects as {"didl": "<DIDL-Lite ...>"}
+    """
+
+    def __init__(self, str_file, d_head, d_flush=1.0):
+        """
+
+        :param str_file: log file, gzip compressed if ending with .gz
+        :param d_head: header (zones, devices)
+        :param d_flush: max. time between flush to file [sec]
+        """
+        self.str_file = str_file
+        self.d_flush = d_flush
+        self.lock = threading.Lock()
+        self.num_ev = 0
+        b_new = not os.path.exists(str_file) or os.path.getsize(str_file) == 0
+        if str_file.endswith('.gz'):
+            self.f_log = gzip.open(str_file, 'at', encoding='utf-8')
+        else:
+            self.f_log = open(str_file, 'a', encoding='utf-8')
+        if b_new:
+            self.f_log.write(json.dumps({'h': d_head}, separators=(',', ':')) + '\n')
+        self.d_time_flush = time.time()
+
+    @staticmethod
+    def get_enc(value):
+        """
+        get json compatible value of event variable
+        :param value:
+        :return:
+        """
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        if isinstance(value, EvDidl):
+            return {'didl': value.str_didl}
+        if isinstance(value, DidlObject):
+            try:
+                return {'didl': to_didl_string(value)}
+            except:
+                return str(value)
+        if isinstance(value, dict):
+            return dict((str(k), EvRecorder.get_enc(v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return [EvRecorder.get_enc(v) for v in value]
+        return str(value)
+
+    @staticmethod
+    def get_dec(value):
+        """
+        get event variable from json value
+        :param value:
+        :return:
+        """
+        if isinstance(value, dict):
+            if len(value) == 1 and 'didl' in value:
+                return EvDidl(value['didl'])  # parsed on demand
+            return dict((k, EvRecorder.get_dec(v)) for k, v in value.items())
+        return value
+
+    def add(self, idx_zone, num_srv, event_var, d_time=None):
+        """
+        append event
+        :param idx_zone:
+        :param num_srv:
+        :param event_var:
+        :param d_time: time of event, None: now
+        """
+        d_time = time.time() if d_time is None else d_time
+        str_line = json.dumps([round(d_time, 3), idx_zone, num_srv, self.get_enc(dict(event_var))],
+                              separators=(',', ':'))
+        with self.lock:
+            if self.f_log is None:
+                return
+            self.f_log.write(str_line + '\n')
+            self.num_ev = self.num_ev + 1
+            if d_time - self.d_time_flush >= self.d_flush:
+                self.f_log.flush()
+                self.d_time_flush = d_time
+
+    def close(self):
+        with self.lock:
+            if self.f_log is not None:
+                self.f_log.close()
+                self.f_log = None
+
+
+class EvReplay(object):
+    """
+    replay of event log through the event handling of CoSoCoW without speakers
+    """
+
+    def __init__(self, str_file):
+        """
+
+        :param str_file: event log of EvRecorder
+        """
+        self.str_file = str_file
+        with self.get_file() as f_log:
+            self.d_head = json.loads(f_log.readline())['h']
+
+    def get_file(self):
+        if self.str_file.endswith('.gz'):
+            return gzip.open(self.str_file, 'rt', encoding='utf-8')
+        return open(self.str_file, 'r', encoding='utf-8')
+
+    def get_events(self):
+        """
+        get recorded events
+        :return: generator of (time, idx_zone, num_srv, event_var)
+        """
+        with self.get_file() as f_log:
+            f_log.readline()
+            for str_line in f_log:
+                if str_line.strip():
+                    d_time, idx_zone, num_srv, event_var = json.loads(str_line)
+                    yield d_time, idx_zone, num_srv, EvRecorder.get_dec(event_var)
+
+    def run(self, b_real_time=False, d_speed=1.0, mc=None):
+        """
+        feed recorded events to the event handling
+        :param b_real_time: keep recorded timing, otherwise as fast as possible
+        :param d_speed: speed factor of real time replay
+        :param mc: CoSoCoWReplay object, None: new object
+        :return: report: number of events, handling time, events per second, state trajectory, final state
+        """
+        if mc is None:
+            mc = CoSoCoWReplay(self.d_head)
+            mc.start()['topology'].result()
+        a_event = list(self.get_events())
+        d_time_hdl = 0.0
+        d_time_start = time.time()
+        for d_time, idx_zone, num_srv, event_var in a_event:
+            if b_real_time:
+                d_wait = (d_time - a_event[0][0]) / d_speed - (time.time() - d_time_start)
+                if d_wait > 0:
+                    time.sleep(d_wait)
+            mc.d_replay_time = d_time
+            mc.household.set_event(idx_zone, num_srv, event_var)
+            d_perf = time.perf_counter()
+            mc.set_zone_event(idx_zone, num_srv, event_var)
+            if num_srv == 4:
+                mc.set_groups_sync()
+            d_time_hdl = d_time_hdl + time.perf_counter() - d_perf
+        num_ev = len(a_event)
+        return {'num_events': num_ev,
+                'd_time_hdl': d_time_hdl,
+                'd_time_total': time.time() - d_time_start,
+                'num_per_sec': num_ev / d_time_hdl if d_time_hdl > 0 else 0.0,
+                'trajectory': mc.a_replay_traj,
+                'state': StateStream(mc).get_snapshot_msg()['s']}
+
+
+class CoSoCoWReplay(CoSoCoW):
+    """
+    CoSoCoW on replay zones: no network, no cyclic threads, events are fed by EvReplay
+    """
+
+    def __init__(self, d_head):
+        """
+
+        :param d_head: header of event log
+        """
+        self.household = ReplayHousehold(d_head)
+        self.d_replay_time = 0.0
+        self.a_replay_traj = []
+        super(CoSoCoWReplay, self).__init__(d_head['zones'], str_reg_file='')
+
+    def init_ctrl(self):
+        self.idx_verbosity_lvl = 0
+        for str_cls in list(self.call_policy.d_cls):
+            self.call_policy.set_cls(str_cls, None, 0)  # calls of replay zones run in place
+        for str_ip, dev in self.household.d_dev.items():
+            if dev:
+                self.dev_reg.set_dev(str_ip, dev.get('uid'), **dict((k, v) for k, v in dev.items() if k != 'uid'))
+        for z_ip_address in self.a_zone_ip:
+            if isinstance(z_ip_address, str):
+                self.a_zone_soco.append(self.household.d_zone[z_ip_address])
+            else:
+                self.a_zone_soco.append([self.household.d_zone[str_ip] for str_ip in z_ip_address])
+
+    def get_aux_avail(self, z_req):
+        return z_req.dev.get('line_in_name', ''), z_req.dev.get('line_in_type', '')
+
+    def cyclic_thread_0(self):
+        pass
+
+    def cyclic_thread_1(self):
+        pass
+
+    def cyclic_thread_2(self):
+        pass
+
+    def set_state_upd(self, idx_zone, str_field, value):
+        self.a_replay_traj.append((self.d_replay_time, idx_zone, str_field, value))
+        super(CoSoCoWReplay, self).set_state_upd(idx_zone, str_field, value)
+
+
+class ReplayHousehold(object):
+    """
+    speakers of a replay, state is taken from the replayed events
+    """
+
+    def __init__(self, d_head):
+        self.d_dev = d_head.get('dev', {})
+        self.d_zone = {}
+        self.a_zone = []
+        for z_ip_address in d_head['zones']:
+            a_ip = [z_ip_address] if isinstance(z_ip_address, str) else z_ip_address
+            self.a_zone.append([])
+            for str_ip in a_ip:
+                z_rep = ReplayZone(self, str_ip, self.d_dev.get(str_ip) or {})
+                self.d_zone[str_ip] = z_rep
+                self.a_zone[-1].append(z_rep)
+        self.d_uid = dict((z_rep.uid, z_rep) for z_rep in self.d_zone.values())
+        self.d_group = {}
+
+    def set_event(self, idx_zone, num_srv, event_var):
+        """
+        update speaker state from event
+        :param idx_zone:
+        :param num_srv:
+        :param event_var:
+        """
+        z_rep = self.a_zone[idx_zone][0]
+        z_rep.d_var.update(event_var)
+        if num_srv == 4 and 'zone_group_state' in event_var:
+            self.set_group_state(event_var['zone_group_state'])
+
+    def set_group_state(self, str_xml):
+        """
+        update groups from zone_group_state of topology event
+        :param str_xml:
+        """
+        try:
+            tree = ET.fromstring(str_xml)
+        except ET.ParseError:
+            return
+        d_group = {}
+        for grp in tree.iter('ZoneGroup'):
+            z_coo = self.d_uid.get(grp.get('Coordinator'))
+            if z_coo is None:
+                continue
+            a_member = [self.d_uid[m.get('UUID')] for m in grp.iter('ZoneGroupMember') if m.get('UUID') in self.d_uid]
+            for z_rep in a_member:
+                d_group[z_rep] = ReplayGroup(z_coo, a_member)
+        self.d_group = d_group
+
+
+class ReplayGroup(object):
+    def __init__(self, coordinator, members):
+        self.coordinator = coordinator
+        self.members = members
+
+
+class ReplayZone(object):
+    """
+    speaker of a replay, replaces SoCo: answers from the replayed events, commands are ignored
+    """
+
+    def __init__(self, household, str_ip, dev):
+        self.household = household
+        self.ip_address = str_ip
+        self.dev = dev
+        self.uid = dev.get('uid', 'RINCON_' + str_ip.replace('.', ''))
+        self.d_var = {}
+        for str_srv in ('renderingControl', 'avTransport', 'contentDirectory', 'zoneGroupTopology',
+                        'deviceProperties', 'groupRenderingControl'):
+            setattr(self, str_srv, ReplayService(self))
+
+    def __repr__(self):
+        return 'ReplayZone("%s")' % self.ip_address
+
+    def __getattr__(self, str_name):
+        # commands are ignored
+        return lambda *args, **kwargs: None
+
+    @property
+    def group(self):
+        return self.household.d_group.get(self, ReplayGroup(self, [self]))
+
+    @property
+    def is_playing_line_in(self):
+        return str(self.d_var.get('av_transport_uri', '')).startswith('x-rincon-stream:')
+
+    @property
+    def volume(self):
+        try:
+            return int(self.d_var['volume']['Master'])
+        except (KeyError, TypeError, ValueError):
+            return 0
+
+    @property
+    def queue_size(self):
+        return 0
+
+    def get_queue(self, *args, **kwargs):
+        return []
+
+    def get_speaker_info(self, refresh=False, timeout=None):
+        return {'zone_name': self.dev.get('zone_name', self.ip_address), 'uid': self.uid,
+                'model_name': self.dev.get('model_name', '')}
+
+    def get_current_track_info(self):
+        obj_meta = self.d_var.get('current_track_meta_data', '')
+        str_stream = str(getattr(obj_meta, 'stream_content', '') or '')
+        if ' - ' in str_stream:
+            str_artist, str_title = str_stream.split(' - ', 1)
+        else:
+            str_artist = str(getattr(obj_meta, 'creator', '') or '')
+            str_title = str(getattr(obj_meta, 'title', '') or '')
+        return {'artist': str_artist, 'title': str_title, 'playlist_position': self.d_var.get('current_track', '0')}
+
+    def get_sleep_timer(self):
+        return None
+
+
+class ReplayService(object):
+    def __init__(self, z_rep):
+        self.z_rep = z_rep
+        self.sub = None
+
+    def subscribe(self, *args, **kwargs):
+        self.sub = ReplaySub()
+        return self.sub
+
+    def __getattr__(self, str_action):
+        def f(args=None, **kwargs):
+            if str_action in ('GetVolume', 'GetGroupVolume'):
+                return {'CurrentVolume': str(self.z_rep.volume if str_action == 'GetGroupVolume' else 100)}
+            return {}
+        return f
+
+
+class ReplaySub(object):
+    """
+    event subscription of replay zone (events are put by StressBench)
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.is_subscribed = True
+
+    def unsubscribe(self):
+        self.is_subscribed = False
+
+    def put(self, event_var):
+        self.events.put(ReplayEvent(event_var))
+
+
+class ReplayEvent(object):
+    __slots__ = ('variables',)
+
+    def __init__(self, variables):
+        self.variables = variables
+
+
+class StressCoSoCoW(CoSoCoWReplay):
+    """
+    CoSoCoW on synthetic zones of StressBench: cyclic thread 0 takes the events from the subscriptions
+
+    Cyclic thread 0 is woken by a put event (ev_wake, as by the event listener thread) instead of the poll
+    cycle of 100 ms, so the latency is the cost of the event path and not the poll interval.
+    """
+
+    def __init__(self, d_head, bench):
+        """
+
+        :param d_head: header of synthetic household (see StressBench.get_head)
+        :param bench: StressBench object
+        """
+        self.bench = bench
+        self.ev_wake = threading.Event()
+        super(StressCoSoCoW, self).__init__(d_head)
+
+    def cyclic_thread_0(self):
+        self.ev_wake.wait(0.1)
+        self.ev_wake.clear()
+        CoSoCoW.cyclic_thread_0(self)
+        if self.get_ev_pend():
+            self.ev_wake.set()  # one event per subscription and cycle
+
+    def get_ev_pend(self):
+        """
+        check for events not taken from the subscriptions
+        :return:
+        """
+        for num_srv, str_srv, str_name, str_fn in self.A_ZONE_EV:
+            for sub in getattr(self, 'a_zone_ev_sub' + str(num_srv)):
+                if sub is not None and not sub.events.empty():
+                    return True
+        return False
+
+    def set_cyclic(self, d_time, fn_cyclic):
+        if fn_cyclic.__name__ == 'cyclic_thread_0':
+            d_time = 0.0  # waits for ev_wake
+        super(StressCoSoCoW, self).set_cyclic(d_time, fn_cyclic)
+
+    def get_call(self, z_req, str_cls, str_op, fn, idx_prio=None):
+        if self.bench.d_call_ms > 0:
+            time.sleep(self.bench.d_call_ms / 1e3)  # round trip of speaker
+        return super(StressCoSoCoW, self).get_call(z_req, str_cls, str_op, fn, idx_prio)
+
+    def set_state_upd(self, idx_zone, str_field, value):
+        self.bench.num_upd += 1
+        CoSoCoW.set_state_upd(self, idx_zone, str_field, value)  # no replay trajectory
+
+    def set_zone_event(self, idx_zone, num_srv, event_var):
+        num_upd = self.bench.num_upd
+        super(StressCoSoCoW, self).set_zone_event(idx_zone, num_srv, event_var)
+        self.bench.set_done(event_var, self.bench.num_upd != num_upd)
+
+
+class StressBench(object):
+    """
+    event storm benchmark of the event path (get_zone_events -> event handlers -> EventCall) on synthetic zones
+
+    Events are put into the subscriptions at a fixed rate and type mix, as the soco event listener does, and wake
+    the event handling thread. Latency is measured from putting the event to the end of its handling (EventCall
+    subscribers included); the 100 ms poll of CoSoCoW.cyclic_thread_0 is not part of it.
+    Events not handled within the drain time are dropped, handled events without state change are coalesced.
+    Every EventCall has one subscriber (counts the calls).
+    """
+    A_GRP_SIZE = ((1, 0.55), (2, 0.25), (3, 0.12), (4, 0.05), (6, 0.03))  # group size, share of groups
+    D_MIX = {'Track': 0.45, 'Sound': 0.45, 'Zone': 0.1}  # share of event types
+    D_SLO = {'p50_ms': 20.0, 'p99_ms': 100.0, 'drop_pct': 0.0, 'cpu_pct': 80.0}  # upper limits
+    # results to check against SLOs (mem_mb: growth of peak resident memory, backlog_max: events not handled)
+    A_RES = ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'drop_pct', 'coal_pct', 'cpu_pct', 'mem_mb', 'backlog_max')
+    D_SRV = {'Sound': 1, 'Track': 2, 'Zone': 4}
+
+    def __init__(self, num_zones=10, d_rate=100.0, d_duration=10.0, d_mix=None, d_slo=None, d_call_ms=0.0,
+                 d_drain=2.0, num_seed=0):
+        """
+
+        :param num_zones: number of synthetic zones (1 .. 100)
+        :param d_rate: events per second (all zones)
+        :param d_duration: time of event storm [sec]
+        :param d_mix: event type -> share (Track, Sound, Zone), None: D_MIX
+        :param d_slo: result -> upper limit (keys of A_RES), None: D_SLO
+        :param d_call_ms: simulated round trip time of speaker calls [ms]
+        :param d_drain: time to handle the remaining events after the storm [sec]
+        :param num_seed: seed of random generator (same storm for same seed)
+        """
+        self.num_zones = num_zones
+        self.d_rate = d_rate
+        self.d_duration = d_duration
+        self.d_mix = dict(d_mix or self.D_MIX)
+        self.d_slo = dict(self.D_SLO if d_slo is None else d_slo)
+        for str_key in list(self.d_mix) + list(self.d_slo):
+            if str_key not in self.D_SRV and str_key not in self.A_RES:
+                raise ValueError('stress bench: unknown key ' + str_key)
+        self.d_call_ms = d_call_ms
+        self.d_drain = d_drain
+        self.rnd = random.Random(num_seed)
+        self.decoder = EvDecoder(CoSoCoW.A_EV_FIELD)
+        self.lock = threading.Lock()
+        self.d_inj = {}  # id of event variables -> [time of put, event type]
+        self.d_lat = collections.defaultdict(list)  # event type -> latencies [sec]
+        self.num_cb = 0
+        self.num_upd = 0
+        self.num_inj = 0
+        self.num_coal = 0
+        self.a_grp = []
+
+    def get_head(self):
+        """
+        get header of synthetic household: zones, devices and initial groups (sizes after A_GRP_SIZE)
+        :return:
+        """
+        a_ip = ['10.199.' + str(idx // 250) + '.' + str(idx % 250 + 1) for idx in range(self.num_zones)]
+        d_dev = dict((str_ip, {'uid': 'RINCON_STRESS{0:03d}'.format(idx), 'zone_name': 'Stress ' + str(idx),
+                               'model_name': 'Stress'}) for idx, str_ip in enumerate(a_ip))
+        a_size, a_share = zip(*self.A_GRP_SIZE)
+        self.a_grp = []
+        idx_zone = 0
+        while idx_zone < self.num_zones:
+            num_size = min(self.rnd.choices(a_size, a_share)[0], self.num_zones - idx_zone)
+            self.a_grp.append(list(range(idx_zone, idx_zone + num_size)))
+            idx_zone += num_size
+        return {'version': 1, 'zones': a_ip, 'dev': d_dev}
+
+    def get_group_xml(self):
+        """
+        get zone_group_state of current groups
+        :return:
+        """
+        return '<ZoneGroups>' + ''.join(
+            '<ZoneGroup Coordinator="RINCON_STRESS{0:03d}" ID="RINCON_STRESS{0:03d}:{1}">'.format(a_grp[0], idx_grp)
+            + ''.join('<ZoneGroupMember UUID="RINCON_STRESS{0:03d}"/>'.format(idx) for idx in a_grp)
+            + '</ZoneGroup>' for idx_grp, a_grp in enumerate(self.a_grp) if a_grp) + '</ZoneGroups>'
+
+    def get_event(self, str_type, num_seq):
+        """
+        get next synthetic event
+        :param str_type: event type (D_SRV)
+        :param num_seq: number of event
+        :return: zone index, event variables
+        """
+        if str_type == 'Sound':
+            idx_zone = self.rnd.randrange(self.num_zones)
+            str_vol = str(num_seq * 7 % 101)
+            return idx_zone, {'volume': {'Master': str_vol, 'LF': '100', 'RF': '100'}}
+        if str_type == 'Track':
+            # each member of a group sends the avTransport event, only the coordinator handles it
+            idx_zone = self.rnd.randrange(self.num_zones)
+            return idx_zone, dict(self.decoder.decode(EvDecoder.get_sample(num_seq)))
+        # regroup: move one zone to another group or make it standalone
+        idx_zone = self.rnd.randrange(self.num_zones)
+        for a_grp in self.a_grp:
+            if idx_zone in a_grp:
+                a_grp.remove(idx_zone)
+        a_grp_to = self.rnd.choice([a_grp for a_grp in self.a_grp if a_grp] + [[]])
+        if a_grp_to:
+            a_grp_to.append(idx_zone)
+        else:
+            self.a_grp.append([idx_zone])
+        self.a_grp = [a_grp for a_grp in self.a_grp if a_grp]
+        return idx_zone, {'zone_group_state': self.get_group_xml()}
+
+    def set_cb(self, *args):
+        self.num_cb += 1
+
+    def set_done(self, event_var, b_upd):
+        """
+        event handled
+        :param event_var:
+        :param b_upd: state has changed
+        """
+        d_time = time.perf_counter()
+        with self.lock:
+            a_inj = self.d_inj.pop(id(event_var), None)
+            if a_inj is None:
+                return
+            self.d_lat[a_inj[1]].append(d_time - a_inj[0])
+            if not b_upd:
+                self.num_coal += 1
+
+    def run(self):
+        """
+        run event storm
+        :return: report (see get_report_str)
+        """
+        d_head = self.get_head()
+        mc = StressCoSoCoW(d_head, self)
+        try:
+            mc.household.set_group_state(self.get_group_xml())
+            mc.start()['topology'].result()
+            for ev_call in vars(mc).values():
+                if isinstance(ev_call, EventCall):
+                    ev_call.append(self.set_cb)
+            d_srv = dict((num_srv, str_srv) for num_srv, str_srv, str_name, str_fn in mc.A_ZONE_EV)
+            a_sub = [[getattr(z_rep, d_srv[num_srv]) for num_srv in (1, 2, 4)] for a_z in mc.household.a_zone
+                     for z_rep in a_z[:1]]
+            d_time_wait = time.time() + 10.0
+            while any(srv.sub is None for a_srv in a_sub for srv in a_srv):
+                if time.time() > d_time_wait:
+                    raise TimeoutError('stress bench: zones not subscribed')
+                time.sleep(0.05)
+
+            a_type = list(self.d_mix)
+            a_share = [self.d_mix[str_type] for str_type in a_type]
+            num_backlog_max = 0
+            d_mem_start = self.get_mem_rss()
+            d_cpu_start = time.process_time()
+            d_start = time.perf_counter()
+            num_total = int(self.d_rate * self.d_duration)
+            while self.num_inj < num_total:
+                num_due = min(num_total, int((time.perf_counter() - d_start) * self.d_rate) + 1)
+                while self.num_inj < num_due:
+                    str_type = self.rnd.choices(a_type, a_share)[0]
+                    idx_zone, event_var = self.get_event(str_type, self.num_inj)
+                    if str_type == 'Zone':
+                        mc.household.set_group_state(event_var['zone_group_state'])
+                    srv = a_sub[idx_zone][(1, 2, 4).index(self.D_SRV[str_type])]
+                    with self.lock:
+                        self.d_inj[id(event_var)] = [time.perf_counter(), str_type]
+                    srv.sub.put(event_var)
+                    mc.ev_wake.set()
+                    self.num_inj += 1
+                num_backlog_max = max(num_backlog_max, len(self.d_inj))
+                time.sleep(0.001)
+            d_inj = time.perf_counter() - d_start
+            d_time_drain = time.perf_counter() + self.d_drain
+            while self.d_inj and time.perf_counter() < d_time_drain:
+                time.sleep(0.01)
+            d_wall = time.perf_counter() - d_start
+            d_cpu = time.process_time() - d_cpu_start
+            d_mem = self.get_mem_rss()
+        finally:
+            mc.close()
+
+        a_lat = sorted(d_lat for a_lat_type in self.d_lat.values() for d_lat in a_lat_type)
+        num_done = len(a_lat)
+        num_drop = self.num_inj - num_done
+        d_res = {'num_zones': self.num_zones,
+                 'd_grp_size': dict(collections.Counter(len(a_grp) for a_grp in self.a_grp)),
+                 'd_rate': self.d_rate, 'd_rate_real': self.num_inj / d_inj if d_inj > 0 else 0.0,
+                 'num_inj': self.num_inj, 'num_done': num_done, 'num_drop': num_drop, 'num_coal': self.num_coal,
+                 'num_cb': self.num_cb,
+                 'p50_ms': self.get_pct(a_lat, 50) * 1e3, 'p90_ms': self.get_pct(a_lat, 90) * 1e3,
+                 'p99_ms': self.get_pct(a_lat, 99) * 1e3, 'max_ms': (a_lat[-1] if a_lat else 0.0) * 1e3,
+                 'drop_pct': 100.0 * num_drop / max(1, self.num_inj),
+                 'coal_pct': 100.0 * self.num_coal / max(1, num_done),
+                 'cpu_pct': 100.0 * d_cpu / d_wall, 'backlog_max': num_backlog_max,
+                 'mem_mb': None if d_mem is None else d_mem - d_mem_start,
+                 'd_type': dict((str_type, {'num': len(a_lat_type),
+                                            'p50_ms': self.get_pct(sorted(a_lat_type), 50) * 1e3,
+                                            'p99_ms': self.get_pct(sorted(a_lat_type), 99) * 1e3})
+                                for str_type, a_lat_type in self.d_lat.items())}
+        d_res['slo'] = [[str_key, d_res[str_key], d_limit, d_res[str_key] is None or d_res[str_key] <= d_limit]
+                        for str_key, d_limit in sorted(self.d_slo.items())]
+        d_res['b_pass'] = all(a_slo[3] for a_slo in d_res['slo'])
+        return d_res
+
+    @staticmethod
+    def get_pct(a_sorted, d_pct):
+        """
+        get percentile of sorted values
+        :param a_sorted:
+        :param d_pct: percentile [%]
+        :return: 0.0 if no values
+        """
+        if not a_sorted:
+            return 0.0
+        return a_sorted[min(len(a_sorted) - 1, int(round(d_pct / 100.0 * (len(a_sorted) - 1))))]
+
+    @staticmethod
+    def get_mem_rss():
+        """
+        get peak resident memory of process [MB]
+        :return: None if not available (resource module is not on windows)
+        """
+        try:
+            import resource
+        except ImportError:
+            return None
+        num_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return num_rss / 1048576.0 if sys.platform == 'darwin' else num_rss / 1024.0  # byte on macOS, else kB
+
+    @classmethod
+    def get_sweep(cls, a_rate, **kwargs):
+        """
+        run event storms with increasing rate
+        :param a_rate: events per second
+        :param kwargs: see __init__
+        :return: reports, highest rate within the SLOs (None: no rate)
+        """
+        a_res = []
+        d_rate_ok = None
+        for d_rate in a_rate:
+            d_res = cls(d_rate=d_rate, **kwargs).run()
+            a_res.append(d_res)
+            if d_res['b_pass']:
+                d_rate_ok = d_rate
+        return a_res, d_rate_ok
+
+    @staticmethod
+    def get_report_str(d_res):
+        """
+        get report as text
+        :param d_res: report of run
+        :return:
+        """
+        str_grp = ' '.join('{0}x{1}'.format(num_size, num_cnt)
+                           for num_size, num_cnt in sorted(d_res['d_grp_size'].items()))
+        str_mem = '-' if d_res['mem_mb'] is None else '+{0:.1f} MB'.format(d_res['mem_mb'])
+        a_line = ['zones {0}, groups (size x count) {1}, rate {2:.0f}/s (real {3:.0f}/s)'.format(
+                      d_res['num_zones'], str_grp, d_res['d_rate'], d_res['d_rate_real']),
+                  'events {0}, handled {1}, dropped {2}, coalesced {3}, callbacks {4}'.format(
+                      d_res['num_inj'], d_res['num_done'], d_res['num_drop'], d_res['num_coal'], d_res['num_cb']),
+                  'latency p50 {0:.1f} ms, p90 {1:.1f} ms, p99 {2:.1f} ms, max {3:.1f} ms, backlog max {4}, '
+                  'cpu {5:.0f}%, mem {6}'.format(d_res['p50_ms'], d_res['p90_ms'], d_res['p99_ms'], d_res['max_ms'],
+                                                 d_res['backlog_max'], d_res['cpu_pct'], str_mem)]
+        for str_type, d_type in sorted(d_res['d_type'].items()):
+            a_line.append('  {0:6s} {1:6d} events, p50 {2:.1f} ms, p99 {3:.1f} ms'.format(
+                str_type, d_type['num'], d_type['p50_ms'], d_type['p99_ms']))
+        for str_key, value, d_limit, b_ok in d_res['slo']:
+            a_line.append('  SLO {0:9s} {1:>9s} <= {2:<9g} {3}'.format(
+                str_key, '-' if value is None else '{0:.2f}'.format(value), d_limit, 'ok' if b_ok else 'FAIL'))
+        a_line.append('PASS' if d_res['b_pass'] else 'FAIL')
+        return '\n'.join(a_line)
+
+
+class StateStream(object):
+    """
+    push stream of household state: snapshot followed by small deltas with sequence numbers
+
+    Encoding: one json object per line.
+    snapshot: {"t": "snap", "seq": 12, "zones": 3, "s": {"volume": [20, 31, 5], ...}}
+    delta:    {"t": "delta", "seq": 15, "d": [[idx_zone, "volume", 22], ...]}
+    A client sends {"seq": n} (last received) or {} after connect. Changes of a lagging client are coalesced.
+    """
+    D_FIELD = collections.OrderedDict([
+        ('zone_name', 'a_zone_name'), ('zone_avail', 'a_zone_avail'), ('group_co', 'a_group_co'),
+        ('group_members', 'a_groups'),
+        ('volume', 'a_volume'), ('group_volume', 'a_group_volume'), ('balance', 'a_balance'),
+        ('play_track', 'a_play_track'), ('play_track_sub', 'a_play_track_sub'),
+        ('play_track_idx', 'a_play_track_idx'), ('play_mode', 'a_play_mode'),
+        ('trans_state', 'a_play_trans_state'), ('trans_status', 'a_play_trans_status'),
+        ('play_state', 'a_play_state'), ('play_art', 'a_play_art_uri'), ('queue_size', 'a_play_queue_size')])
+
+    def __init__(self, mc, num_hist=4096):
+        """
+
+        :param mc: CoSoCoW object
+        :param num_hist: number of deltas kept to resume clients
+        """
+        self.mc = mc
+        self.lock = threading.Lock()
+        self.num_seq = 0
+        self.q_hist = collections.deque(maxlen=num_hist)
+        self.d_state = {}
+        self.a_client = []
+        self.server = None
+
+    def set_upd(self, idx_zone, str_field, value):
+        """
+        add state change
+        :param idx_zone:
+        :param str_field:
+        :param value:
+        """
+        if str_field not in self.D_FIELD:
+            return
+        key = (idx_zone, str_field)
+        with self.lock:
+            if key in self.d_state and self.d_state[key] == value:
+                return
+            self.d_state[key] = value
+            self.num_seq = self.num_seq + 1
+            self.q_hist.append((self.num_seq, idx_zone, str_field, value))
+            for client in self.a_client:
+                client.set_delta(self.num_seq, key, value)
+
+    def get_snapshot_msg(self):
+        """
+        get snapshot message (lock must be held)
+        :return:
+        """
+        d_snap = {}
+        for str_field, str_attr in self.D_FIELD.items():
+            d_snap[str_field] = [list(value) if isinstance(value, list) else value
+                                 for value in getattr(self.mc, str_attr)]
+        return {'t': 'snap', 'seq': self.num_seq, 'zones': len(self.mc.a_zone_soco), 's': d_snap}
+
+    def get_delta_msg(self, num_seq):
+        """
+        get coalesced deltas since sequence number (lock must be held)
+        :param num_seq:
+        :return: message or None if deltas are not available anymore
+        """
+        if num_seq is None or num_seq > self.num_seq:
+            return None
+        if num_seq < self.num_seq and (len(self.q_hist) == 0 or self.q_hist[0][0] > num_seq + 1):
+            return None
+        d_delta = collections.OrderedDict()
+        for num_seq_d, idx_zone, str_field, value in self.q_hist:
+            if num_seq_d > num_seq:
+                d_delta.pop((idx_zone, str_field), None)
+                d_delta[(idx_zone, str_field)] = value
+        return {'t': 'delta', 'seq': self.num_seq, 'd': [[k[0], k[1], v] for k, v in d_delta.items()]}
+
+    def get_since_msg(self, num_seq=None):
+        """
+        get deltas since sequence number or snapshot if deltas are not available
+        :param num_seq:
+        :return:
+        """
+        with self.lock:
+            d_msg = self.get_delta_msg(num_seq)
+            if d_msg is None:
+                d_msg = self.get_snapshot_msg()
+            return d_msg
+
+    def set_reset(self):
+        """
+        restart stream with new snapshot (e.g. zone set changed, zone indices are not valid anymore)
+        """
+        with self.lock:
+            self.d_state = {}
+            self.q_hist.clear()
+            self.num_seq = self.num_seq + 1
+            d_msg = self.get_snapshot_msg()
+            for client in self.a_client:
+                client.set_first(d_msg)
+
+    def add_client(self, client, num_seq=None):
+        """
+        add client, first message is queued without gap to following deltas
+        :param client: StateStreamConn object
+        :param num_seq: last received sequence number of client
+        """
+        with self.lock:
+            d_msg = self.get_delta_msg(num_seq)
+            if d_msg is None:
+                d_msg = self.get_snapshot_msg()
+            client.set_first(d_msg)
+            self.a_client.append(client)
+
+    def rem_client(self, client):
+        with self.lock:
+            if client in self.a_client:
+                self.a_client.remove(client)
+
+    def serve(self, str_host='127.0.0.1', num_port=1401):
+        """
+        serve stream clients over tcp in background
+        :param str_host: address to listen on, '': all interfaces (no authentication)
+        :param num_port:
+        """
+        stream = self
+
+        class StreamHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stream.set_conn(self)
+
+        self.server = StateStreamServer((str_host, num_port), StreamHandler)
+        th_server = threading.Thread(target=self.server.serve_forever, name='CoSoCoW-StateStream')
+        th_server.daemon = True
+        th_server.start()
+        self.mc.add_trace('main', 1, ' :s state stream on port %s', self.server.server_address[1])
+
+    def set_conn(self, handler):
+        """
+        serve one stream client (handler thread)
+        :param handler:
+        """
+        try:
+            d_hello = json.loads(handler.rfile.readline().decode('utf-8') or '{}')
+        except ValueError:
+            d_hello = {}
+        client = StateStreamConn(handler.wfile)
+        self.add_client(client, d_hello.get('seq'))
+        try:
+            client.run()
+        finally:
+            self.rem_client(client)
+
+    def get_stat(self):
+        with self.lock:
+            return {'seq': self.num_seq, 'num_hist': len(self.q_hist), 'num_client': len(self.a_client),
+                    'num_coalesced': sum(client.num_coalesced for client in self.a_client)}
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self.lock:
+            for client in self.a_client:
+                client.close()
+            self.a_client = []
+
+
+class StateStreamServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class StateStreamConn(object):
+    """
+    client connection of state stream, pending changes are coalesced per zone and field
+    """
+
+    def __init__(self, f_write):
+        self.f_write = f_write
+        self.cond = threading.Condition()
+        self.d_first = None
+        self.d_pend = collections.OrderedDict()
+        self.num_seq = 0
+        self.num_coalesced = 0
+        self.b_open = True
+
+    def set_first(self, d_msg):
+        with self.cond:
+            self.d_first = d_msg
+            self.d_pend = collections.OrderedDict()
+            self.num_seq = d_msg['seq']
+            self.cond.notify()
+
+    def set_delta(self, num_seq, key, value):
+        with self.cond:
+            if key in self.d_pend:
+                del self.d_pend[key]
+                self.num_coalesced = self.num_coalesced + 1
+            self.d_pend[key] = value
+            self.num_seq = num_seq
+            self.cond.notify()
+
+    def run(self):
+        """
+        writer loop: sends all pending changes as one delta message
+        """
+        while True:
+            with self.cond:
+                while self.b_open and self.d_first is None and len(self.d_pend) == 0:
+                    self.cond.wait()
+                if not self.b_open:
+                    return
+                if self.d_first is not None:
+                    d_msg = self.d_first
+                    self.d_first = None
+                else:
+                    d_msg = {'t': 'delta', 'seq': self.num_seq,
+                             'd': [[key[0], key[1], value] for key, value in self.d_pend.items()]}
+                    self.d_pend = collections.OrderedDict()
+            try:
+                self.f_write.write(json.dumps(d_msg, separators=(',', ':'), default=str).encode('utf-8') + b'\n')
+                self.f_write.flush()
+            except (IOError, OSError, ValueError):
+                return
+
+    def close(self):
+        with self.cond:
+            self.b_open = False
+            self.cond.notify()
+
+
+class StateStreamClient(object):
+    """
+    client of state stream: keeps mirror of household state and resumes after reconnect
+    """
+
+    def __init__(self, str_host, num_port=1401, d_retry=2.0):
+        """
+
+        :param str_host:
+        :param num_port:
+        :param d_retry: time between reconnects [sec]
+        """
+        self.str_host = str_host
+        self.num_port = num_port
+        self.d_retry = d_retry
+        self.num_seq = None
+        self.d_state = {}
+        self.sock = None
+        self.b_actv = True
+        self.ev_snapshot = EventCall(None)
+        self.ev_state = EventCall(0, 1)  # kind: state field
+        self.th_read = threading.Thread(target=self.run, name='CoSoCoW-StreamClient')
+        self.th_read.daemon = True
+        self.th_read.start()
+
+    def run(self):
+        while self.b_actv:
+            try:
+                self.sock = socket.create_connection((self.str_host, self.num_port))
+                d_hello = {} if self.num_seq is None else {'seq': self.num_seq}
+                self.sock.sendall(json.dumps(d_hello).encode('utf-8') + b'\n')
+                for str_line in self.sock.makefile('rb'):
+                    self.set_msg(json.loads(str_line.decode('utf-8')))
+            except (IOError, OSError, ValueError):
+                pass
+            if self.b_actv:
+                time.sleep(self.d_retry)
+
+    def set_msg(self, d_msg):
+        """
+        apply snapshot or delta message
+        :param d_msg:
+        """
+        if d_msg['t'] == 'snap':
+            self.d_state = d_msg['s']
+            self.ev_snapshot(self.d_state)
+        else:
+            for idx_zone, str_field, value in d_msg['d']:
+                a_val = self.d_state.setdefault(str_field, [])
+                if idx_zone >= len(a_val):
+                    a_val.extend([None] * (idx_zone + 1 - len(a_val)))
+                a_val[idx_zone] = value
+                self.ev_state(idx_zone, str_field, value)
+        self.num_seq = d_msg['seq']
+
+    def close(self):
+        self.b_actv = False
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except (IOError, OSError):
+                pass
+            self.sock.close()
+
+
+class StateShm(object):
+    """
+    export of household state into a shared memory file for readers in other processes (see StateShmReader)
+
+    Layout (little endian, version 2):
+    header, 64 bytes:
+        0  4s  magic b'CSCW'            4  H  version          6  H  header size     8  H  zone record size
+        10 H   reserved                 12 I  max. zones       16 I  zones           20 I  offset of string table
+        24 I   size of string table     28 I  used bytes of string table
+        32 Q   generation (odd: reset or compaction in progress, string references are not valid)
+        40 Q   sequence number of last change             48 d  time of last change (unix time)
+        56 I   pid of writer (0: writer closed)           60 I  reserved
+    zone records, 80 bytes each, from offset 64:
+        0  Q   seqlock (odd: write in progress)           8  Q  sequence number of last change of zone
+        16 f   volume     20 f  group volume     24 f  balance     28 i  track index     32 i  queue size
+        36 h   index of group coordinator (-1: none)     38 B  zone available
+        39 B   transport state (index of A_TRANS_STATE)  40 B  play mode (index of A_PLAY_MODE)
+        44 6I  string references: zone name, track, track sub, transport status, play state, album art uri
+        68 3I  string references of update ids (content directory): queue, favorites, share list (music db)
+    string table: entries of 4 byte length and utf-8 bytes, aligned to 4 bytes; reference: offset of entry,
+        reference 0 is the empty string. Entries are immutable, the table is compacted (generation bumped) when full.
+
+    Writer: one process, changes are written under the seqlock of the zone record. Seqlock, generation and
+    sequence number are written by single aligned 8 byte stores (struct.pack_into zero fills its target first).
+    The file is replaced (not truncated) on restart, so readers of the old file see pid 0 and open the new one.
+    """
+    STR_MAGIC = b'CSCW'
+    NUM_VERSION = 2
+    ST_HEAD = struct.Struct('<4sHHHHIIIIIQQdII')
+    ST_ZONE = struct.Struct('<QQfffiihBBB3xIIIIIIIII')
+    ST_ZONE_BODY = struct.Struct('<QfffiihBBB3xIIIIIIIII')  # zone record without seqlock
+    ST_SEQ = struct.Struct('<Q')
+    ST_STR_LEN = struct.Struct('<I')
+    OFF_HEAD_ZONES = 16
+    OFF_HEAD_USED = 28
+    OFF_HEAD_GEN = 32
+    OFF_HEAD_SEQ = 40
+    OFF_HEAD_TIME = 48
+    OFF_HEAD_PID = 56
+    A_TRANS_STATE = ('', 'STOPPED', 'PLAYING', 'PAUSED_PLAYBACK', 'TRANSITIONING', 'NO_MEDIA_PRESENT')
+    A_PLAY_MODE = ('', 'NORMAL', 'REPEAT_ALL', 'REPEAT_ONE', 'SHUFFLE_NOREPEAT', 'SHUFFLE', 'SHUFFLE_REPEAT_ONE')
+    # state field (set_state_upd) -> attribute of CoSoCoW, in order of zone record (after the sequence numbers)
+    D_FIELD = collections.OrderedDict([
+        ('volume', 'a_volume'), ('group_volume', 'a_group_volume'), ('balance', 'a_balance'),
+        ('play_track_idx', 'a_play_track_idx'), ('queue_size', 'a_play_queue_size'), ('group_co', 'a_group_co'),
+        ('zone_avail', 'a_zone_avail'), ('trans_state', 'a_play_trans_state'), ('play_mode', 'a_play_mode'),
+        ('zone_name', 'a_zone_name'), ('play_track', 'a_play_track'), ('play_track_sub', 'a_play_track_sub'),
+        ('trans_status', 'a_play_trans_status'), ('play_state', 'a_play_state'), ('play_art', 'a_play_art_uri'),
+        ('queue_upd_id', 'a_queue_upd_idnew'), ('fav_upd_id', 'a_radio_fav_upd_idnew'),
+        ('share_upd_id', 'a_mudb_upd_idnew')])
+    D_FIELD_IDX = dict((str_field, idx_field) for idx_field, str_field in enumerate(D_FIELD))
+    A_STR_FIELD = ('zone_name', 'play_track', 'play_track_sub', 'trans_status', 'play_state', 'play_art',
+                   'queue_upd_id', 'fav_upd_id', 'share_upd_id')
+    NUM_STR_MAX = 1024  # max. bytes of one string
+
+    def __init__(self, mc, str_file=None, num_zones_max=64, num_str_size=256 * 1024, num_mode=0o600):
+        """
+
+        :param mc: CoSoCoW object
+        :param str_file: file of shared memory, None: cosocow_state-<uid> in /dev/shm (temp directory if not available)
+        :param num_zones_max: number of zone records, zones beyond are not exported
+        :param num_str_size: size of string table [bytes]
+        :param num_mode: file permissions (0o600: readers of same user only, 0o644: all users)
+        """
+        self.mc = mc
+        self.str_file = str_file if str_file is not None else self.get_file_def()
+        self.num_zones_max = num_zones_max
+        self.num_str_off = self.ST_HEAD.size + num_zones_max * self.ST_ZONE.size
+        self.num_str_size = (num_str_size + 7) // 8 * 8
+        self.lock = threading.Lock()
+        self.num_gen = 0
+        self.num_seq = 0
+        self.num_zones = 0
+        self.a_rec = []
+        self.a_rec_seq = []
+        self.d_str_ref = {'': 0}
+        self.num_str_used = self.ST_STR_LEN.size  # entry of empty string
+        self.num_compact = 0
+
+        # new file replaces old one atomically, readers of the old mapping are not hit by truncation
+        num_size = self.num_str_off + self.num_str_size
+        fd, str_tmp = tempfile.mkstemp(prefix='.cosocow_state', dir=os.path.dirname(os.path.abspath(self.str_file)))
+        try:
+            os.ftruncate(fd, num_size)
+            self.num_ino = os.fstat(fd).st_ino
+            self.mm = mmap.mmap(fd, num_size)
+        finally:
+            os.close(fd)
+        self.mv_q = memoryview(self.mm).cast('Q')
+        self.ST_HEAD.pack_into(self.mm, 0, self.STR_MAGIC, self.NUM_VERSION, self.ST_HEAD.size, self.ST_ZONE.size,
+                               0, num_zones_max, 0, self.num_str_off, self.num_str_size, self.num_str_used, 1, 0,
+                               time.time(), os.getpid(), 0)
+        os.chmod(str_tmp, num_mode)
+        os.replace(str_tmp, self.str_file)
+        self.set_reset()
+
+    @staticmethod
+    def get_file_def():
+        """
+        get default file of shared memory (one per user, as the socket of the daemon)
+        :return:
+        """
+        str_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return os.path.join(str_dir, 'cosocow_state-%d' % os.getuid())
+
+    def get_rec(self, idx_zone):
+        """
+        get values of zone record from state of CoSoCoW
+        :param idx_zone:
+        :return:
+        """
+        a_rec = []
+        for str_field, str_attr in self.D_FIELD.items():
+            a_val = getattr(self.mc, str_attr)
+            a_rec.append(a_val[idx_zone] if idx_zone < len(a_val) else None)
+        return a_rec
+
+    def get_num(self, str_field, value):
+        """
+        get number of zone record field
+        :param str_field:
+        :param value: state value
+        :return:
+        """
+        if str_field == 'trans_state':
+            return self.A_TRANS_STATE.index(value) if value in self.A_TRANS_STATE else 0
+        elif str_field == 'play_mode':
+            return self.A_PLAY_MODE.index(value) if value in self.A_PLAY_MODE else 0
+        elif str_field == 'group_co':
+            return -1 if value is None else value
+        elif str_field == 'zone_avail':
+            return 1 if value else 0
+        elif str_field in ('play_track_idx', 'queue_size'):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return -1
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return -1.0
+
+    def get_str_ref(self, value):
+        """
+        get reference of interned string, add string to table (lock must be held)
+        :param value:
+        :return: reference or None if string table is full
+        """
+        if value is None or value == 0:
+            str_val = ''
+        else:
+            str_val = str(value)
+        num_ref = self.d_str_ref.get(str_val)
+        if num_ref is None:
+            by_val = str_val.encode('utf-8')[:self.NUM_STR_MAX]
+            num_len = self.ST_STR_LEN.size + (len(by_val) + 3) // 4 * 4
+            if self.num_str_used + num_len > self.num_str_size:
+                return None
+            num_ref = self.num_str_used
+            num_off = self.num_str_off + num_ref
+            self.ST_STR_LEN.pack_into(self.mm, num_off, len(by_val))
+            self.mm[num_off + self.ST_STR_LEN.size:num_off + self.ST_STR_LEN.size + len(by_val)] = by_val
+            self.num_str_used = self.num_str_used + num_len
+            self.d_str_ref[str_val] = num_ref
+        return num_ref
+
+    def set_zone_rec(self, idx_zone):
+        """
+        write zone record under its seqlock (lock must be held)
+        :param idx_zone:
+        :return: False if string table is full
+        """
+        a_num = []
+        for str_field, value in zip(self.D_FIELD, self.a_rec[idx_zone]):
+            if str_field in self.A_STR_FIELD:
+                num_ref = self.get_str_ref(value)
+                if num_ref is None:
+                    return False
+                a_num.append(num_ref)
+            else:
+                a_num.append(self.get_num(str_field, value))
+        num_off = self.ST_HEAD.size + idx_zone * self.ST_ZONE.size
+        num_lock = self.a_rec_seq[idx_zone] + 1
+        self.mv_q[num_off // 8] = num_lock
+        self.ST_ZONE_BODY.pack_into(self.mm, num_off + 8, self.num_seq, *a_num)
+        self.mv_q[num_off // 8] = num_lock + 1
+        self.a_rec_seq[idx_zone] = num_lock + 1
+        return True
+
+    def set_gen(self):
+        """
+        open generation change: reset or compaction of string table, closed by set_head (lock must be held)
+        """
+        self.num_gen = self.num_gen + 1
+        self.mv_q[self.OFF_HEAD_GEN // 8] = self.num_gen
+
+    def set_head(self):
+        """
+        write header after change, closes open generation change (lock must be held)
+        """
+        if self.num_gen % 2 == 1:
+            self.ST_STR_LEN.pack_into(self.mm, self.OFF_HEAD_ZONES, self.num_zones)
+            self.num_gen = self.num_gen + 1
+            self.mv_q[self.OFF_HEAD_GEN // 8] = self.num_gen
+        self.ST_STR_LEN.pack_into(self.mm, self.OFF_HEAD_USED, self.num_str_used)
+        struct.pack_into('<d', self.mm, self.OFF_HEAD_TIME, time.time())
+        self.mv_q[self.OFF_HEAD_SEQ // 8] = self.num_seq
+
+    def set_str_compact(self):
+        """
+        rebuild string table with strings of current zone records (lock must be held, generation open)
+        """
+        self.d_str_ref = {'': 0}
+        self.num_str_used = self.ST_STR_LEN.size
+        self.num_compact = self.num_compact + 1
+        for idx_zone in range(self.num_zones):
+            if not self.set_zone_rec(idx_zone):
+                # strings of this zone do not fit anymore: export empty strings
+                for idx_str, str_field in enumerate(self.D_FIELD):
+                    if str_field in self.A_STR_FIELD:
+                        self.a_rec[idx_zone][idx_str] = None
+                self.set_zone_rec(idx_zone)
+                self.mc.add_trace('main', 0, ' :e state shm: string table too small (%s bytes)', self.num_str_size)
+
+    def set_reset(self):
+        """
+        rewrite all zone records (e.g. zone set changed, zone indices are not valid anymore)
+        """
+        with self.lock:
+            if self.mm is None:
+                return
+            self.set_gen()
+            self.num_seq = self.num_seq + 1
+            self.num_zones = min(len(self.mc.a_zone_soco), self.num_zones_max)
+            self.a_rec = [self.get_rec(idx_zone) for idx_zone in range(self.num_zones)]
+            self.a_rec_seq.extend([0] * (self.num_zones - len(self.a_rec_seq)))
+            self.set_str_compact()
+            self.set_head()
+
+    def set_upd(self, idx_zone, str_field, value):
+        """
+        add state change
+        :param idx_zone:
+        :param str_field:
+        :param value:
+        """
+        if str_field not in self.D_FIELD or idx_zone >= self.num_zones:
+            return
+        idx_field = self.D_FIELD_IDX[str_field]
+        with self.lock:
+            if self.mm is None or self.a_rec[idx_zone][idx_field] == value:
+                return
+            self.a_rec[idx_zone][idx_field] = value
+            self.num_seq = self.num_seq + 1
+            if not self.set_zone_rec(idx_zone):
+                self.set_gen()
+                self.set_str_compact()
+            self.set_head()
+
+    def get_stat(self):
+        with self.lock:
+            return {'file': self.str_file, 'seq': self.num_seq, 'gen': self.num_gen, 'zones': self.num_zones,
+                    'str_used': self.num_str_used, 'str_size': self.num_str_size, 'num_compact': self.num_compact}
+
+    def close(self):
+        """
+        mark writer closed (pid 0) and remove file, readers keep their mapping
+        """
+        with self.lock:
+            if self.mm is None:
+                return
+            self.ST_STR_LEN.pack_into(self.mm, self.OFF_HEAD_PID, 0)
+            self.mv_q.release()
+            self.mm.close()
+            self.mm = None
+        try:
+            if os.stat(self.str_file).st_ino == self.num_ino:  # not replaced by another writer
+                os.remove(self.str_file)
+        except OSError:
+            pass
+
+
+class StateShmReader(object):
+    """
+    reader of household state exported by StateShm (other process, no CoSoCoW object needed)
+
+    Reads go to the mapping only (no system calls); a reader retries while the writer changes a record,
+    after NUM_SPIN attempts it yields the cpu between attempts.
+    """
+    NUM_SPIN = 100
+
+    def __init__(self, str_file=None, num_retry=100000):
+        """
+
+        :param str_file: file of shared memory, None: default file of StateShm
+        :param num_retry: number of read attempts before ConnectionError (writer hangs in write)
+        """
+        self.str_file = str_file if str_file is not None else StateShm.get_file_def()
+        self.num_retry = num_retry
+        self.mm = None
+        self.mv = None
+        self.d_str = {}
+        self.num_str_gen = -1
+        self.open()
+
+    def open(self):
+        """
+        map current file of writer (e.g. after restart of writer)
+        """
+        self.close()
+        with open(self.str_file, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mv = memoryview(self.mm)
+        a_head = StateShm.ST_HEAD.unpack_from(self.mv, 0)
+        if a_head[0] != StateShm.STR_MAGIC or a_head[1] != StateShm.NUM_VERSION:
+            self.close()
+            raise ValueError('no CoSoCoW state file (version {0}): {1}'.format(StateShm.NUM_VERSION, self.str_file))
+        self.num_zone_off = a_head[2]
+        self.num_zone_size = a_head[3]
+        self.num_zones_max = a_head[5]
+        self.num_str_off = a_head[7]
+        self.d_str = {}
+        self.num_str_gen = -1
+
+    def get_seq(self):
+        """
+        get sequence number of last change (cheap check for changes)
+        :return:
+        """
+        return StateShm.ST_SEQ.unpack_from(self.mv, StateShm.OFF_HEAD_SEQ)[0]
+
+    def chk_live(self):
+        """
+        check if writer is running (pid of writer set)
+        :return:
+        """
+        return StateShm.ST_STR_LEN.unpack_from(self.mv, StateShm.OFF_HEAD_PID)[0] != 0
+
+    def set_wait(self, idx_try):
+        """
+        wait before next read attempt
+        :param idx_try: number of failed attempts
+        """
+        if idx_try >= self.NUM_SPIN:
+            time.sleep(0)
+
+    def get_str(self, num_ref, num_gen):
+        """
+        get string of string table
+        :param num_ref: reference
+        :param num_gen: generation the reference was read in
+        :return:
+        """
+        if num_gen != self.num_str_gen:
+            self.d_str = {}
+            self.num_str_gen = num_gen
+        str_val = self.d_str.get(num_ref)
+        if str_val is None:
+            num_off = self.num_str_off + num_ref
+            num_len = StateShm.ST_STR_LEN.unpack_from(self.mv, num_off)[0]
+            num_off = num_off + StateShm.ST_STR_LEN.size
+            str_val = bytes(self.mv[num_off:num_off + min(num_len, StateShm.NUM_STR_MAX)]).decode('utf-8', 'replace')
+            self.d_str[num_ref] = str_val
+        return str_val
+
+    def get_zone_rec(self, idx_zone):
+        """
+        get consistent raw zone record
+        :param idx_zone:
+        :return: tuple of ST_ZONE (strings as references)
+        """
+        num_off = self.num_zone_off + idx_zone * self.num_zone_size
+        for idx_try in range(self.num_retry):
+            a_rec = StateShm.ST_ZONE.unpack_from(self.mv, num_off)
+            if a_rec[0] % 2 == 0 and StateShm.ST_SEQ.unpack_from(self.mv, num_off)[0] == a_rec[0]:
+                return a_rec
+            self.set_wait(idx_try)
+        raise ConnectionError('state record of zone {0} not consistent'.format(idx_zone))
+
+    def get_zone_dict(self, a_rec, num_gen):
+        d_zone = {'seq': a_rec[1]}
+        for str_field, value in zip(StateShm.D_FIELD, a_rec[2:]):
+            if str_field in StateShm.A_STR_FIELD:
+                value = self.get_str(value, num_gen)
+            elif str_field == 'trans_state':
+                value = StateShm.A_TRANS_STATE[value] if value < len(StateShm.A_TRANS_STATE) else ''
+            elif str_field == 'play_mode':
+                value = StateShm.A_PLAY_MODE[value] if value < len(StateShm.A_PLAY_MODE) else ''
+            elif str_field == 'group_co':
+                value = None if value < 0 else value
+            elif str_field == 'zone_avail':
+                value = value != 0
+            elif str_field in ('volume', 'group_volume', 'balance'):
+                value = int(value) if value.is_integer() else value
+            d_zone[str_field] = value
+        return d_zone
+
+    def get_zone(self, idx_zone):
+        """
+        get state of one zone
+        :param idx_zone:
+        :return: dict of state fields (see StateShm.D_FIELD) and sequence number of last change ('seq')
+        """
+        for idx_try in range(self.num_retry):
+            num_gen = StateShm.ST_SEQ.unpack_from(self.mv, StateShm.OFF_HEAD_GEN)[0]
+            if num_gen % 2 == 0:
+                a_rec = self.get_zone_rec(idx_zone)
+                d_zone = self.get_zone_dict(a_rec, num_gen)
+                if StateShm.ST_SEQ.unpack_from(self.mv, StateShm.OFF_HEAD_GEN)[0] == num_gen:
+                    return d_zone
+            self.set_wait(idx_try)
+        raise ConnectionError('state of zone {0} not consistent'.format(idx_zone))
+
+    def get_snapshot(self):
+        """
+        get consistent state of all zones (no change between first and last zone)
+        :return: dict: seq, zones (list of zone dicts, see get_zone), live (writer running)
+        """
+        st_seq = StateShm.ST_SEQ
+        for idx_try in range(self.num_retry):
+            num_gen = st_seq.unpack_from(self.mv, StateShm.OFF_HEAD_GEN)[0]
+            num_seq = st_seq.unpack_from(self.mv, StateShm.OFF_HEAD_SEQ)[0]
+            if num_gen % 2 == 1:
+                self.set_wait(idx_try)
+                continue
+            num_zones = StateShm.ST_HEAD.unpack_from(self.mv, 0)[6]
+            a_rec = [self.get_zone_rec(idx_zone) for idx_zone in range(num_zones)]
+            a_zone = [self.get_zone_dict(rec, num_gen) for rec in a_rec]
+            if (st_seq.unpack_from(self.mv, StateShm.OFF_HEAD_GEN)[0] == num_gen
+                    and st_seq.unpack_from(self.mv, StateShm.OFF_HEAD_SEQ)[0] == num_seq):
+                num_seq = max([num_seq] + [rec[1] for rec in a_rec])  # change in progress may be included
+                return {'seq': num_seq, 'zones': a_zone, 'live': self.chk_live()}
+            self.set_wait(idx_try)
+        raise ConnectionError('state snapshot not consistent')
+
+    def close(self):
+        if self.mv is not None:
+            self.mv.release()
+            self.mv = None
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+def main(a_argv=None):
+    """
+    command line: run CoSoCoW as daemon
+    :param a_argv:
+    """
+    parser = argparse.ArgumentParser(description='CoSoCoW - Command line Sonos Control Wrapper')
+    parser.add_argument('--daemon', action='store_true', help='run as daemon with local socket')
+    parser.add_argument('--sock', default=None, help='socket file of the daemon')
+    parser.add_argument('--stream-port', type=int, default=None, help='tcp port of state push stream')
+    parser.add_argument('--stream-host', default='127.0.0.1',
+                        help='address of state push stream (\'\': all interfaces, no authentication)')
+    parser.add_argument('--state-shm', nargs='?', const='', default=None,
+                        help='export state to shared memory file (no file: /dev/shm/cosocow_state-<uid>)')
+    parser.add_argument('--discover', action='store_true', help='find zones by SSDP')
+    parser.add_argument('--ev-fast', action='store_true', help='lean event decoder')
+    parser.add_argument('--bench-ev', action='store_true', help='benchmark event decoders and exit')
+    parser.add_argument('--bench-stress', action='store_true', help='event storm benchmark on synthetic zones, '
+                                                                     'exit code 1 if an SLO is missed')
+    parser.add_argument('--stress-zones', type=int, default=10, help='number of synthetic zones')
+    parser.add_argument('--stress-rate', default='100', help='events per second, list for sweep (e.g. 50,100,200)')
+    parser.add_argument('--stress-time', type=float, default=10.0, help='time of event storm [sec]')
+    parser.add_argument('--registry', nargs='?', const='', default=None,
+                        help='persistent device registry (no file: default file in home directory)')
+    parser.add_argument('--sched', nargs='?', const='', default=None,
+                        help='action scheduler with rule file (no file: default file in home directory)')
+    parser.add_argument('--trace', type=int, default=None, help='console trace level (0: error .. 4: trace)')
+    parser.add_argument('--trace-dump', default=None, help='file of trace ring buffer dump on errors')
+    parser.add_argument('zone_ip', nargs='*', help='ip address of zone, stereo pair as ip1+ip2')
+    args = parser.parse_args(a_argv)
+
+    a_zone_ip = [] if args.discover else None
+    if len(args.zone_ip) > 0:
+        a_zone_ip = [str_ip.split('+') if '+' in str_ip else str_ip for str_ip in args.zone_ip]
+
+    if args.bench_ev:
+        for str_name, d_time in EvDecoder.get_bench().items():
+            print('{0:10s} {1:8.1f} us/event'.format(str_name, d_time))
+        return
+
+    if args.bench_stress:
+        a_res, d_rate_ok = StressBench.get_sweep([float(str_rate) for str_rate in args.stress_rate.split(',')],
+                                                 num_zones=args.stress_zones, d_duration=args.stress_time)
+        for d_res in a_res:
+            print(StressBench.get_report_str(d_res))
+        print('max. rate within SLOs: ' + ('-' if d_rate_ok is None else '{0:g}/s'.format(d_rate_ok)))
+        return 0 if all(d_res['b_pass'] for d_res in a_res) else 1
+
+    if not args.daemon:
+        parser.print_help()
+        return
+
+    mc = CoSoCoW(a_zone_ip, str_reg_file='' if args.registry is None else (args.registry or None))
+    if args.trace is not None:
+        mc.set_trace_lvl(args.trace)
+    if args.trace_dump is not None:
+        mc.set_trace_dump(args.trace_dump, b_err=True)
+    if args.ev_fast:
+        mc.set_ev_fast()
+    mc.start()
+    if args.discover:
+        mc.set_discover()
+    if args.sched is not None:
+        mc.set_sched(str_file=args.sched or None)
+    if args.stream_port is not None:
+        mc.set_state_stream(num_port=args.stream_port, str_host=args.stream_host)
+    if args.state_shm is not None:
+        mc.set_state_shm(str_file=args.state_shm or None)
+    daemon = CoSoCoWDaemon(mc, args.sock)
+    daemon.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        daemon.close()
+        mc.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
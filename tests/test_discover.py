@@ -0,0 +1,129 @@
+"""
+zone discovery by SSDP with a fake responder on the loopback interface
+"""
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import CoSoCoW
+
+STR_RESP = 'HTTP/1.1 200 OK\r\nST: urn:schemas-upnp-org:device:ZonePlayer:1\r\nSERVER: Linux UPnP/1.0 Sonos/57\r\n' \
+           'LOCATION: http://%s:1400/xml/device_description.xml\r\n\r\n'
+
+
+class SsdpResponder(object):
+    """
+    fake SSDP responder: answers each search with the current speaker list and one foreign device
+    """
+
+    def __init__(self, a_ip):
+        self.a_ip = list(a_ip)
+        self.a_search = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.num_port = self.sock.getsockname()[1]
+        self.th = threading.Thread(target=self.run)
+        self.th.daemon = True
+        self.th.start()
+
+    def run(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except OSError:
+                return
+            self.a_search.append(data.decode('ascii'))
+            for str_ip in list(self.a_ip):
+                self.sock.sendto((STR_RESP % str_ip).encode('ascii'), addr)
+            self.sock.sendto(b'HTTP/1.1 200 OK\r\nST: upnp:rootdevice\r\nSERVER: Other\r\n'
+                             b'LOCATION: http://10.9.9.9:80/\r\n\r\n', addr)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def ssdp():
+    resp = SsdpResponder(['10.0.0.1', '10.0.0.2'])
+    yield resp
+    resp.close()
+
+
+@pytest.fixture
+def mc(monkeypatch):
+    mc = CoSoCoW([], str_reg_file='')
+    # known speakers, no speaker access
+    for num in range(1, 5):
+        mc.dev_reg.set_dev('10.0.0.%d' % num, 'RINCON_%d' % num, zone_name='Z%d' % num, model_name='Play:1')
+    monkeypatch.setattr(mc, 'set_zone_cng', lambda: None)
+    yield mc
+    mc.close()
+
+
+def get_found(mc, ssdp):
+    return mc.get_discover('127.0.0.1', ssdp.num_port, 0.3)
+
+
+def test_search(mc, ssdp):
+    assert get_found(mc, ssdp) == ['10.0.0.1', '10.0.0.2']
+    assert 'ssdp:discover' in ssdp.a_search[0]
+    assert 'ZonePlayer' in ssdp.a_search[0]
+
+
+def test_add(mc, ssdp):
+    d_cng = mc.get_discover_upd(get_found(mc, ssdp))
+    assert d_cng['add'] == [(0, '10.0.0.1'), (1, '10.0.0.2')]
+    assert mc.a_zone_ip == ['10.0.0.1', '10.0.0.2']
+    assert mc.a_zone_name == ['Z1', 'Z2']
+    assert len(mc.a_volume) == 2
+
+    # known speakers are not added again
+    assert mc.get_discover_upd(get_found(mc, ssdp))['add'] == []
+
+
+def test_ip_cng(mc, ssdp, monkeypatch):
+    mc.get_discover_upd(get_found(mc, ssdp))
+
+    # speaker 2 gets a new address, found by its UUID
+    def get_dev_info(z_req, a_z_req_pair=None):
+        mc.dev_reg.set_dev(z_req.ip_address, 'RINCON_2', zone_name='Z2')
+        return 'Z2'
+    monkeypatch.setattr(mc, 'get_dev_info', get_dev_info)
+    ssdp.a_ip = ['10.0.0.1', '10.0.0.9']
+    d_cng = mc.get_discover_upd(get_found(mc, ssdp))
+    assert d_cng['ip'] == [(1, '10.0.0.9')]
+    assert d_cng['add'] == []
+    assert mc.a_zone_ip == ['10.0.0.1', '10.0.0.9']
+
+
+def test_stereo_pair(mc, ssdp):
+    mc.get_discover_upd(get_found(mc, ssdp))
+    mc.dev_reg.set_dev('10.0.0.7', 'RINCON_7', zone_name='Z2')
+    ssdp.a_ip.append('10.0.0.7')
+    d_cng = mc.get_discover_upd(get_found(mc, ssdp))
+    assert d_cng['ip'] == [(1, ['10.0.0.2', '10.0.0.7'])]
+    assert len(mc.a_zone_ip) == 2
+
+
+def test_miss(mc, ssdp):
+    d_miss = {}
+    ssdp.a_ip.append('10.0.0.3')
+    mc.get_discover_upd(get_found(mc, ssdp), d_miss)
+
+    # zone without answer is marked as not available, indices stay valid
+    ssdp.a_ip.remove('10.0.0.1')
+    for _ in range(2):
+        assert mc.get_discover_upd(get_found(mc, ssdp), d_miss, 3)['unavail'] == []
+    d_cng = mc.get_discover_upd(get_found(mc, ssdp), d_miss, 3)
+    assert d_cng['unavail'] == [(0, '10.0.0.1')]
+    assert mc.a_zone_ip == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    assert mc.a_zone_avail == [False, True, True]
+
+    # and available again with the next answer
+    ssdp.a_ip.append('10.0.0.1')
+    d_cng = mc.get_discover_upd(get_found(mc, ssdp), d_miss, 3)
+    assert d_cng['avail'] == [(0, '10.0.0.1')]
+    assert mc.a_zone_avail == [True, True, True]
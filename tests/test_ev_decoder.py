@@ -0,0 +1,105 @@
+"""
+lean event decoder against the soco event parser
+"""
+import importlib
+
+import pytest
+
+pytest.importorskip('soco')
+
+from soco.data_structures import DidlObject
+
+import cosocow
+from cosocow import EvDecoder, EvDidl
+
+
+def get_parse_soco():
+    for str_mod in EvDecoder.A_MOD:
+        try:
+            mod = importlib.import_module(str_mod)
+        except ImportError:
+            continue
+        fn_parse = getattr(mod, 'parse_event_xml', None)
+        if fn_parse is not None:
+            fn_parse = getattr(fn_parse, 'parse_orig', fn_parse)
+            return getattr(fn_parse, '__wrapped__', fn_parse)  # without cache of soco
+    pytest.skip('no soco event parser')
+
+
+def esc(str_val):
+    return str_val.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def get_prop_set(a_prop):
+    return ('<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">'
+            + ''.join('<e:property>' + str_prop + '</e:property>' for str_prop in a_prop)
+            + '</e:propertyset>').encode('utf-8')
+
+
+def get_norm(value):
+    if isinstance(value, dict):
+        return dict((key, get_norm(val)) for key, val in value.items())
+    if isinstance(value, (DidlObject, EvDidl)):
+        return 'didl', value.title, getattr(value, 'album_art_uri', ''), value.item_id
+    return value
+
+
+STR_RC = ('<Event xmlns="urn:schemas-upnp-org:metadata-1-0/RCS/"><InstanceID val="0">'
+          '<Volume channel="Master" val="25"/><Volume channel="LF" val="100"/><Volume channel="RF" val="90"/>'
+          '<Mute channel="Master" val="0"/><Bass val="0"/><PresetNameList val="FactoryDefaults"/>'
+          '</InstanceID></Event>')
+STR_QUEUE = ('<Event xmlns="urn:schemas-sonos-com:metadata-1-0/Queue/"><QueueID val="0"><UpdateID val="12"/>'
+             '</QueueID></Event>')
+STR_ZGS = ('<ZoneGroups><ZoneGroup Coordinator="RINCON_1" ID="x"><ZoneGroupMember UUID="RINCON_1" '
+           'ZoneName="K&amp;ü"/></ZoneGroup></ZoneGroups>')
+
+A_EVENT = [
+    EvDecoder.get_sample(0),
+    EvDecoder.get_sample(7),
+    get_prop_set(['<LastChange>' + esc(STR_RC) + '</LastChange>']),
+    get_prop_set(['<LastChange>' + esc(STR_QUEUE) + '</LastChange>']),
+    get_prop_set(['<ZoneGroupState>' + esc(STR_ZGS) + '</ZoneGroupState>',
+                  '<ThirdPartyMediaServersX></ThirdPartyMediaServersX>', '<AvailableSoftwareUpdate/>']),
+    get_prop_set(['<ZoneName>Küche &#38; Bad</ZoneName>', '<ChannelMapSet></ChannelMapSet>',
+                  '<ContainerUpdateIDs>Q:0,5</ContainerUpdateIDs>', '<FavoritesUpdateID>RINCON,3</FavoritesUpdateID>',
+                  '<ShareListUpdateID>RINCON,7</ShareListUpdateID>']),
+]
+
+
+@pytest.mark.parametrize('xml_event', A_EVENT)
+def test_same_as_soco(xml_event):
+    assert get_norm(EvDecoder().decode(xml_event)) == get_norm(get_parse_soco()(xml_event))
+
+
+def test_fields():
+    d_var = EvDecoder(cosocow.CoSoCoW.A_EV_FIELD).decode(A_EVENT[0])
+    d_var_all = EvDecoder().decode(A_EVENT[0])
+    assert set(d_var) <= set(d_var_all)
+    assert 'transport_state' in d_var
+    assert d_var['transport_state'] == d_var_all['transport_state']
+
+
+def test_didl_on_demand():
+    didl = EvDecoder().decode(A_EVENT[0])['current_track_meta_data']
+    assert isinstance(didl, EvDidl)
+    didl_soco = get_parse_soco()(A_EVENT[0])['current_track_meta_data']
+    assert didl.title == didl_soco.title
+    assert didl.album_art_uri == didl_soco.album_art_uri
+    # attribute beyond title and album art: complete DIDL document
+    assert didl.resources[0].uri == didl_soco.resources[0].uri
+
+
+def test_cache():
+    dec = EvDecoder()
+    assert dec.decode(A_EVENT[2]) is dec.decode(A_EVENT[2])
+
+
+def test_fallback():
+    # element with text is not understood by the scanner: soco parser
+    EvDecoder.set_hook(None)
+    dec = EvDecoder()
+    str_lc = ('<Event xmlns="urn:schemas-upnp-org:metadata-1-0/RCS/"><InstanceID val="0"><Foo>text</Foo>'
+              '</InstanceID></Event>')
+    xml_event = get_prop_set(['<LastChange>' + esc(str_lc) + '</LastChange>'])
+    assert get_norm(dec.decode(xml_event)) == get_norm(get_parse_soco()(xml_event))
+    assert dec.num_fallback == 1
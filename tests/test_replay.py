@@ -0,0 +1,89 @@
+"""
+event recording and deterministic replay (EvRecorder, EvReplay) without speakers
+"""
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import CoSoCoWReplay, EvDecoder, EvRecorder, EvReplay
+
+A_IP = ['10.199.0.1', '10.199.0.2', '10.199.0.3']
+D_HEAD = {'version': 1, 'zones': A_IP,
+          'dev': dict((str_ip, {'uid': 'RINCON_TEST{0:03d}'.format(idx), 'zone_name': 'Test ' + str(idx),
+                                'model_name': 'Test'}) for idx, str_ip in enumerate(A_IP))}
+
+
+def get_group_xml(a_grp):
+    return '<ZoneGroups>' + ''.join(
+        '<ZoneGroup Coordinator="RINCON_TEST{0:03d}" ID="RINCON_TEST{0:03d}:{1}">'.format(a_member[0], idx_grp)
+        + ''.join('<ZoneGroupMember UUID="RINCON_TEST{0:03d}"/>'.format(idx) for idx in a_member)
+        + '</ZoneGroup>' for idx_grp, a_member in enumerate(a_grp)) + '</ZoneGroups>'
+
+
+def get_volume(str_vol):
+    return {'volume': {'Master': str_vol, 'LF': '100', 'RF': '100'}}
+
+
+@pytest.fixture(params=['events.log', 'events.log.gz'])
+def str_file(request, tmp_path):
+    """
+    recorded event log: volume changes, a track change and a regroup
+    """
+    str_file = str(tmp_path / request.param)
+    decoder = EvDecoder(CoSoCoWReplay.A_EV_FIELD)
+    rec = EvRecorder(str_file, D_HEAD)
+    rec.add(0, 4, {'zone_group_state': get_group_xml([[0], [1], [2]])}, 100.0)
+    rec.add(0, 1, get_volume('20'), 100.5)
+    rec.add(1, 1, get_volume('35'), 101.0)
+    rec.add(0, 2, dict(decoder.decode(EvDecoder.get_sample(7))), 101.5)
+    rec.add(0, 1, get_volume('22'), 102.0)
+    rec.add(2, 4, {'zone_group_state': get_group_xml([[0, 2], [1]])}, 103.0)
+    rec.close()
+    return str_file
+
+
+def get_run(str_file):
+    mc = CoSoCoWReplay(EvReplay(str_file).d_head)
+    try:
+        mc.start()['topology'].result(10)
+        return EvReplay(str_file).run(mc=mc)
+    finally:
+        mc.close()
+
+
+def test_log(str_file):
+    replay = EvReplay(str_file)
+    assert replay.d_head == D_HEAD
+    a_event = list(replay.get_events())
+    assert [(d_time, idx_zone, num_srv) for d_time, idx_zone, num_srv, event_var in a_event] == \
+        [(100.0, 0, 4), (100.5, 0, 1), (101.0, 1, 1), (101.5, 0, 2), (102.0, 0, 1), (103.0, 2, 4)]
+    assert a_event[1][3] == get_volume('20')
+
+
+def test_replay(str_file):
+    d_res = get_run(str_file)
+    assert d_res['num_events'] == 6
+
+    a_vol = [(d_time, idx_zone, value) for d_time, idx_zone, str_field, value in d_res['trajectory']
+             if str_field == 'volume']
+    assert (100.5, 0, 20) in a_vol
+    assert (101.0, 1, 35) in a_vol
+    assert (102.0, 0, 22) in a_vol
+    assert [a_v[0] for a_v in a_vol] == sorted(a_v[0] for a_v in a_vol)  # in order of the log
+    assert any(d_time == 101.5 and idx_zone == 0 and str_field.startswith('play_track')
+               for d_time, idx_zone, str_field, value in d_res['trajectory'])
+    assert any(d_time == 103.0 and str_field == 'group_co'
+               for d_time, idx_zone, str_field, value in d_res['trajectory'])
+
+    d_state = d_res['state']
+    assert d_state['volume'][:2] == [22, 35]
+    assert d_state['group_co'] == [0, 1, 0]
+    assert d_state['group_members'] == [[0, 2], [1], [0, 2]]
+    assert d_state['play_track_idx'] == [7, 0, 7]  # member 2 shows the track of its coordinator
+
+
+def test_replay_deterministic(str_file):
+    d_res_1 = get_run(str_file)
+    d_res_2 = get_run(str_file)
+    assert d_res_1['trajectory'] == d_res_2['trajectory']
+    assert d_res_1['state'] == d_res_2['state']
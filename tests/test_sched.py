@@ -0,0 +1,113 @@
+"""
+scheduled actions: cron expressions, misfire handling, zone references
+"""
+import datetime
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import ActionSched, CoSoCoW
+
+
+def get_next(str_cron, str_time):
+    d_time = datetime.datetime.strptime(str_time, '%Y-%m-%d %H:%M').timestamp()
+    d_next = ActionSched.get_cron_next(ActionSched.get_cron(str_cron), d_time)
+    return datetime.datetime.fromtimestamp(d_next).strftime('%Y-%m-%d %H:%M %a')
+
+
+@pytest.mark.parametrize('str_cron, str_time, str_next', [
+    ('30 6 * * 1-5', '2026-10-16 07:00', '2026-10-19 06:30 Mon'),  # Friday after run: Monday
+    ('30 6 * * 1-5', '2026-10-19 06:00', '2026-10-19 06:30 Mon'),
+    ('0 0 * * *', '2026-10-19 23:59', '2026-10-20 00:00 Tue'),
+    ('*/15 * * * *', '2026-10-19 10:07', '2026-10-19 10:15 Mon'),
+    ('0 12 1 * 0', '2026-10-19 13:00', '2026-10-25 12:00 Sun'),  # day of month or day of week
+    ('0 9 29 2 *', '2026-03-01 00:00', '2028-02-29 09:00 Tue'),  # leap day
+    ('0 8 * * 7', '2026-10-19 09:00', '2026-10-25 08:00 Sun'),  # 7 is Sunday
+    ('5,10-12 3 * * *', '2026-10-19 03:06', '2026-10-19 03:10 Mon'),
+])
+def test_cron_next(str_cron, str_time, str_next):
+    assert get_next(str_cron, str_time) == str_next
+
+
+@pytest.mark.parametrize('str_cron', ['* * *', '60 * * * *', '5-1 * * * *', '* 24 * * *', '*/0 * * * *', 'a * * * *'])
+def test_cron_invalid(str_cron):
+    with pytest.raises(ValueError):
+        ActionSched.get_cron(str_cron)
+
+
+@pytest.fixture
+def mc(monkeypatch):
+    mc = CoSoCoW(['10.0.0.1', '10.0.0.2', '10.0.0.3'], str_reg_file='')
+    for num in range(1, 4):
+        mc.dev_reg.set_dev('10.0.0.%d' % num, 'RINCON_%d' % num, zone_name='Z%d' % num)
+        mc.a_zone_name[num - 1] = 'Z%d' % num
+    mc.a_call = []
+    mc.ev_call = threading.Event()
+
+    def set_volume(idx_zone, str_action, value, b_group=False):
+        mc.a_call.append((idx_zone, str_action, value))
+        mc.ev_call.set()
+    monkeypatch.setattr(mc, 'set_volume', set_volume)
+    mc.sched = ActionSched(mc, '')
+    yield mc
+    mc.close()
+
+
+def get_wait(mc, num_call):
+    d_time_end = time.time() + 3.0
+    while len(mc.a_call) < num_call and time.time() < d_time_end:
+        mc.ev_call.wait(0.1)
+        mc.ev_call.clear()
+    return mc.a_call
+
+
+def test_one_shot(mc):
+    mc.add_sched([['set_volume', [1, 'value', 15]]], d_at=time.time() + 0.1)
+    assert get_wait(mc, 1) == [(1, 'value', 15)]
+    assert mc.get_sched() == []
+
+
+def test_misfire(mc):
+    d_now = time.time()
+    mc.add_sched([['set_volume', [0, 'value', 7]]], d_at=d_now - 1000, str_misfire='skip', d_grace=60, str_id='skip')
+    mc.add_sched([['set_volume', [1, 'value', 8]]], d_at=d_now - 1000, str_misfire='run', d_grace=60, str_id='run')
+    mc.add_sched([['set_volume', [2, 'value', 9]]], d_at=d_now - 10, str_misfire='skip', d_grace=60, str_id='grace')
+    assert sorted(get_wait(mc, 2)) == [(1, 'value', 8), (2, 'value', 9)]
+    time.sleep(0.2)
+    assert len(mc.a_call) == 2
+
+
+def test_interval_misfire_run_once(mc):
+    # missed occurrences of an interval run once, next run after now
+    d_now = time.time()
+    str_id = mc.add_sched([['set_volume', [0, 'up', 1]]], d_at=d_now - 100, d_every=10, str_misfire='run')
+    assert get_wait(mc, 1) == [(0, 'up', 1)]
+    time.sleep(0.2)
+    rule = [rule for rule in mc.get_sched() if rule['str_id'] == str_id][0]
+    assert rule['num_run'] == 1
+    assert d_now < rule['d_next'] <= d_now + 10
+
+
+def test_zone_ref(mc):
+    # rule keeps its zone when the zone list changes
+    mc.add_sched([['set_volume', [2, 'value', 15]]], d_at=time.time() + 0.3)
+    a_act = mc.get_sched()[0]['a_act']
+    assert a_act[0][1][0] == {'uid': 'RINCON_3', 'name': 'Z3'}
+    mc.remove_zone(0)
+    assert get_wait(mc, 1) == [(1, 'value', 15)]
+
+
+def test_zone_unknown(mc):
+    mc.add_sched([['set_volume', [2, 'value', 15]]], d_at=time.time() + 0.3, str_id='x')
+    mc.remove_zone(2)
+    time.sleep(0.6)
+    assert mc.a_call == []
+    assert 'zone unknown' in ' '.join(mc.get_trace(None, 'sched'))
+
+
+def test_command_not_allowed(mc):
+    with pytest.raises(ValueError):
+        mc.add_sched([['close', []]], d_at=time.time())
@@ -0,0 +1,33 @@
+"""
+event storm benchmark (StressBench) on synthetic zones
+"""
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import StressBench
+
+
+def test_run():
+    d_res = StressBench(num_zones=5, d_rate=50.0, d_duration=1.0, d_drain=2.0).run()
+    assert d_res['num_inj'] == 50
+    assert d_res['num_done'] == d_res['num_inj'] and d_res['num_drop'] == 0
+    assert sum(d_type['num'] for d_type in d_res['d_type'].values()) == 50
+    assert d_res['num_cb'] > 0
+    # events wake the handling: latency is not bound to the 100 ms poll cycle
+    assert d_res['p50_ms'] < 50.0
+    assert [a_slo[0] for a_slo in d_res['slo']] == sorted(StressBench.D_SLO)
+    assert StressBench.get_report_str(d_res).endswith('PASS' if d_res['b_pass'] else 'FAIL')
+
+
+def test_same_storm_for_seed():
+    bench_1 = StressBench(num_zones=8, num_seed=3)
+    bench_2 = StressBench(num_zones=8, num_seed=3)
+    assert bench_1.get_head() == bench_2.get_head()
+    assert bench_1.a_grp == bench_2.a_grp
+    assert [bench_1.get_event('Zone', idx) for idx in range(5)] == [bench_2.get_event('Zone', idx) for idx in range(5)]
+
+
+def test_unknown_key():
+    with pytest.raises(ValueError):
+        StressBench(d_slo={'p95_ms': 10.0})
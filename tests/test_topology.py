@@ -0,0 +1,101 @@
+"""
+topology planner: minimal group operations, stages, rounds against simulated speakers
+"""
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import CoSoCoW
+
+
+class SpeakerSim(object):
+    """
+    group behaviour of speakers: members of a coordinator that leaves get the first remaining member as coordinator
+    """
+
+    def __init__(self, mc):
+        self.mc = mc
+        self.a_op = []
+
+    def set_leave(self, idx):
+        a_co = self.mc.a_group_co
+        a_member = [idx_m for idx_m, idx_co in enumerate(a_co) if idx_co == idx and idx_m != idx]
+        for idx_m in a_member:
+            a_co[idx_m] = a_member[0]
+
+    def set_op(self, op):
+        self.a_op.append(op)
+        a_co = self.mc.a_group_co
+        if op[0] == 'handoff':
+            for idx_m, idx_co in enumerate(a_co):
+                if idx_co == op[1]:
+                    a_co[idx_m] = op[2]
+        elif op[0] == 'unjoin':
+            if a_co[op[1]] == op[1]:
+                self.set_leave(op[1])
+            a_co[op[1]] = op[1]
+        elif op[0] == 'join':
+            if a_co[op[1]] == op[1]:
+                self.set_leave(op[1])
+            a_co[op[1]] = a_co[op[2]]
+
+
+@pytest.fixture
+def mc(monkeypatch):
+    mc = CoSoCoW(['10.0.0.%d' % num for num in range(1, 7)], str_reg_file='')
+    mc.a_zone_avail[:] = [True] * 6
+    mc.a_group_co[:] = list(range(6))
+    sim = SpeakerSim(mc)
+    monkeypatch.setattr(mc, 'set_topology_op', sim.set_op)
+    monkeypatch.setattr(mc, 'get_groups', lambda: None)
+    monkeypatch.setattr(mc, 'set_groups_sync', lambda: None)
+    mc.sim = sim
+    yield mc
+    mc.close()
+
+
+def test_target(mc):
+    mc.a_zone_avail[5] = False
+    assert mc.get_topology_target([[2, 0, 1], [3, 5]]) == [2, 2, 2, 3, 4, None]
+    assert mc.get_topology_target('split') == [0, 1, 2, 3, 4, None]
+    assert mc.get_topology_target('party') == [0, 0, 0, 0, 0, None]
+
+
+def test_no_op(mc):
+    mc.a_group_co[:] = [0, 0, 2, 2, 4, 5]
+    assert mc.get_topology_plan([[0, 1], [2, 3]]) == []
+    assert mc.apply_topology([[0, 1], [2, 3]])
+    assert mc.sim.a_op == []
+
+
+def test_join(mc):
+    assert mc.get_topology_plan([[0, 1, 2]]) == [[('join', 1, 0), ('join', 2, 0)]]
+
+
+def test_handoff(mc):
+    # new coordinator inside of the group: hand over in an own first stage, no unjoin
+    mc.a_group_co[:] = [0, 0, 0, 3, 4, 5]
+    a_plan = mc.get_topology_plan([[1, 0, 2, 3]])
+    assert a_plan == [[('handoff', 0, 1)], [('join', 3, 1)]]
+
+
+def test_split(mc):
+    mc.a_group_co[:] = [0, 0, 0, 3, 3, 5]
+    a_plan = mc.get_topology_plan('split')
+    assert a_plan == [[('unjoin', 1), ('unjoin', 2), ('unjoin', 4)]]
+    assert mc.apply_topology('split')
+    assert mc.a_group_co == [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('a_co, a_target', [
+    ([0, 1, 2, 3, 4, 5], 'party'),
+    ([0, 0, 0, 3, 3, 3], [[3, 0], [1, 2, 4, 5]]),
+    ([0, 0, 0, 3, 3, 3], [[1, 0, 2], [5, 3, 4]]),
+    ([0, 0, 2, 2, 4, 4], [[2, 1], [0, 5], [4, 3]]),
+    ([1, 1, 1, 1, 1, 1], 'split'),
+])
+def test_apply(mc, a_co, a_target):
+    mc.a_group_co[:] = a_co
+    assert mc.apply_topology(a_target)
+    assert mc.a_group_co == mc.get_topology_target(a_target)
+    assert mc.get_topology_plan(a_target) == []
@@ -0,0 +1,212 @@
+"""
+coalesced volume control (VolCtrl) against fake speakers
+"""
+import contextlib
+import threading
+
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import VolCtrl
+
+
+class RenderingControl(object):
+
+    def __init__(self, z_fake, b_rel=True):
+        self.z_fake = z_fake
+        self.b_rel = b_rel
+
+    def SetRelativeVolume(self, args):
+        if not self.b_rel:
+            raise AttributeError('SetRelativeVolume')
+        d_delta = dict(args)['Adjustment']
+        self.z_fake.a_log.append(('rel', d_delta))
+        self.z_fake.d_vol = max(0, min(100, self.z_fake.d_vol + d_delta))
+        return {'NewVolume': str(self.z_fake.d_vol)}
+
+
+class GroupRenderingControl(object):
+
+    def __init__(self, z_fake):
+        self.z_fake = z_fake
+
+    def SnapshotGroupVolume(self, args):
+        pass
+
+    def SetGroupVolume(self, args):
+        self.z_fake.a_log.append(('group_abs', dict(args)['DesiredVolume']))
+
+    def SetRelativeGroupVolume(self, args):
+        self.z_fake.a_log.append(('group_rel', dict(args)['Adjustment']))
+        return {'NewVolume': '42'}
+
+    def GetGroupVolume(self, args):
+        return {'CurrentVolume': '37'}
+
+
+class ZoneFake(object):
+
+    def __init__(self, str_ip, b_rel=True):
+        self.ip_address = str_ip
+        self.d_vol = 30
+        self.a_log = []
+        self.renderingControl = RenderingControl(self, b_rel)
+        self.groupRenderingControl = GroupRenderingControl(self)
+
+    @property
+    def volume(self):
+        return self.d_vol
+
+    @volume.setter
+    def volume(self, d_vol):
+        self.a_log.append(('abs', d_vol))
+        self.d_vol = d_vol
+
+
+class CoSoCoWFake(object):
+
+    def __init__(self, a_zone):
+        self.a_zone = a_zone
+        self.a_volume = [25] * len(a_zone)
+        self.a_group_volume = [-1] * len(a_zone)
+
+    def get_zone(self, idx_zone):
+        return self.a_zone[idx_zone]
+
+    def get_req_slot(self, z_req):
+        return contextlib.nullcontext()
+
+    def get_call(self, z_req, str_cls, str_op, fn, idx_prio=None):
+        return fn()
+
+    def add_trace(self, *args):
+        pass
+
+    def set_volume_cache(self, idx_zone, d_vol, b_group=False):
+        (self.a_group_volume if b_group else self.a_volume)[idx_zone] = d_vol
+
+
+@pytest.fixture
+def mc():
+    return CoSoCoWFake([ZoneFake('10.0.0.1'), ZoneFake('10.0.0.2'), ZoneFake('10.0.0.3', b_rel=False)])
+
+
+def set_wait(vol_ctrl):
+    """
+    wait until all pending changes are sent (timer threads finished)
+    """
+    for _ in range(10):
+        with vol_ctrl.lock:
+            a_timer = list(vol_ctrl.d_timer.values()) + list(vol_ctrl.d_actv.values())
+        if not a_timer:
+            return
+        for t_flush in a_timer:
+            t_flush.join(2.0)
+    raise AssertionError('pending volume changes not sent')
+
+
+def test_steps_coalesced(mc):
+    vol_ctrl = VolCtrl(mc, 0.05)
+    for _ in range(5):
+        vol_ctrl.set_vol_rel(0, 2)
+    vol_ctrl.set_vol_rel(0, -1)
+    set_wait(vol_ctrl)
+    assert mc.a_zone[0].a_log == [('rel', 9)]
+    assert mc.a_volume[0] == 39
+
+
+def test_abs_last_wins(mc):
+    vol_ctrl = VolCtrl(mc, 0.05)
+    vol_ctrl.set_vol(0, 10)
+    vol_ctrl.set_vol(0, 20)
+    vol_ctrl.set_vol_rel(0, 3)
+    set_wait(vol_ctrl)
+    assert mc.a_zone[0].a_log == [('abs', 23)]
+
+
+def test_abs_equal_to_cache(mc):
+    # cached level may be stale: absolute level is always sent
+    vol_ctrl = VolCtrl(mc, 0.01)
+    vol_ctrl.set_vol(0, mc.a_volume[0])
+    set_wait(vol_ctrl)
+    assert mc.a_zone[0].a_log == [('abs', 25)]
+
+
+def test_zones_separate(mc):
+    vol_ctrl = VolCtrl(mc, 0.05)
+    vol_ctrl.set_vol_rel(0, 1)
+    vol_ctrl.set_vol_rel(1, -2)
+    set_wait(vol_ctrl)
+    assert mc.a_zone[0].a_log == [('rel', 1)]
+    assert mc.a_zone[1].a_log == [('rel', -2)]
+
+
+def test_step_without_relative_action(mc):
+    vol_ctrl = VolCtrl(mc, 0.01)
+    vol_ctrl.set_vol_rel(2, 80)
+    set_wait(vol_ctrl)
+    assert mc.a_zone[2].a_log == [('abs', 100)]
+    assert mc.a_volume[2] == 100
+
+
+def test_group(mc):
+    vol_ctrl = VolCtrl(mc, 0.05)
+    vol_ctrl.set_vol(0, 10, True)
+    set_wait(vol_ctrl)
+    vol_ctrl.set_vol_rel(0, -4, True)
+    vol_ctrl.set_vol_rel(0, 1, True)
+    set_wait(vol_ctrl)
+    assert mc.a_zone[0].a_log == [('group_abs', 10), ('group_rel', -3)]
+    assert mc.a_group_volume[0] == 42
+    assert vol_ctrl.get_vol_group(0) == 37
+
+
+def test_close(mc):
+    vol_ctrl = VolCtrl(mc, 0.2)
+    vol_ctrl.set_vol_rel(0, 1)
+    vol_ctrl.close()
+    assert not vol_ctrl.d_pend and not vol_ctrl.d_timer
+    assert mc.a_zone[0].a_log == []
+
+
+def test_zone_remove(mc):
+    vol_ctrl = VolCtrl(mc, 0.2)
+    vol_ctrl.set_vol(0, 5)
+    vol_ctrl.set_vol(1, 15)
+    vol_ctrl.set_zone_remove(0)
+    del mc.a_zone[0], mc.a_volume[0], mc.a_group_volume[0]
+    set_wait(vol_ctrl)
+    # change of zone 1 goes to its new index 0
+    assert mc.a_zone[0].ip_address == '10.0.0.2'
+    assert mc.a_zone[0].a_log == [('abs', 15)]
+
+
+def test_one_send_per_zone(mc):
+    # change during a running send is sent after it, never in parallel
+    z_fake = mc.a_zone[0]
+    ev_send = threading.Event()
+    ev_go = threading.Event()
+    a_actv = [0, 0]
+
+    def set_vol_abs(z_req, d_vol):
+        a_actv[0] += 1
+        a_actv[1] = max(a_actv[1], a_actv[0])
+        ev_send.set()
+        ev_go.wait(2.0)
+        z_req.volume = d_vol
+        a_actv[0] -= 1
+
+    vol_ctrl = VolCtrl(mc, 0.01)
+    vol_ctrl.set_vol_abs = set_vol_abs
+    vol_ctrl.set_vol(0, 10)
+    assert ev_send.wait(2.0)
+    vol_ctrl.set_vol(0, 20)
+    vol_ctrl.set_vol(0, 30)
+    with vol_ctrl.lock:
+        assert not vol_ctrl.d_timer
+    ev_go.set()
+    set_wait(vol_ctrl)
+    assert z_fake.a_log == [('abs', 10), ('abs', 30)]
+    assert a_actv[1] == 1
+    assert mc.a_volume[0] == 30
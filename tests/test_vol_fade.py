@@ -0,0 +1,80 @@
+"""
+volume fades (VolFadeEng) against a fake volume control
+"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('soco')
+
+from cosocow import VolFade, VolFadeEng
+
+
+class VolCtrlFake(object):
+
+    def __init__(self, d_delay=0.0):
+        self.d_delay = d_delay
+        self.lock = threading.Lock()
+        self.a_log = []
+
+    def set_vol_zone(self, idx_zone, d_delta=0, d_vol_abs=None):
+        time.sleep(self.d_delay)  # round trip of speaker
+        with self.lock:
+            self.a_log.append((idx_zone, d_vol_abs))
+        return d_vol_abs
+
+
+class CoSoCoWFake(object):
+
+    def __init__(self, d_delay=0.0):
+        self.vol_ctrl = VolCtrlFake(d_delay)
+
+    def add_trace(self, *args):
+        pass
+
+
+def test_fade_levels():
+    mc = CoSoCoWFake()
+    eng = VolFadeEng(mc)
+    fade = eng.set_fade([0, 1], [0, 40], [20, 20], 0.2, d_rate=20)
+    assert fade.wait(2.0)
+    a_zone_0 = [d_vol for idx_zone, d_vol in mc.vol_ctrl.a_log if idx_zone == 0]
+    a_zone_1 = [d_vol for idx_zone, d_vol in mc.vol_ctrl.a_log if idx_zone == 1]
+    assert a_zone_0[-1] == 20 and a_zone_1[-1] == 20
+    assert a_zone_0 == sorted(a_zone_0) and a_zone_1 == sorted(a_zone_1, reverse=True)
+    eng.close()
+
+
+def test_replace_fade_of_zone():
+    mc = CoSoCoWFake()
+    eng = VolFadeEng(mc)
+    fade_1 = eng.set_fade([0, 1], [0, 0], [50, 50], 5.0)
+    fade_2 = eng.set_fade([1], [10], [30], 0.0)
+    assert fade_2.wait(2.0)
+    assert fade_1.a_idx_zone == [0] and not fade_1.is_done()
+    fade_1.cancel()
+    assert fade_1.is_done()
+    eng.close()
+
+
+def test_no_spin_on_busy_zone(monkeypatch):
+    # zero duration fade on a zone still busy with the last send: engine waits for the send, no busy loop
+    mc = CoSoCoWFake(d_delay=0.3)
+    eng = VolFadeEng(mc)
+    num_step = [0]
+    get_step = VolFade.get_step
+
+    def get_step_cnt(fade, d_time_cur):
+        num_step[0] += 1
+        return get_step(fade, d_time_cur)
+
+    monkeypatch.setattr(VolFade, 'get_step', get_step_cnt)
+    fade_1 = eng.set_fade([0], [0], [10], 0.0)
+    time.sleep(0.05)
+    fade_2 = eng.set_fade([0], [10], [20], 0.0)
+    assert fade_1.is_done()
+    assert fade_2.wait(2.0)
+    assert mc.vol_ctrl.a_log == [(0, 10), (0, 20)]
+    assert num_step[0] < 20
+    eng.close()